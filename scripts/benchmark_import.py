@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Benchmark del tiempo de importación de la CLI con presupuesto de regresión.
+
+Ejecuta `python -X importtime -c "import src.app"` en un proceso limpio,
+suma el tiempo acumulado del módulo raíz y falla (código de salida 1) si se
+supera el presupuesto o si se importa alguna dependencia pesada que debe
+cargarse de forma diferida.
+
+El presupuesto se expresa relativo a una línea base medida en la misma
+ejecución (`import polars`, que la CLI necesita de todos modos), de modo que
+no dependa de la velocidad de la máquina. Mediciones de referencia: `import
+src.app` tarda entre 1.2x y 1.35x lo que `import polars` (210-245 ms frente a
+170-180 ms); el límite de 1.75x deja margen para el ruido sin dejar pasar
+una dependencia pesada nueva.
+`--budget-ms` añade además un tope absoluto opcional.
+
+Uso:
+    python -m scripts.benchmark_import
+    python -m scripts.benchmark_import --module src.main_logic --max-ratio 1.5
+    python -m scripts.benchmark_import --budget-ms 600
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Dependencias que solo deben importarse cuando se usa su funcionalidad
+HEAVY_MODULES = [
+    "sklearn",
+    "matplotlib",
+    "plotly",
+    "seaborn",
+    "pandas",
+    "openpyxl",
+    "scipy",
+]
+
+# Módulo de referencia medido en la misma ejecución
+BASELINE_MODULE = "polars"
+DEFAULT_MAX_RATIO = 1.75
+
+_IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+
+def run_importtime(module: str, repo_root: str) -> Tuple[float, Dict[str, float]]:
+    """Importa `module` con -X importtime y devuelve (total_ms, ms por paquete raíz)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=repo_root,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_us = 0
+    per_package: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, name = match.groups()
+        if name == module:
+            total_us = int(cumulative_us)
+        root = name.split(".")[0]
+        per_package[root] = per_package.get(root, 0.0) + int(self_us) / 1000
+    return total_us / 1000, per_package
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="src.app", help="Módulo a importar")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones (se usa la mediana)")
+    parser.add_argument(
+        "--baseline",
+        default=BASELINE_MODULE,
+        help=f"Módulo de referencia medido en la misma ejecución (Default: {BASELINE_MODULE})",
+    )
+    parser.add_argument(
+        "--max-ratio",
+        type=float,
+        default=DEFAULT_MAX_RATIO,
+        help=f"Máximo tiempo de importación relativo a la línea base (Default: {DEFAULT_MAX_RATIO})",
+    )
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        default=None,
+        help="Tope absoluto opcional en ms (Default: sin tope)",
+    )
+    parser.add_argument("--top", type=int, default=10, help="Paquetes más costosos a mostrar")
+    args = parser.parse_args()
+
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    totals: List[float] = []
+    baseline_totals: List[float] = []
+    per_package: Dict[str, float] = {}
+    # Intercaladas para que ambas medidas vean la misma carga de la máquina
+    for _ in range(args.repeat):
+        baseline_totals.append(run_importtime(args.baseline, repo_root)[0])
+        total_ms, per_package = run_importtime(args.module, repo_root)
+        totals.append(total_ms)
+    median_ms = statistics.median(totals)
+    baseline_ms = statistics.median(baseline_totals)
+    ratio = median_ms / baseline_ms if baseline_ms > 0 else float("inf")
+
+    print(f"import {args.module}: mediana {median_ms:.1f} ms ({args.repeat} ejecuciones)")
+    print(f"import {args.baseline}: mediana {baseline_ms:.1f} ms (línea base, {ratio:.2f}x)")
+    print(f"{'paquete':<20} {'ms (propio)':>12}")
+    for name, ms in sorted(per_package.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"{name:<20} {ms:>12.1f}")
+
+    loaded_heavy = [name for name in HEAVY_MODULES if name in per_package]
+    failed = False
+    if loaded_heavy:
+        print(f"ERROR: dependencias pesadas importadas al inicio: {loaded_heavy}")
+        failed = True
+    if ratio > args.max_ratio:
+        print(f"ERROR: {ratio:.2f}x la línea base supera el máximo de {args.max_ratio:.2f}x")
+        failed = True
+    if args.budget_ms is not None and median_ms > args.budget_ms:
+        print(f"ERROR: {median_ms:.1f} ms supera el presupuesto de {args.budget_ms:.0f} ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print(f"OK: {ratio:.2f}x la línea base (máximo {args.max_ratio:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
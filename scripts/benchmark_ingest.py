@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Benchmark de ingesta: CSV plano frente a exportaciones comprimidas.
+
+Genera copias `.csv.gz`, `.zip` y (si está instalado `zstandard`) `.csv.zst`
+del CSV indicado en un directorio temporal y mide el tiempo de
+`ingest.load_input_data` para cada formato.
+
+Uso:
+    python -m scripts.benchmark_ingest --csv data/data.csv --repeat 5
+"""
+import argparse
+import gzip
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import zipfile
+from typing import Dict, List
+
+from src.config_loader import DEFAULT_CONFIG
+from src.ingest import load_input_data
+
+
+def build_variants(csv_path: str, work_dir: str) -> Dict[str, str]:
+    base_name = os.path.basename(csv_path)
+    variants = {"csv": os.path.join(work_dir, base_name)}
+    shutil.copyfile(csv_path, variants["csv"])
+
+    variants["gzip"] = variants["csv"] + ".gz"
+    with open(csv_path, "rb") as src, gzip.open(variants["gzip"], "wb") as dst:
+        shutil.copyfileobj(src, dst)
+
+    variants["zip"] = os.path.join(work_dir, os.path.splitext(base_name)[0] + ".zip")
+    with zipfile.ZipFile(variants["zip"], "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.write(csv_path, arcname=base_name)
+
+    try:
+        import zstandard
+    except ImportError:
+        print("zstandard no está instalado: se omite la variante .csv.zst")
+    else:
+        variants["zstd"] = variants["csv"] + ".zst"
+        with open(csv_path, "rb") as src, open(variants["zstd"], "wb") as dst:
+            zstandard.ZstdCompressor().copy_stream(src, dst)
+    return variants
+
+
+def benchmark(path: str, repeat: int) -> List[float]:
+    column_map = DEFAULT_CONFIG["column_mapping"]
+    load_input_data(path, column_map)  # calentamiento
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        load_input_data(path, column_map)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--csv", required=True, help="CSV plano de referencia")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones por formato")
+    args = parser.parse_args()
+
+    raw_size = os.path.getsize(args.csv)
+    rows = load_input_data(args.csv, DEFAULT_CONFIG["column_mapping"]).height
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        variants = build_variants(args.csv, work_dir)
+        print(f"{'formato':<8} {'tamaño MB':>10} {'mediana s':>10} {'filas/s':>12} {'MB/s (sin comp.)':>17}")
+        for name, path in variants.items():
+            median = statistics.median(benchmark(path, args.repeat))
+            size_mb = os.path.getsize(path) / 1e6
+            print(
+                f"{name:<8} {size_mb:>10.2f} {median:>10.4f} "
+                f"{rows / median:>12,.0f} {raw_size / 1e6 / median:>17.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
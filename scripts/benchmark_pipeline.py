@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""Benchmark de las etapas del pipeline sobre exportaciones sintéticas.
+
+Genera (y cachea) CSV sintéticos con `scripts.synthetic_data` y mide cada
+etapa en un proceso nuevo, de modo que el pico de RSS corresponde solo a la
+preparación de sus entradas más la propia etapa:
+
+    ingest        carga + renombrado + categóricas + columnas de tiempo
+    numeric       transformations.numeric.process_numeric_columns
+    analyze       analyzer.analyze
+    counterparty  counterparty_analyzer.analyze_counterparties
+    sessions      session_analyzer.analyze_trading_sessions
+    save_outputs  reporter.save_outputs (según --profile)
+    unified       UnifiedReporter.generate_unified_report
+
+Los resultados se imprimen como tabla y, con --results, se añaden a un
+archivo JSON Lines junto al commit actual para comparar entre commits.
+
+Uso:
+    python -m scripts.benchmark_pipeline --rows 10000 1000000
+    python -m scripts.benchmark_pipeline --rows 10000000 --stages ingest numeric
+    python -m scripts.benchmark_pipeline --rows 10000 --results benchmarks/results.jsonl
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+STAGES = [
+    "ingest",
+    "numeric",
+    "analyze",
+    "counterparty",
+    "sessions",
+    "save_outputs",
+    "unified",
+]
+
+DEFAULT_SIZES = [10_000]
+
+
+def _cli_args(csv_path: str, out_dir: str, profile: str) -> argparse.Namespace:
+    """Argumentos de la CLI real, sin desglose anual y con el perfil indicado."""
+    from src.main_logic import initialize_analysis
+
+    cli_args, _, _ = initialize_analysis(
+        ["--csv", csv_path, "--out", out_dir, "--profile", profile, "--no-annual-breakdown"]
+    )
+    return cli_args
+
+
+def _run_case(stage: str, csv_path: str, out_dir: str, profile: str) -> Dict[str, Any]:
+    """Prepara las entradas de `stage`, la ejecuta y mide tiempo y memoria."""
+    import logging
+
+    logging.disable(logging.CRITICAL)
+
+    from src.app import _load_and_prepare_base_data
+    from src.config_loader import DEFAULT_CONFIG
+    from src.instrumentation import current_rss_mb, peak_rss_mb
+
+    config = DEFAULT_CONFIG
+    column_map = config["column_mapping"]
+    cli_args = _cli_args(csv_path, out_dir, profile)
+
+    def prepare():
+        return _load_and_prepare_base_data(cli_args, column_map)
+
+    if stage == "ingest":
+        run = prepare
+    else:
+        base = prepare()
+        if stage == "numeric":
+            from src.transformations.numeric import process_numeric_columns
+
+            run = lambda: process_numeric_columns(base)
+        elif stage in ("counterparty", "sessions"):
+            from src import counterparty_analyzer, session_analyzer
+            from src.transformations.numeric import process_numeric_columns
+
+            numeric = process_numeric_columns(base)
+            if stage == "counterparty":
+                run = lambda: counterparty_analyzer.analyze_counterparties(numeric)
+            else:
+                run = lambda: session_analyzer.analyze_trading_sessions(
+                    numeric, session_gap_minutes=30
+                )
+        else:
+            from src.analyzer import analyze
+
+            if stage == "analyze":
+                run = lambda: analyze(base, column_map, config, cli_args)
+            else:
+                processed, metrics = analyze(base, column_map, config, cli_args)
+                if stage == "save_outputs":
+                    from src.reporter import save_outputs
+
+                    run = lambda: save_outputs(
+                        df_to_plot_from=processed,
+                        metrics_to_save=metrics,
+                        output_label="total",
+                        status_subdir="todas",
+                        base_output_dir=os.path.join(out_dir, "total"),
+                        file_name_suffix_from_cli="",
+                        title_suffix_from_cli="",
+                        col_map=column_map,
+                        cli_args=cli_args,
+                        config=config,
+                    )
+                else:
+                    from src.unified_reporter import UnifiedReporter
+
+                    period_data = {
+                        "total": {"todas": {"df": processed, "metrics": metrics}}
+                    }
+                    reporter = UnifiedReporter(out_dir, config, cli_args)
+                    run = lambda: reporter.generate_unified_report(period_data)
+
+    rows = base.height if stage != "ingest" else None
+    rss_before = current_rss_mb()
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    result = run()
+    wall_s = time.perf_counter() - start_wall
+    cpu_s = time.process_time() - start_cpu
+    if rows is None:
+        rows = result.height
+    return {
+        "stage": stage,
+        "rows": rows,
+        "wall_s": round(wall_s, 4),
+        "cpu_s": round(cpu_s, 4),
+        "rows_per_s": round(rows / wall_s) if wall_s else None,
+        "rss_before_mb": rss_before,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _git_commit(repo_root: str) -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=repo_root,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ensure_dataset(data_dir: str, rows: int, seed: int) -> str:
+    """Devuelve el CSV sintético de `rows` filas, generándolo si no existe."""
+    from scripts.synthetic_data import write_p2p_export
+
+    path = os.path.join(data_dir, f"p2p_synthetic_{rows}_{seed}.csv")
+    if not os.path.exists(path):
+        print(f"Generando {rows:,} filas sintéticas en {path}...")
+        write_p2p_export(path, rows, seed)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--rows",
+        type=int,
+        nargs="+",
+        default=DEFAULT_SIZES,
+        help="Tamaños a medir (ej: 10000 1000000 10000000)",
+    )
+    parser.add_argument(
+        "--stages", nargs="+", choices=STAGES, default=STAGES, help="Etapas a medir"
+    )
+    parser.add_argument(
+        "--profile",
+        default="full",
+        choices=["tables", "report", "full"],
+        help="Perfil de ejecución para save_outputs/unified (Default: full)",
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="Repeticiones por caso")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla de los datos")
+    parser.add_argument(
+        "--data-dir",
+        default=os.path.join(tempfile.gettempdir(), "p2p_benchmark_data"),
+        help="Directorio donde se cachean los CSV sintéticos",
+    )
+    parser.add_argument(
+        "--results", default=None, help="Archivo JSON Lines donde añadir los resultados"
+    )
+    args = parser.parse_args()
+
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    run_info = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(repo_root),
+        "python": platform.python_version(),
+        "profile": args.profile,
+    }
+
+    results: List[Dict[str, Any]] = []
+    context = multiprocessing.get_context("spawn")
+    print(
+        f"{'etapa':<13} {'filas':>11} {'mediana s':>10} {'CPU s':>8} "
+        f"{'filas/s':>12} {'RSS antes MB':>13} {'pico MB':>9}"
+    )
+    for rows in args.rows:
+        csv_path = ensure_dataset(args.data_dir, rows, args.seed)
+        for stage in args.stages:
+            samples = []
+            for _ in range(args.repeat):
+                with tempfile.TemporaryDirectory() as out_dir:
+                    # Un proceso por caso para que el pico de RSS no se acumule
+                    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                        samples.append(
+                            pool.submit(_run_case, stage, csv_path, out_dir, args.profile).result()
+                        )
+            samples.sort(key=lambda sample: sample["wall_s"])
+            median = samples[len(samples) // 2]
+            results.append({**run_info, "dataset_rows": rows, **median})
+            print(
+                f"{stage:<13} {median['rows']:>11,} {median['wall_s']:>10.3f} "
+                f"{median['cpu_s']:>8.2f} {median['rows_per_s'] or 0:>12,} "
+                f"{median['rss_before_mb'] or 0:>13.0f} {median['peak_rss_mb'] or 0:>9.0f}"
+            )
+
+    if args.results:
+        os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+        with open(args.results, "a", encoding="utf-8") as f:
+            for result in results:
+                f.write(json.dumps(result) + "\n")
+        print(f"Resultados añadidos a {args.results}")
+
+
+if __name__ == "__main__":
+    main()
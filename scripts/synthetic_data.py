@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""Generador de exportaciones P2P sintéticas con el formato de `data/data.csv`.
+
+Reproduce las columnas de la exportación, sus formatos (números con puntos
+de miles en `Quantity`/`Maker Fee`, precios USDT/USD sin separador decimal,
+campos vacíos) y distribuciones aproximadas de lado, activo, fiat, estado,
+método de pago y contrapartes (la mayoría vacías y el resto con cola larga).
+
+Uso:
+    python -m scripts.synthetic_data --rows 1000000 --out data/synthetic_1m.csv
+"""
+import argparse
+import datetime
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+import polars as pl
+
+EXPORT_COLUMNS = [
+    "Order Number",
+    "Advertisement Order Number",
+    "Order Type",
+    "Asset Type",
+    "Fiat Type",
+    "Total Price",
+    "Price",
+    "Quantity",
+    "Exchange rate",
+    "Maker Fee",
+    "Taker Fee",
+    "Payment Method",
+    "Counterparty",
+    "Status",
+    "Origin",
+    "Match time(UTC)",
+]
+
+ORDER_TYPES = (["Sell", "Buy"], [0.72, 0.28])
+FIAT_TYPES = (["USD", "UYU"], [0.65, 0.35])
+ASSET_TYPES = (["USDT", "BTC", "BUSD", "ETH"], [0.968, 0.0165, 0.012, 0.0035])
+STATUSES = (["Completed", "Cancelled", "System cancelled"], [0.57, 0.24, 0.19])
+PAYMENT_METHODS = (
+    [
+        "ItauUruguay",
+        "SantanderUrug",
+        "OcaBlue",
+        "BankRepublicUruguay",
+        "Prex",
+        "ScotiabankUruguay",
+        "RedPagos",
+        "HSBCuruguay",
+        "BBVAUruguay",
+        "MiDinero",
+    ],
+    [0.43, 0.16, 0.12, 0.11, 0.08, 0.035, 0.03, 0.015, 0.012, 0.008],
+)
+ORIGINS = (
+    ["MAKE_TAKE", "FIAT", "LITE_VERSION", "EXPRESS", "ADV_SHARE", "OTHERS"],
+    [0.84, 0.068, 0.056, 0.023, 0.012, 0.001],
+)
+EXCHANGE_RATES = ([None, "0.00", "1.00"], [0.61, 0.30, 0.09])
+
+# Precio mediano y monto mediano (en fiat) por par activo/fiat
+PAIR_PRICES: Dict[Tuple[str, str], Tuple[float, float]] = {
+    ("USDT", "USD"): (1.04, 500.0),
+    ("USDT", "UYU"): (43.0, 9700.0),
+    ("BTC", "USD"): (29500.0, 640.0),
+    ("BTC", "UYU"): (910000.0, 7400.0),
+    ("BUSD", "USD"): (1.0, 330.0),
+    ("BUSD", "UYU"): (39.0, 8300.0),
+    ("ETH", "USD"): (1680.0, 430.0),
+    ("ETH", "UYU"): (72000.0, 9000.0),
+}
+
+START = datetime.datetime(2022, 4, 6, 19, 0, 0)
+END = datetime.datetime(2025, 5, 28, 19, 0, 0)
+
+# Proporción de filas con formatos "raros" de la exportación
+ODD_SEPARATOR_SHARE = 0.02
+INTEGER_PRICE_SHARE = 0.01
+NAMED_COUNTERPARTY_SHARE = 0.12
+
+# Actividad por hora UTC (pico en la tarde de Uruguay, UTC-3)
+_HOUR_WEIGHTS = np.array(
+    [4, 3, 2, 1, 1, 1, 1, 1, 1, 1, 2, 3, 5, 7, 8, 8, 8, 8, 8, 8, 7, 7, 6, 5],
+    dtype=float,
+)
+
+
+def _choice(rng: np.random.Generator, spec: Tuple[List, List[float]], n: int) -> np.ndarray:
+    values, weights = spec
+    weights = np.asarray(weights, dtype=float)
+    return np.asarray(values, dtype=object)[
+        rng.choice(len(values), size=n, p=weights / weights.sum())
+    ]
+
+
+def _odd_thousands(values: np.ndarray) -> List[str]:
+    """Formatea como la exportación: 53.550640279 -> '53.550.640.279'."""
+    formatted = []
+    for value in values:
+        digits = f"{int(round(value * 1e9)):d}".lstrip("0") or "0"
+        groups = []
+        while digits:
+            groups.append(digits[-3:])
+            digits = digits[:-3]
+        formatted.append(".".join(reversed(groups)))
+    return formatted
+
+
+def _plain_number(expr: pl.Expr, decimals: int) -> pl.Expr:
+    """Número con punto decimal y sin ceros finales ('4450', '1.044')."""
+    return (
+        expr.round(decimals)
+        .cast(pl.String)
+        .str.replace(r"\.0+$", "")
+        .str.replace(r"(\.\d*?)0+$", "$1")
+    )
+
+
+def _counterparty_pool(rng: np.random.Generator, size: int) -> np.ndarray:
+    alphabet = np.array(list("0123456789abcdef"))
+    codes = rng.choice(alphabet, size=(size, 8))
+    return np.array(["P2P-" + "".join(row) for row in codes], dtype=object)
+
+
+def generate_p2p_export(rows: int, seed: int = 42, start_index: int = 0) -> pl.DataFrame:
+    """
+    Genera un DataFrame con columnas de texto idénticas a la exportación P2P.
+
+    Args:
+        rows: Número de filas.
+        seed: Semilla del generador aleatorio.
+        start_index: Desplazamiento de los números de orden, para generar por
+            bloques sin repetir órdenes.
+
+    Returns:
+        DataFrame de Polars con `EXPORT_COLUMNS` (todas `pl.String`).
+    """
+    rng = np.random.default_rng(seed + start_index)
+
+    order_type = _choice(rng, ORDER_TYPES, rows)
+    asset = _choice(rng, ASSET_TYPES, rows)
+    fiat = _choice(rng, FIAT_TYPES, rows)
+    status = _choice(rng, STATUSES, rows)
+
+    median_price = np.empty(rows)
+    median_total = np.empty(rows)
+    for (pair_asset, pair_fiat), (price, total) in PAIR_PRICES.items():
+        mask = (asset == pair_asset) & (fiat == pair_fiat)
+        median_price[mask] = price
+        median_total[mask] = total
+    price = median_price * rng.normal(1.0, 0.02, rows)
+    total_price = np.round(median_total * rng.lognormal(0.0, 0.9, rows), 2)
+    quantity = total_price / price
+    maker_fee = quantity * 0.001 * rng.uniform(0.5, 1.5, rows)
+
+    frame = pl.DataFrame(
+        {
+            "Order Type": order_type.astype(str),
+            "Asset Type": asset.astype(str),
+            "Fiat Type": fiat.astype(str),
+            "Total Price": total_price,
+            "Price": price,
+            "Quantity": quantity,
+            "Maker Fee": maker_fee,
+            "Status": status.astype(str),
+        }
+    ).with_columns(
+        _plain_number(pl.col("Total Price"), 2).alias("Total Price"),
+        _plain_number(pl.col("Price"), 3).alias("Price"),
+        _plain_number(pl.col("Quantity"), 2).alias("Quantity"),
+        _plain_number(pl.col("Maker Fee"), 2).alias("Maker Fee"),
+    )
+
+    # Puntos de miles "raros" en Quantity y Maker Fee
+    odd_idx = np.flatnonzero(rng.random(rows) < ODD_SEPARATOR_SHARE)
+    quantity_str = frame.get_column("Quantity").to_numpy().astype(object)
+    fee_str = frame.get_column("Maker Fee").to_numpy().astype(object)
+    quantity_str[odd_idx] = _odd_thousands(quantity[odd_idx])
+    fee_str[odd_idx] = _odd_thousands(maker_fee[odd_idx])
+
+    # Precios USDT/USD sin separador decimal ('993' en lugar de '0.993')
+    price_str = frame.get_column("Price").to_numpy().astype(object)
+    integer_price = (
+        (asset == "USDT") & (fiat == "USD") & (rng.random(rows) < INTEGER_PRICE_SHARE)
+    )
+    price_str[integer_price] = [str(int(round(p * 1000))) for p in price[integer_price]]
+
+    # Contrapartes: mayoría vacías; el resto sigue una distribución de cola larga
+    pool = _counterparty_pool(rng, max(50, rows // 12))
+    weights = (np.arange(len(pool)) + 10.0) ** -1.1
+    counterparty = pool[rng.choice(len(pool), size=rows, p=weights / weights.sum())]
+    counterparty[rng.random(rows) >= NAMED_COUNTERPARTY_SHARE] = None
+
+    payment_method = _choice(rng, PAYMENT_METHODS, rows)
+    payment_method[status == "System cancelled"] = None
+
+    # Tiempos ordenados con perfil horario realista
+    days = rng.integers(0, (END - START).days, rows)
+    hours = rng.choice(24, size=rows, p=_HOUR_WEIGHTS / _HOUR_WEIGHTS.sum())
+    seconds = rng.integers(0, 3600, rows)
+    offsets = np.sort(days * 86400 + hours * 3600 + seconds)
+    match_time = (np.datetime64(START, "s") + offsets.astype("timedelta64[s]")).astype(
+        "datetime64[ms]"
+    )
+
+    sequence = np.arange(start_index, start_index + rows, dtype=np.int64) * 7919 + 345102803
+    return frame.with_columns(
+        pl.Series("Order Number", [f"20{n:018d}" for n in sequence]),
+        pl.Series("Advertisement Order Number", [f"11{n:018d}" for n in sequence // 3]),
+        pl.Series("Price", price_str.tolist(), dtype=pl.String),
+        pl.Series("Quantity", quantity_str.tolist(), dtype=pl.String),
+        pl.Series("Exchange rate", _choice(rng, EXCHANGE_RATES, rows).tolist(), dtype=pl.String),
+        pl.Series("Maker Fee", fee_str.tolist(), dtype=pl.String),
+        pl.lit(None, dtype=pl.String).alias("Taker Fee"),
+        pl.Series("Payment Method", payment_method.tolist(), dtype=pl.String),
+        pl.Series("Counterparty", counterparty.tolist(), dtype=pl.String),
+        pl.Series("Origin", _choice(rng, ORIGINS, rows).tolist(), dtype=pl.String),
+        pl.Series("Match time(UTC)", match_time).dt.strftime("%Y-%m-%d %H:%M:%S"),
+    ).select(EXPORT_COLUMNS)
+
+
+def write_p2p_export(
+    path: str, rows: int, seed: int = 42, chunk_rows: int = 500_000
+) -> str:
+    """
+    Escribe una exportación sintética en CSV generándola por bloques.
+
+    Los tiempos se ordenan dentro de cada bloque y los bloques cubren el mismo
+    rango de fechas, igual que al concatenar varias exportaciones.
+
+    Returns:
+        La ruta escrita.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "wb") as f:
+        for start in range(0, rows, chunk_rows):
+            chunk = generate_p2p_export(min(chunk_rows, rows - start), seed, start)
+            chunk.write_csv(f, include_header=start == 0)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10_000, help="Número de filas")
+    parser.add_argument("--out", required=True, help="Ruta del CSV a generar")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla aleatoria")
+    args = parser.parse_args()
+    write_p2p_export(args.out, args.rows, args.seed)
+    print(f"{args.rows:,} filas escritas en {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,20 @@ import logging
 from .utils import parse_amount  # Importar parse_amount de utils
 from . import finance_utils  # Usar import relativo si está en el mismo paquete src
 from . import counterparty_analyzer  # Importar el módulo de análisis de contrapartes
+from . import counterparty_graph
+from . import counterparty_segments
 from . import session_analyzer  # Importar el nuevo módulo de análisis de sesiones
+from . import payment_analytics
+from . import seasonality
+from . import cost_basis
+from . import inventory
+from . import tbt_analyzer
+from . import vwap_analyzer
 import numpy as np  # Añadir numpy para FFT
-from sklearn.ensemble import IsolationForest
 from datetime import datetime, timedelta, timezone
 from .transformations.numeric import process_numeric_columns
+from .instrumentation import stage_clock
+from .transformations.fx import apply_fx_normalization
 from .transformations.patches import (
     patch_usdt_usd_price,
     create_total_price_usd_equivalent,
@@ -25,9 +34,15 @@ logger = logging.getLogger(__name__)
 
 
 def analyze(
-    df: pl.DataFrame, col_map: dict, sell_config: dict, cli_args: dict | None = None
+    df: pl.DataFrame,
+    col_map: dict,
+    sell_config: dict,
+    cli_args: dict | None = None,
+    output_dir: str | None = None,
 ) -> tuple[pl.DataFrame, dict[str, pl.DataFrame | pl.Series]]:
     logger.info("Iniciando análisis con Polars...")
+    # Cada sub-etapa se registra en run_profile.json desde la vuelta anterior
+    clock = stage_clock()
     df_processed = df.clone()
 
     order_type_col = "order_type"
@@ -45,6 +60,7 @@ def analyze(
 
     # Procesamiento de columnas numéricas
     df_processed = process_numeric_columns(df_processed)
+    clock.lap("analyze.numeric_parsing", rows=df_processed.height)
 
     # Aplicar parche de corrección de precios USDT/USD
     if (
@@ -138,6 +154,9 @@ def analyze(
         )
 
     df_processed = create_total_price_usd_equivalent(df_processed)
+    # Tasas de referencia (as-of) para todas las fiats y activos, si hay tabla
+    df_processed = apply_fx_normalization(df_processed, (sell_config or {}).get("fx"))
+    clock.lap("analyze.fx", rows=df_processed.height)
 
     if "MakerFee_num" not in df_processed.columns:
         df_processed = df_processed.with_columns(
@@ -212,6 +231,8 @@ def analyze(
             "Columnas de tiempo pre-procesadas verificadas y parecen correctas."
         )
 
+    clock.lap("analyze.prepare", rows=df_processed.height)
+
     metrics: dict[str, pl.DataFrame | pl.Series] = {}
     logger.info("Calculando métricas con Polars...")
 
@@ -303,6 +324,45 @@ def analyze(
                 )
                 metrics[f"counterparty_{key}"] = pl.DataFrame()
 
+    clock.lap("analyze.counterparty", rows=df_processed.height)
+
+    # --- Segmentación de contrapartes (MiniBatchKMeans, modelo persistido) ---
+    segments_config = (sell_config or {}).get("counterparty_segments", {})
+    if segments_config.get("enabled", True):
+        try:
+            cp_metrics = {
+                key: metrics[f"counterparty_{key}"]
+                for key in ("general_stats", "efficiency_stats", "trading_patterns", "payment_preferences")
+                if f"counterparty_{key}" in metrics
+            }
+            # Modelo de la categoría (ver main_logic.execute_analysis)
+            model_path = counterparty_segments.segments_model_path(segments_config, output_dir)
+            for key, value in counterparty_segments.assign_segments(
+                cp_metrics, segments_config, model_path
+            ).items():
+                metrics[f"counterparty_{key}"] = value
+        except Exception as e:
+            logger.error(f"Error segmentando contrapartes: {e}")
+        clock.lap("analyze.counterparty_segments", rows=df_processed.height)
+
+    # --- Grafo de relaciones: recurrencia, reciprocidad, cohortes y abandono ---
+    graph_config = (sell_config or {}).get("counterparty_graph", {})
+    try:
+        for key, value in counterparty_graph.analyze_counterparty_graph(
+            df_processed,
+            churn_multiplier=graph_config.get(
+                "churn_multiplier", counterparty_graph.DEFAULT_CHURN_MULTIPLIER
+            ),
+            churn_min_days=graph_config.get(
+                "churn_min_days", counterparty_graph.DEFAULT_CHURN_MIN_DAYS
+            ),
+            bin_edges_days=graph_config.get("repeat_bin_edges_days"),
+        ).items():
+            metrics[f"counterparty_graph_{key}"] = value
+    except Exception as e:
+        logger.error(f"Error calculando el grafo de contrapartes: {e}")
+    clock.lap("analyze.counterparty_graph", rows=df_processed.height)
+
     # --- NUEVO: Análisis de Sesiones de Trading ---
     logger.info("Iniciando análisis avanzado de sesiones de trading...")
     try:
@@ -328,6 +388,82 @@ def analyze(
     except Exception as e:
         logger.error(f"Error en análisis de sesiones: {e}")
         # Continuar con el análisis normal aunque falle el análisis de sesiones
+    clock.lap("analyze.sessions", rows=df_processed.height)
+
+    # --- Costo de inventario y P&L realizado (FIFO/LIFO/promedio) ---
+    cost_basis_method = (sell_config or {}).get("cost_basis", {}).get(
+        "method", cost_basis.DEFAULT_COST_BASIS_METHOD
+    )
+    try:
+        for key, value in cost_basis.analyze_cost_basis(
+            df_processed, method=cost_basis_method
+        ).items():
+            metrics[f"cost_basis_{key}"] = value
+    except Exception as e:
+        logger.error(f"Error calculando el costo de inventario: {e}")
+    clock.lap("analyze.cost_basis", rows=df_processed.height)
+
+    # --- VWAP intradía por lado y spread realizado ---
+    vwap_buckets = (sell_config or {}).get("vwap", {}).get(
+        "buckets", vwap_analyzer.DEFAULT_VWAP_BUCKETS
+    )
+    try:
+        for bucket, table in vwap_analyzer.analyze_vwap_spread(
+            df_processed, buckets=vwap_buckets
+        ).items():
+            metrics[f"vwap_{bucket}"] = table
+    except Exception as e:
+        logger.error(f"Error calculando VWAP/spread: {e}")
+    clock.lap("analyze.vwap", rows=df_processed.height)
+
+    # --- Inventario y exposición en el tiempo (sumas acumuladas por par) ---
+    inventory_intervals = (sell_config or {}).get("inventory", {}).get(
+        "snapshots", inventory.DEFAULT_SNAPSHOT_INTERVALS
+    )
+    try:
+        for key, value in inventory.analyze_inventory(
+            df_processed, snapshot_intervals=inventory_intervals
+        ).items():
+            metrics[f"inventory_{key}"] = value
+    except Exception as e:
+        logger.error(f"Error calculando la serie de inventario: {e}")
+    clock.lap("analyze.inventory", rows=df_processed.height)
+
+    # --- Tiempo entre operaciones (TBT) global, por contraparte, método y hora ---
+    tbt_bin_edges = (sell_config or {}).get("tbt", {}).get(
+        "bin_edges_minutes", tbt_analyzer.DEFAULT_TBT_BIN_EDGES_MINUTES
+    )
+    try:
+        for key, value in tbt_analyzer.analyze_time_between_trades(
+            df_processed, bin_edges_minutes=tbt_bin_edges
+        ).items():
+            metrics[f"tbt_{key}"] = value
+    except Exception as e:
+        logger.error(f"Error calculando el tiempo entre operaciones: {e}")
+    clock.lap("analyze.tbt", rows=df_processed.height)
+
+    # --- Estacionalidad de volumen y operaciones por fiat (FFT) ---
+    seasonality_config = (sell_config or {}).get("seasonality", {})
+    try:
+        for key, value in seasonality.analyze_seasonality(
+            df_processed,
+            frequencies=seasonality_config.get(
+                "frequencies", seasonality.DEFAULT_SEASONALITY_FREQUENCIES
+            ),
+            top_peaks=seasonality_config.get("top_peaks", seasonality.DEFAULT_TOP_PEAKS),
+        ).items():
+            metrics[f"seasonality_{key}"] = value
+    except Exception as e:
+        logger.error(f"Error calculando la estacionalidad: {e}")
+    clock.lap("analyze.seasonality", rows=df_processed.height)
+
+    # --- Rendimiento por método de pago (un cubo con un solo group_by) ---
+    try:
+        for key, value in payment_analytics.analyze_payment_methods(df_processed).items():
+            metrics[f"payment_method_{key}"] = value
+    except Exception as e:
+        logger.error(f"Error analizando los métodos de pago: {e}")
+    clock.lap("analyze.payment_methods", rows=df_processed.height)
 
     df_completed_for_sales_summary = pl.DataFrame()
     if status_col in df_processed.columns:
@@ -414,7 +550,7 @@ def analyze(
                     pl.col("Price_num").quantile(0.01).alias("p1_price"),
                     pl.col("Price_num").quantile(0.99).alias("p99_price"),
                 ]
-            )
+            ).sort(fiat_type_col)
         else:
             logger.warning(
                 f"No se pueden calcular price_stats. DataFrame vacío o faltan columnas."
@@ -508,15 +644,25 @@ def analyze(
         # --- FIN: Cálculo de serie mensual de operaciones y volumen para serie acumulada ---
 
     if status_col in df_processed.columns:
-        metrics["status_counts"] = df_processed[status_col].value_counts()
+        metrics["status_counts"] = (
+            df_processed[status_col]
+            .value_counts()
+            .sort(["count", status_col], descending=[True, False])
+        )
     else:
         metrics["status_counts"] = pl.Series(dtype=pl.datatypes.UInt32).to_frame()
 
     if order_type_col in df_processed.columns:
-        metrics["side_counts"] = df_processed[order_type_col].value_counts()
+        metrics["side_counts"] = (
+            df_processed[order_type_col]
+            .value_counts()
+            .sort(["count", order_type_col], descending=[True, False])
+        )
     else:
         metrics["side_counts"] = pl.Series(dtype=pl.datatypes.UInt32).to_frame()
 
+    clock.lap("analyze.financial_stats", rows=df_processed.height)
+
     logger.info("Calculando Índice de Liquidez Efectiva (mean_qty/median_qty)...")
     if (
         "Quantity_num" in df_processed.columns
@@ -648,6 +794,8 @@ def analyze(
                 "--event-date no proporcionado. Se omite análisis comparativo Antes/Después."
             )
 
+    clock.lap("analyze.liquidity_whales_event", rows=df_processed.height)
+
     logger.info("Iniciando Detección de Outliers (Isolation Forest) en Price_num...")
     detect_outliers_flag = (
         getattr(cli_args, "detect_outliers", False) if cli_args else False
@@ -682,6 +830,9 @@ def analyze(
 
         if price_data_no_nulls.shape[0] > 0:
             try:
+                # sklearn solo se importa si se pide la detección de outliers
+                from sklearn.ensemble import IsolationForest
+
                 iso_forest = IsolationForest(
                     contamination=contamination_param
                     if contamination_param != "auto"
@@ -749,6 +900,8 @@ def analyze(
             pl.lit(False).alias("is_outlier_price")
         )
 
+    clock.lap("analyze.outliers", rows=df_processed.height)
+
     logger.info("Análisis finalizado.")
     # --- Métricas de riesgo básicas a nivel de precio por fiat (si disponible) ---
     try:
@@ -786,5 +939,6 @@ def analyze(
                 )
     except Exception as _e:
         logger.warning(f"No se pudieron calcular métricas de riesgo básicas: {_e}")
+    clock.lap("analyze.risk", rows=df_processed.height)
 
     return df_processed, metrics
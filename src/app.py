@@ -8,32 +8,40 @@ detallado.
 
 Ejemplo de uso:
     python src/app.py --csv data/p2p.csv --out output_directorio
+    python src/app.py --csv "data/exports/*.csv" data/extra.csv
+    python src/app.py --csv "data/archive/*.csv.gz" data/2024.zip
 
 Módulos requeridos:
     - analyzer: Funciones de análisis principal
     - config_loader: Carga de configuración
     - main_logic: Pipeline de análisis y inicialización
     - unified_reporter: Reporte unificado
-    - filters: Módulo para aplicar filtros genéricos
+    - filters: Plan de filtros (CLI y categorías) compilado en un único predicado
+    - ingest: Carga de uno o varios CSV (rutas o globs) con deduplicación
+    - categoricals: Normalización de columnas de baja cardinalidad a Categorical
     - time_features: Módulo para procesar columnas de tiempo
 """
 from __future__ import annotations
 
 import argparse
 import logging
+import multiprocessing
 import os
-from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 from pathlib import Path
 
 import polars as pl
 import polars.exceptions
 
-from .analyzer import analyze
 from .config_loader import load_config
 from .main_logic import initialize_analysis, AnalysisRunner
-from .unified_reporter import UnifiedReporter
 from .logging_config import setup_logging
-from .filters import apply_filters
+from .filters import FilterPlan
+from .instrumentation import get_profiler, stage
+from .ingest import csv_name_candidates, load_input_data
+from .transformations.categoricals import normalize_categorical_columns
+from .transformations.numeric import process_numeric_columns
 from .transformations.time_features import process_time_features
 
 import datetime
@@ -68,12 +76,17 @@ MAIN_CATEGORIES = {
 
 
 def _load_csv_with_schema_override(
-    csv_path: str, column_map_config: Dict[str, str]
+    csv_path: Union[str, Sequence[str]], column_map_config: Dict[str, Any]
 ) -> pl.DataFrame:
-    """Carga el archivo CSV con override de esquema para columnas específicas.
+    """Carga uno o varios archivos CSV con override de esquema para columnas específicas.
+
+    Acepta rutas y patrones glob, en CSV plano o comprimido (`.csv.gz`,
+    `.csv.zst`, `.zip`). Con varios archivos, las exportaciones se
+    parsean en paralelo, se reconcilian sus cabeceras y se eliminan las
+    órdenes duplicadas (ver `ingest.load_input_data`).
 
     Args:
-        csv_path: Ruta al archivo CSV
+        csv_path: Ruta, patrón glob o lista de ellos
         column_map_config: Mapeo de columnas de configuración
 
     Returns:
@@ -85,22 +98,7 @@ def _load_csv_with_schema_override(
         polars.exceptions.SchemaError: Si hay problemas de esquema
         polars.exceptions.ComputeError: Si hay errores de cómputo de Polars
     """
-    csv_order_number_col = column_map_config.get("order_number", "Order Number")
-    csv_adv_order_number_col = column_map_config.get(
-        "adv_order_number", "Advertisement Order Number"
-    )
-
-    csv_column_types_override: Dict[str, Any] = {
-        csv_order_number_col: pl.String,
-        csv_adv_order_number_col: pl.String,
-    }
-
-    raw_df = pl.read_csv(
-        source=csv_path,
-        infer_schema_length=10000,
-        null_values=["", "NA", "N/A", "NaN", "null"],
-        schema_overrides=csv_column_types_override,
-    )
+    raw_df = load_input_data(csv_path, column_map_config)
 
     logger.info(
         f"Datos cargados exitosamente: {raw_df.shape[0]} filas, "
@@ -110,26 +108,25 @@ def _load_csv_with_schema_override(
 
 
 def _rename_columns_from_config(
-    df: pl.DataFrame, column_map_config: Dict[str, str]
+    df: pl.DataFrame, column_map_config: Dict[str, Any]
 ) -> pl.DataFrame:
     """Renombra las columnas del DataFrame según la configuración.
 
     Args:
         df: DataFrame a procesar
-        column_map_config: Mapeo de nombres de columnas
+        column_map_config: Mapeo de nombres de columnas (un nombre o una lista
+            de nombres alternativos por columna interna)
 
     Returns:
         DataFrame con columnas renombradas
     """
-    column_rename_map: Dict[str, str] = {
-        csv_col_name: script_col_name
-        for script_col_name, csv_col_name in column_map_config.items()
-        if (
-            csv_col_name
-            and csv_col_name in df.columns
-            and csv_col_name != script_col_name
-        )
-    }
+    column_rename_map: Dict[str, str] = {}
+    for script_col_name, csv_col_names in column_map_config.items():
+        for csv_col_name in csv_name_candidates(csv_col_names):
+            if csv_col_name in df.columns:
+                if csv_col_name != script_col_name:
+                    column_rename_map[csv_col_name] = script_col_name
+                break
 
     if column_rename_map:
         df = df.rename(column_rename_map)
@@ -138,158 +135,152 @@ def _rename_columns_from_config(
     return df
 
 
-def _apply_fiat_filter(df: pl.DataFrame, fiat_filters: List[str]) -> pl.DataFrame:
-    """Aplica filtros de tipo FIAT al DataFrame.
+def _parse_cli_date(value: Optional[str], arg_name: str) -> Optional[datetime.date]:
+    """Convierte una fecha YYYY-MM-DD de la CLI; devuelve None si es inválida."""
+    if not value:
+        return None
+    try:
+        return datetime.datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        logger.warning(
+            f"Fecha '{value}' inválida para {arg_name}. Use YYYY-MM-DD. Se ignora el filtro."
+        )
+        return None
 
-    Args:
-        df: DataFrame a filtrar
-        fiat_filters: Lista de tipos FIAT a incluir
 
-    Returns:
-        DataFrame filtrado
-    """
-    if not fiat_filters or INTERNAL_FIAT_COLUMN not in df.columns:
-        return df
-
-    processed_filters = [f.strip().upper() for f in fiat_filters]
-    filtered_df = df.filter(
-        pl.col(INTERNAL_FIAT_COLUMN)
-        .str.to_uppercase()
-        .str.strip_chars()
-        .is_in(processed_filters)
-    )
-    logger.info(f"Filtro por FIAT aplicado: {processed_filters}")
-    return filtered_df
+def _build_filter_plan(
+    cli_args: argparse.Namespace, category_filters: Dict[str, List[str]]
+) -> FilterPlan:
+    """Compila los filtros de la CLI y de la categoría actual en un único plan.
 
-
-def _apply_asset_filter(df: pl.DataFrame, asset_filters: List[str]) -> pl.DataFrame:
-    """Aplica filtros de tipo Asset al DataFrame.
+    Si la CLI y la categoría filtran la misma columna, se exigen ambos filtros.
 
     Args:
-        df: DataFrame a filtrar
-        asset_filters: Lista de tipos de asset a incluir
+        cli_args: Argumentos parseados de la línea de comandos.
+        category_filters: Filtros de `MAIN_CATEGORIES` (columna -> valores).
 
     Returns:
-        DataFrame filtrado
+        FilterPlan con los filtros de valores, mes, rango de fechas y montos.
     """
-    if not asset_filters or INTERNAL_ASSET_COLUMN not in df.columns:
-        return df
-
-    processed_filters = [a.strip().upper() for a in asset_filters]
-    filtered_df = df.filter(
-        pl.col(INTERNAL_ASSET_COLUMN)
-        .str.to_uppercase()
-        .str.strip_chars()
-        .is_in(processed_filters)
+    plan = FilterPlan()
+    plan.add_values(INTERNAL_FIAT_COLUMN, cli_args.fiat_filter)
+    plan.add_values(INTERNAL_ASSET_COLUMN, cli_args.asset_filter)
+    plan.add_values(INTERNAL_STATUS_COLUMN, cli_args.status_filter)
+    plan.add_values(INTERNAL_PAYMENT_METHOD_COLUMN, cli_args.payment_method_filter)
+    for column, values in category_filters.items():
+        plan.add_values(column, values, name=f"categoría: {column} in {values}")
+
+    # initialize_analysis ya validó --mes y guardó el número de mes
+    plan.add_month(getattr(cli_args, "month_number", None))
+    plan.add_date_range(
+        _parse_cli_date(getattr(cli_args, "date_from", None), "--date_from"),
+        _parse_cli_date(getattr(cli_args, "date_to", None), "--date_to"),
     )
-    logger.info(f"Filtro por Asset aplicado: {processed_filters}")
-    return filtered_df
+    plan.add_amount_range(
+        getattr(cli_args, "min_amount", None), getattr(cli_args, "max_amount", None)
+    )
+    return plan
+
 
+def _load_and_prepare_base_data(
+    cli_args: argparse.Namespace, column_map_config: Dict[str, Any]
+) -> Optional[pl.DataFrame]:
+    """Carga y pre-procesa los datos una sola vez, sin aplicar filtros.
 
-def _apply_status_filter(df: pl.DataFrame, status_filters: List[str]) -> pl.DataFrame:
-    """Aplica filtros de estado al DataFrame.
+    Renombra columnas, normaliza las categóricas y genera las columnas de
+    tiempo. Si hay límites de monto, también crea las columnas numéricas. El
+    resultado es la base común de la que se derivan todas las categorías.
 
     Args:
-        df: DataFrame a filtrar
-        status_filters: Lista de estados a incluir
+        cli_args: Argumentos parseados de la línea de comandos.
+        column_map_config: Mapeo de nombres de columnas desde la config.
 
     Returns:
-        DataFrame filtrado
+        Un DataFrame de Polars pre-procesado o None si ocurre un error crítico.
     """
-    if not status_filters or INTERNAL_STATUS_COLUMN not in df.columns:
-        return df
-
-    processed_filters = [s.strip().capitalize() for s in status_filters]
-    filtered_df = df.filter(
-        pl.col(INTERNAL_STATUS_COLUMN)
-        .str.to_titlecase()
-        .str.strip_chars()
-        .is_in(processed_filters)
-    )
-    logger.info(f"Filtro por Status aplicado: {processed_filters}")
-    return filtered_df
+    logger.info(f"Iniciando carga de datos desde CSV: {cli_args.csv}")
+    try:
+        with stage("ingest") as ingest_stage:
+            raw_df = _load_csv_with_schema_override(cli_args.csv, column_map_config)
+            ingest_stage["rows"] = raw_df.height
+    except FileNotFoundError:
+        logger.error(f"Archivo CSV no encontrado en la ruta: {cli_args.csv}")
+        return None
+    except polars.exceptions.NoDataError:
+        logger.error(f"El archivo CSV está vacío: {cli_args.csv}")
+        return None
+    except (polars.exceptions.SchemaError, polars.exceptions.ComputeError) as e:
+        logger.error(f"Error de Polars al cargar o procesar el CSV: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"Error inesperado al cargar el CSV: {e}")
+        return None
 
+    if raw_df.is_empty():
+        logger.warning(
+            "El DataFrame está vacío después de la carga. No hay datos para analizar."
+        )
+        return raw_df
 
-def _apply_payment_method_filter(
-    df: pl.DataFrame, payment_method_filters: List[str]
-) -> pl.DataFrame:
-    """Aplica filtros de método de pago al DataFrame.
+    with stage("rename", rows=raw_df.height):
+        df_renamed = _rename_columns_from_config(raw_df, column_map_config)
+    # Canonicalizar una sola vez fiat/asset/status/etc.; filtros y group_by
+    # trabajan después sobre códigos de categoría
+    with stage("categoricals", rows=raw_df.height):
+        df_renamed = normalize_categorical_columns(df_renamed)
 
-    Args:
-        df: DataFrame a filtrar
-        payment_method_filters: Lista de métodos de pago a incluir
+    # Procesamiento de columnas de tiempo en módulo dedicado
+    match_time_col = "match_time_utc"
+    with stage("time_features", rows=raw_df.height):
+        df_renamed = process_time_features(df_renamed, match_time_col)
+    if df_renamed is None:
+        return None
+    # --- Fin módulo de tiempo ---
 
-    Returns:
-        DataFrame filtrado
-    """
-    if not payment_method_filters or INTERNAL_PAYMENT_METHOD_COLUMN not in df.columns:
-        return df
+    if (
+        getattr(cli_args, "min_amount", None) is not None
+        or getattr(cli_args, "max_amount", None) is not None
+    ):
+        # Los límites de monto necesitan TotalPrice_num; analyze reutiliza la columna
+        with stage("numeric_parsing", rows=df_renamed.height):
+            df_renamed = process_numeric_columns(df_renamed)
 
-    filtered_df = df.filter(
-        pl.col(INTERNAL_PAYMENT_METHOD_COLUMN).is_in(payment_method_filters)
+    logger.info(
+        f"Carga y pre-procesamiento completados: {df_renamed.shape[0]} filas."
     )
-    logger.info(f"Filtro por Payment Method aplicado: {payment_method_filters}")
-    return filtered_df
+    return df_renamed
 
 
-def _apply_month_filter(
-    df: pl.DataFrame, month_number: int, month_name: str
+def _filter_for_category(
+    base_df: pl.DataFrame,
+    cli_args: argparse.Namespace,
+    category_filters: Dict[str, Any],
 ) -> pl.DataFrame:
-    """Aplica filtro de mes específico al DataFrame.
+    """Deriva el DataFrame de una categoría a partir de la base pre-procesada.
+
+    Todos los filtros (CLI, categoría, mes, fechas, montos) se evalúan en una
+    sola pasada sobre la base, sin volver a leer el CSV.
 
     Args:
-        df: DataFrame a filtrar
-        month_number: Número del mes (1-12)
-        month_name: Nombre del mes para logging
+        base_df: Resultado de `_load_and_prepare_base_data`.
+        cli_args: Argumentos parseados de la línea de comandos.
+        category_filters: Filtros de la categoría (columna -> valores).
 
     Returns:
-        DataFrame filtrado por el mes especificado
+        DataFrame filtrado para la categoría.
     """
-    if "Match_time_local" not in df.columns:
-        logger.warning(
-            f"Columna 'Match_time_local' no encontrada. "
-            f"No se puede aplicar filtro de mes {month_name}."
-        )
-        return df
-
-    try:
-        # Asegurarse que la columna de fecha es de tipo Datetime
-        if not isinstance(df["Match_time_local"].dtype, pl.Datetime):
-            logger.warning(
-                f"Columna 'Match_time_local' no es de tipo Datetime. "
-                f"Intentando conversión para filtro de mes {month_name}."
-            )
-            # Intentar convertirla, asumiendo un formato común si es string.
-            # Esta es una solución temporal. Idealmente, el preprocesamiento asegura el tipo correcto.
-            try:
-                df = df.with_columns(
-                    pl.col("Match_time_local").str.to_datetime(
-                        format="%Y-%m-%d %H:%M:%S%.f",
-                        strict=False,  # Ajusta el formato si es necesario
-                    )
-                )
-            except polars.exceptions.ComputeError as e:
-                logger.error(
-                    f"Error convirtiendo 'Match_time_local' a Datetime: {e}. "
-                    f"No se aplicará filtro de mes."
-                )
-                return df
-
-        filtered_df = df.filter(pl.col("Match_time_local").dt.month() == month_number)
-        logger.info(f"Filtro por mes aplicado: {month_name} ({month_number})")
-        return filtered_df
-
-    except Exception as e:  # Captura errores más generales durante el filtrado
-        logger.error(
-            f"Error inesperado aplicando filtro de mes {month_name}: {e}. "
-            f"No se aplicará el filtro."
-        )
-        return df
+    filter_plan = _build_filter_plan(cli_args, category_filters)
+    if len(filter_plan) == 0:
+        return base_df
+    with stage("filters") as filter_stage:
+        df_filtered = filter_plan.apply(base_df)
+        filter_stage["rows"] = df_filtered.height
+    return df_filtered
 
 
 def _load_and_preprocess_input_data(
     cli_args: argparse.Namespace,
-    column_map_config: Dict[str, str],
+    column_map_config: Dict[str, Any],
     current_category_filters: Dict[str, Any],
     config: Dict[str, Any],
 ) -> Optional[pl.DataFrame]:
@@ -302,78 +293,132 @@ def _load_and_preprocess_input_data(
         cli_args: Argumentos parseados de la línea de comandos.
         column_map_config: Mapeo de nombres de columnas desde la config.
         current_category_filters: Filtros específicos para la categoría actual
+            (se combinan con los de la CLI en un único `FilterPlan`)
         config: Configuración general del análisis
 
     Returns:
         Un DataFrame de Polars procesado o None si ocurre un error crítico.
     """
-    logger.info(f"Iniciando carga de datos desde CSV: {cli_args.csv}")
-    try:
-        raw_df = _load_csv_with_schema_override(cli_args.csv, column_map_config)
-    except FileNotFoundError:
-        logger.error(f"Archivo CSV no encontrado en la ruta: {cli_args.csv}")
-        return None
-    except polars.exceptions.NoDataError:
-        logger.error(f"El archivo CSV está vacío: {cli_args.csv}")
-        return None
-    except (polars.exceptions.SchemaError, polars.exceptions.ComputeError) as e:
-        logger.error(f"Error de Polars al cargar o procesar el CSV: {e}")
-        return None
-    except Exception as e:
-        logger.error(f"Error inesperado al cargar el CSV: {e}")
-        return None
+    base_df = _load_and_prepare_base_data(cli_args, column_map_config)
+    if base_df is None or base_df.is_empty():
+        return base_df
 
-    if raw_df.is_empty():
-        logger.warning(
-            "El DataFrame está vacío después de la carga. No hay datos para analizar."
-        )
-        return raw_df
+    df_filtered = _filter_for_category(base_df, cli_args, current_category_filters)
+    logger.info(
+        f"Carga y filtrado completados. DataFrame resultante: {df_filtered.shape[0]} filas."
+    )
+    return df_filtered
 
-    df_renamed = _rename_columns_from_config(raw_df, column_map_config)
 
-    # Aplicar filtros básicos usando módulo genérico
-    base_filters = {
-        "fiat_type": cli_args.fiat_filter or [],
-        "asset_type": cli_args.asset_filter or [],
-        "status": cli_args.status_filter or [],
-        "payment_method": cli_args.payment_method_filter or [],
-    }
-    df_renamed = apply_filters(df_renamed, base_filters)
+def _run_category(
+    category_name: str,
+    df_category: pl.DataFrame,
+    column_map_config: Dict[str, Any],
+    config: Dict[str, Any],
+    cli_args: argparse.Namespace,
+    output_dir: str,
+    clean_filename_suffix_cli: str,
+    analysis_title_suffix_cli: str,
+) -> str:
+    """Ejecuta el análisis completo de una categoría.
 
-    # Procesamiento de columnas de tiempo en módulo dedicado
-    match_time_col = "match_time_utc"
-    df_renamed = process_time_features(df_renamed, match_time_col)
-    if df_renamed is None:
-        return None
-    # --- Fin módulo de tiempo ---
+    Returns:
+        El nombre de la categoría procesada.
+    """
+    logger.info(
+        f"Ejecutando análisis de la categoría '{category_name}' "
+        f"({df_category.height} filas) en: {output_dir}"
+    )
+    runner = AnalysisRunner(
+        df_category,
+        column_map_config,
+        config,
+        cli_args,
+        output_dir,
+        clean_filename_suffix_cli,
+        analysis_title_suffix_cli,
+    )
+    runner.run()
+    return category_name
 
-    # Filtro de mes (después de que Match_time_local se haya creado)
-    if cli_args.mes:
-        month_name_or_num = cli_args.mes.lower()
-        month_number = initialize_analysis.MONTH_NAMES_MAP.get(month_name_or_num)
-        if not month_number:
-            try:
-                month_number = int(month_name_or_num)
-                if not 1 <= month_number <= 12:
-                    logger.warning(
-                        f"Número de mes '{month_name_or_num}' inválido. Se ignora filtro de mes."
-                    )
-                    month_number = None
-            except ValueError:
-                logger.warning(
-                    f"Nombre de mes '{month_name_or_num}' no reconocido. Se ignora filtro de mes."
-                )
-                month_number = None
 
-        if month_number:
-            df_renamed = _apply_month_filter(df_renamed, month_number, cli_args.mes)
+def _run_category_in_worker(*run_args: Any) -> str:
+    """Punto de entrada de `_run_category` en un proceso worker.
+
+    Los procesos se crean con 'spawn', por lo que el logging se configura de
+    nuevo (en modo append para no truncar `log_error.txt`).
+    """
+    cli_args = run_args[4]
+    setup_logging(cli_args.out, cli_args.log_level, error_log_mode="a")
+    return _run_category(*run_args)
+
 
-    # Se eliminan las llamadas a los nuevos filtros avanzados
+def _run_categories(
+    category_jobs: List[Tuple[str, pl.DataFrame, str]],
+    column_map_config: Dict[str, Any],
+    config: Dict[str, Any],
+    cli_args: argparse.Namespace,
+    clean_filename_suffix_cli: str,
+    analysis_title_suffix_cli: str,
+) -> None:
+    """Ejecuta las categorías de forma secuencial o en procesos paralelos.
+
+    matplotlib no es seguro entre hilos, por lo que el paralelismo es por
+    procesos. Se usa el contexto 'spawn' porque hacer fork de un proceso que
+    ya usó el pool de hilos de Polars puede bloquearse.
+
+    Args:
+        category_jobs: Lista de (nombre, DataFrame de la categoría, directorio de salida).
+        column_map_config: Mapeo de nombres de columnas desde la config.
+        config: Configuración general del análisis.
+        cli_args: Argumentos parseados; `category_workers` fija el paralelismo.
+        clean_filename_suffix_cli: Sufijo para nombres de archivo.
+        analysis_title_suffix_cli: Sufijo para títulos.
+    """
+    workers = max(1, getattr(cli_args, "category_workers", 1) or 1)
+    workers = min(workers, len(category_jobs))
+
+    if workers <= 1:
+        for category_name, df_category, output_dir in category_jobs:
+            _run_category(
+                category_name,
+                df_category,
+                column_map_config,
+                config,
+                cli_args,
+                output_dir,
+                clean_filename_suffix_cli,
+                analysis_title_suffix_cli,
+            )
+        return
 
     logger.info(
-        f"Carga y filtrado completados. DataFrame resultante: {df_renamed.shape[0]} filas."
+        f"Procesando {len(category_jobs)} categorías con {workers} procesos en paralelo."
     )
-    return df_renamed
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        futures = {
+            executor.submit(
+                _run_category_in_worker,
+                category_name,
+                df_category,
+                column_map_config,
+                config,
+                cli_args,
+                output_dir,
+                clean_filename_suffix_cli,
+                analysis_title_suffix_cli,
+            ): category_name
+            for category_name, df_category, output_dir in category_jobs
+        }
+        for future in as_completed(futures):
+            category_name = futures[future]
+            try:
+                future.result()
+                logger.info(f"Categoría '{category_name}' completada.")
+            except Exception as e:
+                logger.error(f"Error procesando la categoría '{category_name}': {e}")
 
 
 def main() -> None:
@@ -489,6 +534,14 @@ def main() -> None:
                         else pl.DataFrame(),
                     }
 
+            from .plot_utils import configure_figure_output
+            from .report_assets import configure_report_assets
+            from .unified_reporter import UnifiedReporter
+
+            configure_figure_output(config, draft=getattr(args, "draft", False))
+            configure_report_assets(
+                getattr(args, "report_mode", "standard"), str(output_dir_base / "assets")
+            )
             reporter_unificado = UnifiedReporter(str(output_dir_base), config, args)
             reporter_unificado.generate_unified_report(all_period_data_for_unified_only)
             logger.info(
@@ -499,7 +552,14 @@ def main() -> None:
         logger.info("🎉 Análisis (modo --unified-only) completado.")
         return  # Terminar aquí si es unified_only
 
-    # Bucle principal para procesar categorías (ej. "General")
+    # Los datos se cargan y pre-procesan una sola vez; cada categoría es una
+    # vista filtrada de esta base
+    base_df = _load_and_prepare_base_data(args, column_map_config)
+    if base_df is None or base_df.is_empty():
+        logger.error("No hay datos para analizar después de la carga y el pre-procesamiento.")
+        return
+
+    category_jobs: List[Tuple[str, pl.DataFrame, str]] = []
     for category_name, category_config_map in MAIN_CATEGORIES.items():
         logger.info(f"\n--- Procesando categoría principal: {category_name} ---")
         logger.debug(
@@ -523,16 +583,13 @@ def main() -> None:
             )
             continue  # Saltar a la siguiente categoría
 
-        logger.debug(
-            f"CRITICAL_APP_DEBUG: Antes de _load_and_preprocess_input_data para '{category_name}'"
-        )
-        df_processed_for_category = _load_and_preprocess_input_data(
-            args, column_map_config, current_category_filters, config
+        df_processed_for_category = _filter_for_category(
+            base_df, args, current_category_filters
         )
 
-        if df_processed_for_category is None or df_processed_for_category.is_empty():
+        if df_processed_for_category.is_empty():
             logger.warning(
-                f"No hay datos para procesar en la categoría '{category_name}' después de la carga y preprocesamiento. Saltando execute_analysis."
+                f"No hay datos para procesar en la categoría '{category_name}' después del filtrado. Saltando execute_analysis."
             )
             continue
 
@@ -555,18 +612,25 @@ def main() -> None:
                 "CRITICAL_APP_DEBUG: 'Year' column NOT in df_processed antes de execute_analysis."
             )
 
-        # Ejecutar análisis usando AnalysisRunner
-        runner = AnalysisRunner(
-            df_processed_for_category.clone(),
-            column_map_config,
-            config,
-            args,
-            str(output_dir_for_analysis),
-            clean_filename_suffix_cli,
-            analysis_title_suffix_cli,
+        category_jobs.append(
+            (
+                category_name,
+                df_processed_for_category.clone(),
+                str(output_dir_for_analysis),
+            )
         )
-        runner.run()
 
+    # Ejecutar análisis usando AnalysisRunner (en paralelo si --category_workers > 1)
+    _run_categories(
+        category_jobs,
+        column_map_config,
+        config,
+        args,
+        clean_filename_suffix_cli,
+        analysis_title_suffix_cli,
+    )
+
+    get_profiler().write(str(output_dir_base), chrome_trace=args.chrome_trace)
     logger.info("🎉 Análisis completado para todas las categorías.")
     logger.info("El pipeline de análisis ha finalizado.")
 
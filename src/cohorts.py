@@ -0,0 +1,231 @@
+import logging
+import os
+from typing import Dict, Optional, Tuple
+
+import polars as pl
+
+from .counterparty_graph import cohort_label
+
+logger = logging.getLogger(__name__)
+
+# Salidas globales en <salida>/cohorts/ y estado incremental en <salida>/models/
+COHORTS_DIRNAME = "cohorts"
+COHORT_CELLS_FILENAME = "cohort_cells.parquet"
+COHORT_MAP_FILENAME = "cohort_counterparties.parquet"
+
+CELL_KEYS = ["cohort_index", "months_since_first"]
+
+
+def analyze_cohorts(df: pl.DataFrame, state_dir: Optional[str] = None) -> Dict[str, pl.DataFrame]:
+    """
+    Triángulo de retención y volumen por cohorte (mes de la primera operación).
+
+    Cada operación completada recibe el mes de la primera operación de su
+    contraparte y el desfase en meses respecto de él; las celdas
+    cohorte x desfase salen de un único `group_by` sobre esas dos columnas
+    enteras.
+
+    Con `state_dir`, las celdas y la cohorte de cada contraparte se guardan
+    entre ejecuciones. Como cada diagonal del triángulo corresponde a un mes
+    calendario, si los meses anteriores al último guardado no cambiaron
+    (mismas operaciones y volumen por mes) solo se recalculan las diagonales
+    desde ese último mes, que pudo quedar incompleto, en adelante.
+
+    Args:
+        df: DataFrame con `Counterparty`, `Match_time_local` y
+            `TotalPrice_num` (y `status`, si existe).
+        state_dir: Directorio del estado incremental; None = cálculo completo.
+
+    Returns:
+        Diccionario con 'retention' (una fila por celda), 'retention_matrix'
+        y 'volume_matrix' (cohortes x meses desde la primera operación).
+    """
+    time_col = "Match_time_local"
+    required = ["Counterparty", "TotalPrice_num", time_col]
+    missing = [col for col in required if col not in df.columns]
+    if missing:
+        logger.warning(f"Faltan columnas para las cohortes: {missing}")
+        return {}
+
+    trades = df
+    if "status" in df.columns:
+        trades = trades.filter(pl.col("status").cast(pl.Utf8) == "Completed")
+    trades = trades.filter(
+        pl.col(time_col).is_not_null()
+        & pl.col("Counterparty").is_not_null()
+        & (pl.col("Counterparty").cast(pl.Utf8) != "")
+    ).select(
+        pl.col("Counterparty"),
+        pl.col("TotalPrice_num"),
+        (pl.col(time_col).dt.year().cast(pl.Int32) * 12 + pl.col(time_col).dt.month().cast(pl.Int32) - 1).alias(
+            "month_index"
+        ),
+    )
+    if trades.is_empty():
+        logger.info("Sin operaciones completadas con contraparte para las cohortes.")
+        return {}
+
+    cells, cohort_map = None, None
+    if state_dir:
+        cells, cohort_map = _incremental_cells(trades, state_dir)
+    if cells is None:
+        cells, cohort_map = _full_cells(trades)
+    if state_dir:
+        _save_state(state_dir, cells, cohort_map)
+
+    retention = _retention_table(cells)
+    result = {
+        "retention": retention,
+        "retention_matrix": _triangle(retention, "retention_rate"),
+        "volume_matrix": _triangle(retention, "volume"),
+    }
+    logger.info(
+        f"Cohortes: {result['retention_matrix'].height} cohortes, {retention.height} celdas."
+    )
+    return result
+
+
+def _full_cells(trades: pl.DataFrame) -> Tuple[pl.DataFrame, pl.DataFrame]:
+    """Celdas de todas las operaciones y cohorte de cada contraparte."""
+    with_offsets = trades.with_columns(
+        pl.col("month_index").min().over("Counterparty").alias("cohort_index")
+    ).with_columns((pl.col("month_index") - pl.col("cohort_index")).alias("months_since_first"))
+    cohort_map = with_offsets.group_by("Counterparty").agg(pl.first("cohort_index")).with_columns(
+        pl.col("Counterparty").cast(pl.Utf8)
+    )
+    return _aggregate_cells(with_offsets), cohort_map
+
+
+def _incremental_cells(
+    trades: pl.DataFrame, state_dir: str
+) -> Tuple[Optional[pl.DataFrame], Optional[pl.DataFrame]]:
+    """
+    Actualiza solo las diagonales desde el último mes guardado.
+
+    Devuelve (None, None) si no hay estado o si los meses ya guardados no
+    coinciden con los datos actuales, para forzar el cálculo completo.
+    """
+    stored = _load_state(state_dir)
+    if stored is None:
+        return None, None
+    stored_cells, stored_map = stored
+    calendar = pl.col("cohort_index") + pl.col("months_since_first")
+    last_month = stored_cells.select(calendar.max()).item()
+
+    # Las diagonales cerradas deben coincidir mes a mes con los datos actuales
+    closed = trades.filter(pl.col("month_index") < last_month)
+    current_months = closed.group_by("month_index").agg(
+        pl.len().cast(pl.UInt32).alias("trades"), pl.col("TotalPrice_num").sum().alias("volume")
+    )
+    stored_months = (
+        stored_cells.filter(calendar < last_month)
+        .group_by(calendar.alias("month_index"))
+        .agg(pl.col("trades").sum(), pl.col("volume").sum())
+    )
+    compared = current_months.join(stored_months, on="month_index", how="full", coalesce=True)
+    unchanged = compared.select(
+        (
+            (pl.col("trades") == pl.col("trades_right"))
+            & ((pl.col("volume") - pl.col("volume_right")).abs() <= 1e-6 * pl.col("volume").abs().clip(lower_bound=1.0))
+        )
+        .fill_null(False)
+        .all()
+    ).item()
+    if not unchanged or trades.select(pl.col("month_index").max()).item() < last_month:
+        logger.info("Los meses guardados de las cohortes cambiaron; se recalcula el triángulo completo.")
+        return None, None
+
+    recent = (
+        trades.filter(pl.col("month_index") >= last_month)
+        .with_columns(pl.col("Counterparty").cast(pl.Utf8))
+        .join(stored_map, on="Counterparty", how="left")
+        .with_columns(
+            # Contrapartes nuevas: su cohorte es su primer mes dentro de lo reciente
+            pl.col("cohort_index").fill_null(pl.col("month_index").min().over("Counterparty"))
+        )
+        .with_columns((pl.col("month_index") - pl.col("cohort_index")).alias("months_since_first"))
+    )
+    new_counterparties = recent.join(stored_map, on="Counterparty", how="anti")
+    cohort_map = pl.concat(
+        [
+            stored_map,
+            new_counterparties.group_by("Counterparty").agg(pl.first("cohort_index")),
+        ]
+    )
+    cells = pl.concat([stored_cells.filter(calendar < last_month), _aggregate_cells(recent)])
+    logger.info(
+        f"Cohortes incrementales: {recent.height} operaciones desde {_month_str(last_month)} "
+        f"de {trades.height}; {new_counterparties['Counterparty'].n_unique()} contrapartes nuevas."
+    )
+    return cells, cohort_map
+
+
+def _aggregate_cells(with_offsets: pl.DataFrame) -> pl.DataFrame:
+    return (
+        with_offsets.group_by(CELL_KEYS)
+        .agg(
+            pl.col("Counterparty").n_unique().cast(pl.UInt32).alias("active_counterparties"),
+            pl.len().cast(pl.UInt32).alias("trades"),
+            pl.col("TotalPrice_num").sum().alias("volume"),
+        )
+        .with_columns(pl.col(CELL_KEYS).cast(pl.Int32))
+        .sort(CELL_KEYS)
+    )
+
+
+def _retention_table(cells: pl.DataFrame) -> pl.DataFrame:
+    """Celdas con tamaño de cohorte, retención y volumen acumulado por miembro."""
+    cells = cells.sort(CELL_KEYS)
+    size = pl.col("active_counterparties").filter(pl.col("months_since_first") == 0).first().over("cohort_index")
+    return cells.with_columns(
+        cohort_label(pl.col("cohort_index")).alias("cohort"),
+        cohort_label(pl.col("cohort_index") + pl.col("months_since_first")).alias("period"),
+        size.alias("cohort_size"),
+    ).select(
+        "cohort",
+        "months_since_first",
+        "period",
+        "cohort_size",
+        "active_counterparties",
+        (pl.col("active_counterparties") / pl.col("cohort_size")).alias("retention_rate"),
+        "trades",
+        "volume",
+        pl.col("volume").cum_sum().over("cohort").alias("cumulative_volume"),
+        (pl.col("volume").cum_sum().over("cohort") / pl.col("cohort_size")).alias("cumulative_volume_per_member"),
+    )
+
+
+def _triangle(retention: pl.DataFrame, value: str) -> pl.DataFrame:
+    """Cohortes en filas y `m<desfase>` en columnas."""
+    wide = retention.pivot(
+        on="months_since_first", index=["cohort", "cohort_size"], values=value, sort_columns=True
+    )
+    offsets = sorted(int(col) for col in wide.columns if col not in ("cohort", "cohort_size"))
+    return wide.select(
+        "cohort", "cohort_size", *[pl.col(str(offset)).alias(f"m{offset}") for offset in offsets]
+    ).sort("cohort")
+
+
+def _month_str(month_index: int) -> str:
+    return f"{month_index // 12}-{month_index % 12 + 1:02d}"
+
+
+def _load_state(state_dir: str) -> Optional[Tuple[pl.DataFrame, pl.DataFrame]]:
+    cells_path = os.path.join(state_dir, COHORT_CELLS_FILENAME)
+    map_path = os.path.join(state_dir, COHORT_MAP_FILENAME)
+    if not (os.path.isfile(cells_path) and os.path.isfile(map_path)):
+        return None
+    try:
+        cells, cohort_map = pl.read_parquet(cells_path), pl.read_parquet(map_path)
+    except Exception as e:
+        logger.warning(f"No se pudo leer el estado de cohortes en {state_dir}: {e}")
+        return None
+    if cells.is_empty():
+        return None
+    return cells, cohort_map
+
+
+def _save_state(state_dir: str, cells: pl.DataFrame, cohort_map: pl.DataFrame) -> None:
+    os.makedirs(state_dir, exist_ok=True)
+    cells.write_parquet(os.path.join(state_dir, COHORT_CELLS_FILENAME))
+    cohort_map.write_parquet(os.path.join(state_dir, COHORT_MAP_FILENAME))
@@ -4,6 +4,14 @@ import os  # Necesario para verificar si el archivo existe
 
 logger = logging.getLogger(__name__)
 
+# Política de salida de figuras (sección `figure_output` del config.yaml)
+DEFAULT_FIGURE_OUTPUT = {
+    "dpi": 300,  # Resolución de los PNG
+    "export_vector": True,  # Copias vectoriales de plot_utils.save_figure
+    "vector_formats": ["svg", "pdf"],
+    "draft_dpi": 72,  # Resolución con --draft (solo PNG)
+}
+
 # --- Configuración por Defecto ---
 DEFAULT_CONFIG = {
     "column_mapping": {
@@ -27,6 +35,34 @@ DEFAULT_CONFIG = {
         "include_tables_default": ["asset_stats", "fiat_stats"],
         "include_figures_default": ["hourly_operations"],
     },
+    "figure_output": dict(DEFAULT_FIGURE_OUTPUT),
+    # Regla de costo para el P&L realizado: fifo, lifo o average
+    "cost_basis": {"method": "fifo"},
+    # Ventanas de VWAP/spread (duraciones de Polars) y la que se grafica
+    "vwap": {"buckets": ["5m", "1h", "1d"], "plot_bucket": "1d"},
+    # Intervalos de las fotos de inventario/exposición (duraciones de Polars)
+    "inventory": {"snapshots": ["1d"]},
+    # Segmentación de contrapartes; el modelo se guarda en <salida>/models/
+    # salvo que se indique model_path y se reutiliza en las ejecuciones siguientes
+    "counterparty_segments": {"enabled": True, "n_clusters": 6, "model_path": None, "refit": False},
+    # Abandono: sin operar más de churn_multiplier veces el intervalo mediano
+    # (mínimo churn_min_days días); bordes en días del histograma de recurrencia
+    "counterparty_graph": {
+        "churn_multiplier": 3.0,
+        "churn_min_days": 30,
+        "repeat_bin_edges_days": [0, 1, 3, 7, 14, 30, 60, 90, 180],
+    },
+    # Triángulo de retención por cohorte en <salida>/cohorts/ (incremental)
+    "cohorts": {"enabled": True},
+    # Frecuencias de remuestreo y picos por serie del análisis de estacionalidad
+    "seasonality": {"frequencies": ["1h", "1d"], "top_peaks": 5},
+    # Bordes (en minutos) del histograma de tiempo entre operaciones
+    "tbt": {
+        "bin_edges_minutes": [0, 1, 5, 15, 30, 60, 120, 360, 720, 1440, 2880, 10080, 43200]
+    },
+    # Tabla de tasas a USD (CSV/Parquet con time, currency, usd_rate); sin ella
+    # solo se convierten USD/USDT y UYU/USDT
+    "fx": {"rates_path": None},
 }
 
 
@@ -0,0 +1,416 @@
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+import polars as pl
+
+logger = logging.getLogger(__name__)
+
+COST_BASIS_METHODS = ["fifo", "lifo", "average"]
+DEFAULT_COST_BASIS_METHOD = "fifo"
+
+PAIR_COLUMNS = ["asset_type", "fiat_type"]
+
+# Cantidades por debajo de este umbral se consideran cero (ruido de sumas acumuladas)
+_QTY_EPSILON = 1e-12
+# Ancho (en log) de las épocas del costo promedio; ver _average_unit_costs
+_LOG_EPOCH = 300.0
+
+
+def analyze_cost_basis(
+    df: pl.DataFrame, method: str = DEFAULT_COST_BASIS_METHOD
+) -> Dict[str, pl.DataFrame]:
+    """
+    Casa compras y ventas de cada par activo/fiat y calcula el P&L realizado.
+
+    Las compras (BUY) forman lotes de inventario con su costo unitario
+    (`TotalPrice_num / Quantity_num`); cada venta (SELL) consume lotes según
+    `method`: 'fifo' (los más antiguos), 'lifo' (los más recientes) o
+    'average' (costo promedio ponderado). El casamiento se hace sobre ejes
+    de cantidad acumulada (un interval join con `searchsorted`), sin
+    recorrer las operaciones una a una.
+
+    Las ventas que superan el inventario comprado hasta ese momento (activo
+    que llegó por fuera de P2P) se registran como `uncovered_quantity` y no
+    consumen compras posteriores.
+
+    Args:
+        df: DataFrame procesado por `analyze` (Quantity_num, TotalPrice_num,
+            order_type, asset_type, fiat_type y hora de la operación).
+        method: Regla de costo: 'fifo', 'lifo' o 'average'.
+
+    Returns:
+        Diccionario con:
+            - realized: una fila por venta con costo y P&L realizado
+            - inventory: lotes abiertos ('fifo'/'lifo') o posición por par ('average')
+            - summary: totales por par
+    """
+    if method not in COST_BASIS_METHODS:
+        logger.warning(
+            f"Método de costo '{method}' desconocido. Se usa '{DEFAULT_COST_BASIS_METHOD}'."
+        )
+        method = DEFAULT_COST_BASIS_METHOD
+
+    fills = prepare_fills(df)
+    if fills is None or fills.is_empty():
+        logger.info("Sin operaciones completadas de compra/venta para el costo de inventario.")
+        return {}
+
+    realized_parts: List[pl.DataFrame] = []
+    inventory_parts: List[pl.DataFrame] = []
+    for pair_fills in fills.partition_by(PAIR_COLUMNS, maintain_order=True):
+        realized, inventory = _match_pair(pair_fills, method)
+        realized_parts.append(realized)
+        inventory_parts.append(inventory)
+
+    realized = pl.concat(realized_parts, how="vertical_relaxed")
+    inventory = pl.concat(inventory_parts, how="vertical_relaxed")
+    summary = _summarize(realized, inventory, method)
+    logger.info(
+        f"Costo de inventario ({method}): {realized.height} ventas casadas en "
+        f"{summary.height} pares, {inventory.height} posiciones abiertas."
+    )
+    return {"realized": realized, "inventory": inventory, "summary": summary}
+
+
+def completed_fills(df: pl.DataFrame) -> Optional[pl.DataFrame]:
+    """
+    Operaciones completadas de compra/venta normalizadas y ordenadas.
+
+    Columnas: asset_type, fiat_type, order_number, time, is_buy, quantity
+    (Quantity_num) y value (TotalPrice_num), ordenadas por par y hora (a
+    igual hora, en el orden original).
+
+    Returns:
+        El DataFrame (posiblemente vacío) o None si faltan columnas.
+    """
+    time_col = "Match_time_local" if "Match_time_local" in df.columns else "Match_time_utc_dt"
+    required = PAIR_COLUMNS + ["order_type", "Quantity_num", "TotalPrice_num", time_col]
+    missing = [col for col in required if col not in df.columns]
+    if missing:
+        logger.warning(f"Faltan columnas de operaciones para compras/ventas: {missing}")
+        return None
+
+    fills = df
+    if "status" in df.columns:
+        fills = fills.filter(pl.col("status").cast(pl.Utf8) == "Completed")
+    order_number = (
+        pl.col("order_number").cast(pl.Utf8)
+        if "order_number" in df.columns
+        else pl.lit(None, dtype=pl.Utf8)
+    )
+    side = pl.col("order_type").cast(pl.Utf8).str.to_uppercase()
+    return (
+        fills.with_row_index("_row")
+        .filter(
+            side.is_in(["BUY", "SELL"])
+            & (pl.col("Quantity_num") > 0)
+            & pl.col("TotalPrice_num").is_not_null()
+            & pl.col(time_col).is_not_null()
+        )
+        .select(
+            pl.col("asset_type").cast(pl.Utf8),
+            pl.col("fiat_type").cast(pl.Utf8),
+            order_number.alias("order_number"),
+            pl.col(time_col).alias("time"),
+            (side == "BUY").alias("is_buy"),
+            pl.col("Quantity_num").cast(pl.Float64).alias("quantity"),
+            pl.col("TotalPrice_num").cast(pl.Float64).alias("value"),
+            pl.col("_row"),
+        )
+        .sort(PAIR_COLUMNS + ["time", "_row"])
+        .drop("_row")
+    )
+
+
+def prepare_fills(df: pl.DataFrame) -> Optional[pl.DataFrame]:
+    """
+    Normaliza las operaciones completadas a un eje de inventario por par.
+
+    Sobre `completed_fills` añade (por par, en orden temporal):
+    `matched_quantity` (parte de la venta cubierta por compras previas),
+    `uncovered_quantity`, `sold_cum` (ventas cubiertas acumuladas),
+    `bought_cum` e `inventory` (cantidad en inventario tras la operación).
+    """
+    fills = completed_fills(df)
+    if fills is None or fills.is_empty():
+        return fills
+
+    bought = pl.when(pl.col("is_buy")).then(pl.col("quantity")).otherwise(0.0)
+    sold = pl.when(pl.col("is_buy")).then(0.0).otherwise(pl.col("quantity"))
+    fills = fills.with_columns(
+        bought.cum_sum().over(PAIR_COLUMNS).alias("bought_cum"),
+        sold.cum_sum().over(PAIR_COLUMNS).alias("_sold_total_cum"),
+    )
+    # Faltante acumulado: lo vendido por encima de lo comprado hasta el momento
+    fills = fills.with_columns(
+        (pl.col("_sold_total_cum") - pl.col("bought_cum"))
+        .clip(lower_bound=0.0)
+        .cum_max()
+        .over(PAIR_COLUMNS)
+        .alias("_shortfall")
+    )
+    fills = fills.with_columns(
+        (pl.col("_shortfall") - pl.col("_shortfall").shift(1, fill_value=0.0).over(PAIR_COLUMNS))
+        .clip(lower_bound=0.0)
+        .alias("uncovered_quantity")
+    )
+    return fills.with_columns(
+        pl.when(pl.col("is_buy"))
+        .then(0.0)
+        .otherwise(pl.col("quantity") - pl.col("uncovered_quantity"))
+        .alias("matched_quantity"),
+        (pl.col("_sold_total_cum") - pl.col("_shortfall")).alias("sold_cum"),
+        (pl.col("bought_cum") - pl.col("_sold_total_cum") + pl.col("_shortfall"))
+        .clip(lower_bound=0.0)
+        .alias("inventory"),
+    ).drop("_sold_total_cum", "_shortfall")
+
+
+def _match_pair(fills: pl.DataFrame, method: str):
+    """Costo de las ventas y posición abierta de un único par."""
+    is_buy = fills.get_column("is_buy").to_numpy()
+    quantity = fills.get_column("quantity").to_numpy()
+    value = fills.get_column("value").to_numpy()
+    matched = fills.get_column("matched_quantity").to_numpy()
+    inventory = fills.get_column("inventory").to_numpy()
+    sold_cum = fills.get_column("sold_cum").to_numpy()
+    bought_cum = fills.get_column("bought_cum").to_numpy()
+
+    buy_idx = np.flatnonzero(is_buy)
+    sell_idx = np.flatnonzero(~is_buy)
+    unit_cost = value[buy_idx] / quantity[buy_idx]
+
+    if method == "average":
+        sell_cost, open_qty = _average_cost(is_buy, quantity, value, matched, inventory)
+    elif method == "lifo":
+        sell_cost, open_qty = _lifo_cost(is_buy, inventory, unit_cost)
+    else:
+        sell_cost, open_qty = _fifo_cost(
+            bought_cum[buy_idx] - quantity[buy_idx],
+            bought_cum[buy_idx],
+            sold_cum[sell_idx] - matched[sell_idx],
+            matched[sell_idx],
+            unit_cost,
+        )
+
+    sells = fills[sell_idx]
+    realized = sells.select(
+        "asset_type",
+        "fiat_type",
+        "order_number",
+        "time",
+        "quantity",
+        pl.col("value").alias("proceeds"),
+        "matched_quantity",
+        "uncovered_quantity",
+    ).with_columns(pl.Series("cost_basis", sell_cost, dtype=pl.Float64))
+    covered = pl.col("matched_quantity") > _QTY_EPSILON
+    realized = realized.with_columns(
+        pl.when(covered).then(pl.col("cost_basis")).otherwise(None).alias("cost_basis"),
+        pl.when(covered)
+        .then(pl.col("proceeds") * pl.col("matched_quantity") / pl.col("quantity") - pl.col("cost_basis"))
+        .otherwise(None)
+        .alias("realized_pnl"),
+        pl.lit(method).alias("method"),
+    )
+
+    if method == "average":
+        final_qty = float(inventory[-1])
+        inventory_df = fills[-1:].select("asset_type", "fiat_type").with_columns(
+            pl.lit(None, dtype=pl.Utf8).alias("order_number"),
+            pl.lit(None, dtype=fills.schema["time"]).alias("time"),
+            pl.lit(final_qty).alias("open_quantity"),
+            pl.lit(open_qty / final_qty if final_qty > _QTY_EPSILON else None, dtype=pl.Float64).alias(
+                "unit_cost"
+            ),
+        )
+    else:
+        inventory_df = fills[buy_idx].select("asset_type", "fiat_type", "order_number", "time").with_columns(
+            pl.Series("open_quantity", open_qty, dtype=pl.Float64),
+            pl.Series("unit_cost", unit_cost, dtype=pl.Float64),
+        )
+    inventory_df = (
+        inventory_df.filter(pl.col("open_quantity") > _QTY_EPSILON)
+        .with_columns((pl.col("open_quantity") * pl.col("unit_cost")).alias("cost_basis"))
+        .with_columns(pl.lit(method).alias("method"))
+    )
+    return realized, inventory_df
+
+
+def _fifo_cost(buy_start, buy_end, sell_start, sell_qty, unit_cost):
+    """
+    FIFO como interval join de cantidades acumuladas.
+
+    Compras y ventas cubiertas ocupan intervalos consecutivos
+    `[inicio, fin)` de sus ejes acumulados; cada tramo entre dos bordes
+    pertenece a una sola compra y a una sola venta.
+
+    Returns:
+        (costo por venta, cantidad abierta por compra)
+    """
+    has_qty = sell_qty > _QTY_EPSILON
+    sold_total = float((sell_start + sell_qty)[has_qty].max()) if has_qty.any() else 0.0
+    sell_cost = np.zeros(sell_start.shape[0])
+    if sold_total > 0 and buy_start.size:
+        covered_pos = np.flatnonzero(has_qty)
+        starts = sell_start[covered_pos]
+        points = np.unique(np.concatenate([buy_start, starts]))
+        points = points[points < sold_total - _QTY_EPSILON]
+        lengths = np.diff(np.append(points, sold_total))
+        lot = np.searchsorted(buy_start, points, side="right") - 1
+        sale = covered_pos[np.searchsorted(starts, points, side="right") - 1]
+        sell_cost = np.bincount(sale, weights=lengths * unit_cost[lot], minlength=sell_start.shape[0])
+    open_qty = np.clip(buy_end - np.maximum(buy_start, sold_total), 0.0, None)
+    return sell_cost, open_qty
+
+
+def _lifo_cost(is_buy, inventory, unit_cost):
+    """
+    LIFO sobre el eje de nivel de inventario.
+
+    Cada compra apila la franja `[nivel previo, nivel nuevo)` y cada venta
+    retira `[nivel nuevo, nivel previo)`. La franja superior que retira una
+    venta es de la última operación anterior con nivel previo más bajo
+    (`_previous_lower`); siguiendo esa cadena hacia abajo se obtienen los
+    lotes que consume. Todas las ventas avanzan a la vez un eslabón por
+    iteración, así que el trabajo es proporcional a los tramos casados. Una
+    venta ficticia final que vacía el inventario da los lotes abiertos.
+
+    Returns:
+        (costo por venta, cantidad abierta por compra)
+    """
+    # Posición 0: centinela; 1..n: operaciones; n+1: cierre ficticio
+    before = np.concatenate([[-np.inf, 0.0], inventory])
+    after = np.concatenate([[0.0], inventory, [0.0]])
+    previous = _previous_lower(before)
+
+    is_sell = np.concatenate([[False], ~is_buy, [True]])
+    active = np.flatnonzero(is_sell & (before - after > _QTY_EPSILON))
+    top = before[active]
+    lot = previous[active]
+    bottom = after[active]
+
+    buy_pos = np.concatenate([[0], np.cumsum(is_buy) - 1, [0]])
+    sell_pos = np.concatenate([[0], np.cumsum(~is_buy) - 1, [int((~is_buy).sum())]])
+    pieces_sale, pieces_lot, pieces_qty = [], [], []
+    while active.size:
+        low = np.maximum(before[lot], bottom)
+        pieces_sale.append(sell_pos[active])
+        pieces_lot.append(buy_pos[lot])
+        pieces_qty.append(top - low)
+        deeper = before[lot] > bottom + _QTY_EPSILON
+        active, top, lot, bottom = active[deeper], before[lot][deeper], previous[lot][deeper], bottom[deeper]
+
+    n_sells = int((~is_buy).sum())
+    sale = np.concatenate(pieces_sale) if pieces_sale else np.zeros(0, dtype=np.int64)
+    lots = np.concatenate(pieces_lot) if pieces_lot else np.zeros(0, dtype=np.int64)
+    qty = np.concatenate(pieces_qty) if pieces_qty else np.zeros(0)
+    real = sale < n_sells
+    sell_cost = np.bincount(sale[real], weights=qty[real] * unit_cost[lots[real]], minlength=n_sells)
+    open_qty = np.bincount(lots[~real], weights=qty[~real], minlength=unit_cost.shape[0])
+    return sell_cost, open_qty
+
+
+def _previous_lower(values):
+    """
+    Índice del último elemento anterior estrictamente menor (0 si no hay).
+
+    Salto de punteros vectorizado: cada puntero solo salta sobre elementos
+    mayores o iguales que el propio, así que el resultado es exacto.
+    """
+    index = np.arange(values.shape[0])
+    previous = np.maximum(index - 1, 0)
+    pending = np.flatnonzero((index > 0) & (values[previous] >= values))
+    while pending.size:
+        previous[pending] = previous[previous[pending]]
+        pending = pending[(previous[pending] > 0) & (values[previous[pending]] >= values[pending])]
+    return previous
+
+
+def _average_cost(is_buy, quantity, value, matched, inventory):
+    """
+    Costo promedio ponderado.
+
+    Returns:
+        (costo por venta, costo del inventario final)
+    """
+    previous = np.concatenate([[0.0], inventory[:-1]])
+    buy_idx = np.flatnonzero(is_buy)
+    avg_at_buy = _average_unit_costs(
+        previous[buy_idx], inventory[buy_idx], value[buy_idx]
+    )
+    # Costo promedio vigente en cada operación: el de la última compra
+    rank = np.cumsum(is_buy) - 1
+    current = np.where(rank >= 0, avg_at_buy[np.maximum(rank, 0)], 0.0) if buy_idx.size else np.zeros(rank.shape)
+    sell_cost = (matched * current)[~is_buy]
+    return sell_cost, float(inventory[-1] * current[-1]) if current.size else 0.0
+
+
+def _average_unit_costs(before, after, cost):
+    """
+    Costo unitario promedio tras cada compra, sin recorrerlas una a una.
+
+    Con `w = antes / después` y `d = costo / después`, el promedio sigue
+    `A_j = w_j * A_{j-1} + d_j`, cuya solución es
+    `A_j = sum_i d_i * exp(S_j - S_i)` con `S = cumsum(log w)`. Para que
+    las exponenciales no desborden, S se agrupa en épocas de ancho
+    `_LOG_EPOCH` y cada término se expresa respecto de su época; los
+    aportes de hace más de una época pesan menos de exp(-300) y se omiten.
+    Una compra con inventario previo nulo reinicia el promedio.
+    """
+    if cost.size == 0:
+        return cost
+    with np.errstate(divide="ignore"):
+        weight = np.where(before > _QTY_EPSILON, before / after, 0.0)
+        log_weight = np.log(weight)
+    restart = weight == 0.0
+    group = np.cumsum(restart)
+    log_weight[restart] = 0.0
+    cum_log = np.cumsum(log_weight)
+    # La primera compra de cada par parte de inventario nulo: siempre hay reinicio
+    s = cum_log - cum_log[np.flatnonzero(restart)][group - 1]  # <= 0 dentro de cada grupo
+    epoch = np.floor(-s / _LOG_EPOCH).astype(np.int64)
+    scaled = (cost / after) * np.exp(-_LOG_EPOCH * epoch - s)
+
+    key = group * (epoch.max() + 2) + epoch
+    change = np.append(True, key[1:] != key[:-1])
+    block = np.cumsum(change) - 1
+    block_total = np.bincount(block, weights=scaled)
+    block_key = key[change]
+    # Suma acumulada dentro de cada época (no global: las magnitudes difieren)
+    inside = (
+        pl.DataFrame({"block": block, "scaled": scaled})
+        .select(pl.col("scaled").cum_sum().over("block"))
+        .to_series()
+        .to_numpy()
+    )
+    # Total de la época anterior del mismo grupo, reexpresado en la actual
+    prev_is_adjacent = np.append(False, block_key[1:] == block_key[:-1] + 1)
+    carry = np.where(prev_is_adjacent, np.append(0.0, block_total[:-1]), 0.0) * np.exp(-_LOG_EPOCH)
+    return np.exp(s + _LOG_EPOCH * epoch) * (inside + carry[block])
+
+
+def _summarize(realized: pl.DataFrame, inventory: pl.DataFrame, method: str) -> pl.DataFrame:
+    """Totales de P&L realizado e inventario abierto por par."""
+    sales = realized.group_by(PAIR_COLUMNS, maintain_order=True).agg(
+        pl.len().alias("sales"),
+        pl.col("quantity").sum().alias("quantity_sold"),
+        pl.col("matched_quantity").sum(),
+        pl.col("uncovered_quantity").sum(),
+        (pl.col("proceeds") * pl.col("matched_quantity") / pl.col("quantity")).sum().alias("matched_proceeds"),
+        pl.col("cost_basis").sum(),
+        pl.col("realized_pnl").sum(),
+    )
+    open_positions = inventory.group_by(PAIR_COLUMNS, maintain_order=True).agg(
+        pl.col("open_quantity").sum(),
+        pl.col("cost_basis").sum().alias("open_cost_basis"),
+    )
+    return (
+        sales.join(open_positions, on=PAIR_COLUMNS, how="full", coalesce=True)
+        .with_columns(
+            (pl.col("open_cost_basis") / pl.col("open_quantity")).alias("open_unit_cost"),
+            pl.lit(method).alias("method"),
+        )
+        .sort(PAIR_COLUMNS)
+    )
@@ -4,6 +4,8 @@ import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, Any, Tuple, Union
 
+from .transformations.categoricals import CANCELLED_STATUSES
+
 logger = logging.getLogger(__name__)
 
 
@@ -45,7 +47,6 @@ def analyze_counterparties(df: pl.DataFrame) -> Dict[str, Union[pl.DataFrame, An
     df_filtered = df.filter(
         (pl.col("Counterparty").is_not_null())
         & (pl.col("Counterparty") != "")
-        & (pl.col("Counterparty").str.strip_chars() != "")
     )
 
     if df_filtered.is_empty():
@@ -91,11 +92,9 @@ def analyze_counterparties(df: pl.DataFrame) -> Dict[str, Union[pl.DataFrame, An
     counterparty_metrics["efficiency_stats"] = _calculate_efficiency_stats(df_filtered)
 
     # 7. Matriz de actividad de contrapartes (NOTA: esta es series temporales, puede no unirse bien directamente)
-    logger.info("Generando matriz de actividad...")
     # counterparty_metrics['activity_matrix'] = _generate_activity_matrix(df_filtered)
-    # Comentado temporalmente ya que su estructura (Counterparty, year_month, ...) es diferente
-    # y podría complicar el join directo. Considerar cómo integrarla o si debe permanecer separada.
-    # Por ahora, la excluiremos del join automático.
+    # Su estructura (Counterparty, year_month, ...) no encaja en el join por contraparte;
+    # la actividad mensual agregada por cohorte la calcula cohorts.analyze_cohorts.
 
     # logger.info("Análisis de sub-métricas de contrapartes completado. Iniciando consolidación final...") # Comentado
 
@@ -350,16 +349,17 @@ def _analyze_trading_patterns(df: pl.DataFrame) -> pl.DataFrame:
         "Counterparty"
     ).agg(  # Agrupación directa por Counterparty
         [
+            # Con empates, la moda menor: `mode()` no garantiza orden
             pl.col("hour")
             .filter(pl.col("hour").is_not_null())
             .mode()
-            .first()
+            .min()
             .alias("most_active_hour"),
             # Dejar most_active_weekday como Int8 (0-7)
             pl.col("weekday")
             .filter(pl.col("weekday").is_not_null())
             .mode()
-            .first()
+            .min()
             .fill_null(0)
             .cast(pl.Int8)
             .alias("most_active_weekday_int"),
@@ -582,7 +582,7 @@ def _calculate_efficiency_stats(df: pl.DataFrame) -> pl.DataFrame:
                 # Tasa de cancelación
                 (
                     pl.col("status")
-                    .filter(pl.col("status").str.contains("Cancel"))
+                    .filter(pl.col("status").is_in(CANCELLED_STATUSES))
                     .count()
                     / pl.count("Counterparty")
                     * 100
@@ -0,0 +1,245 @@
+import logging
+from typing import Dict, List, Optional
+
+import polars as pl
+
+logger = logging.getLogger(__name__)
+
+# Bordes del histograma de días entre operaciones repetidas (el último queda abierto)
+DEFAULT_REPEAT_BIN_EDGES_DAYS = [0, 1, 3, 7, 14, 30, 60, 90, 180]
+# Una contraparte abandona si lleva sin operar más de `multiplier` veces su
+# intervalo mediano, y nunca menos de `min_days`
+DEFAULT_CHURN_MULTIPLIER = 3.0
+DEFAULT_CHURN_MIN_DAYS = 30
+
+REPEAT_QUANTILES = [0.5, 0.9]
+
+
+def add_cohort_columns(trades: pl.DataFrame, time_col: str = "Match_time_local") -> pl.DataFrame:
+    """
+    Cohorte y desfase en meses de cada operación, con expresiones de ventana.
+
+    `trades` debe venir ordenado por contraparte y tiempo. Añade
+    `first_trade`, `cohort_index` (mes de la primera operación como
+    año * 12 + mes - 1; ver `cohort_label`) y `months_since_first`
+    (0 = mes de la primera operación). Los meses se manejan como enteros
+    para no formatear fechas fila a fila.
+    """
+    month_index = (
+        pl.col(time_col).dt.year().cast(pl.Int32) * 12 + pl.col(time_col).dt.month().cast(pl.Int32) - 1
+    )
+    return trades.with_columns(
+        pl.col(time_col).first().over("Counterparty").alias("first_trade"),
+        month_index.first().over("Counterparty").alias("cohort_index"),
+        month_index.alias("_month_index"),
+    ).with_columns(
+        (pl.col("_month_index") - pl.col("cohort_index")).alias("months_since_first")
+    ).drop("_month_index")
+
+
+def cohort_label(cohort_index: pl.Expr) -> pl.Expr:
+    """Índice de mes de `add_cohort_columns` como 'YYYY-MM'."""
+    return (
+        (cohort_index // 12).cast(pl.Utf8)
+        + "-"
+        + (cohort_index % 12 + 1).cast(pl.Utf8).str.zfill(2)
+    )
+
+
+def analyze_counterparty_graph(
+    df: pl.DataFrame,
+    churn_multiplier: float = DEFAULT_CHURN_MULTIPLIER,
+    churn_min_days: float = DEFAULT_CHURN_MIN_DAYS,
+    bin_edges_days: Optional[List[float]] = None,
+) -> Dict[str, pl.DataFrame]:
+    """
+    Grafo de relaciones con contrapartes: recurrencia, reciprocidad,
+    retención por cohorte y abandono.
+
+    Cada contraparte es una arista con nosotros, con peso en compras (BUY)
+    y en ventas (SELL). Ordena una vez por contraparte y tiempo y calcula en
+    una sola selección, con expresiones de ventana, los días desde la
+    operación anterior de la misma contraparte, su cohorte (mes de la
+    primera operación) y el desfase en meses de cada operación; el resto
+    son agregaciones sobre ese resultado, sin filtros por contraparte.
+
+    La reciprocidad es el volumen del lado menor sobre el del lado mayor
+    (1 = compra y vende lo mismo, 0 = un solo lado). El abandono se mide
+    contra la última operación del conjunto de datos.
+
+    Args:
+        df: DataFrame procesado por `analyze`.
+        churn_multiplier: Veces el intervalo mediano sin operar a partir de
+            las cuales la contraparte se marca como abandonada.
+        churn_min_days: Umbral mínimo de abandono en días (y el que aplica a
+            contrapartes con una sola operación).
+        bin_edges_days: Bordes del histograma de intervalos en días
+            (default: `DEFAULT_REPEAT_BIN_EDGES_DAYS`).
+
+    Returns:
+        Diccionario con 'relationships' (una fila por contraparte),
+        'repeat_intervals' (histograma de días entre operaciones repetidas
+        por lado) y 'cohorts' (retención y abandono por mes de la primera
+        operación).
+    """
+    time_col = "Match_time_local"
+    required = ["Counterparty", "order_type", "TotalPrice_num", time_col]
+    missing = [col for col in required if col not in df.columns]
+    if missing:
+        logger.warning(f"Faltan columnas para el grafo de contrapartes: {missing}")
+        return {}
+
+    trades = df
+    if "status" in df.columns:
+        trades = trades.filter(pl.col("status").cast(pl.Utf8) == "Completed")
+    trades = (
+        trades.filter(
+            pl.col(time_col).is_not_null()
+            & pl.col("Counterparty").is_not_null()
+            & (pl.col("Counterparty").cast(pl.Utf8) != "")
+        )
+        .select(
+            pl.col("Counterparty"),
+            pl.col("order_type").cast(pl.Utf8).str.to_uppercase().alias("side"),
+            pl.col("TotalPrice_num"),
+            pl.col(time_col),
+        )
+        # Se ordena con el tipo original (categórico): evita ordenar texto
+        .sort(["Counterparty", time_col])
+    )
+    if trades.is_empty():
+        logger.info("Sin operaciones completadas con contraparte para el grafo de contrapartes.")
+        return {}
+
+    reference_time = trades[time_col].max()
+    trades = add_cohort_columns(
+        trades.with_columns(
+            (pl.col(time_col).diff().over("Counterparty").dt.total_seconds() / 86_400).alias("repeat_days")
+        ),
+        time_col,
+    )
+
+    relationships = _relationships(trades, time_col, reference_time, churn_multiplier, churn_min_days)
+    result = {
+        "relationships": relationships,
+        "repeat_intervals": _repeat_histogram(trades, bin_edges_days or DEFAULT_REPEAT_BIN_EDGES_DAYS),
+        "cohorts": _cohort_summary(relationships),
+    }
+    logger.info(
+        f"Grafo de contrapartes: {relationships.height} contrapartes, "
+        f"{relationships['is_reciprocal'].sum()} en ambos lados, "
+        f"{relationships['churned'].sum()} marcadas como abandonadas."
+    )
+    return result
+
+
+def _relationships(
+    trades: pl.DataFrame,
+    time_col: str,
+    reference_time,
+    churn_multiplier: float,
+    churn_min_days: float,
+) -> pl.DataFrame:
+    """Una fila por contraparte: pesos por lado, recurrencia, valor y abandono."""
+    buy, sell = pl.col("side") == "BUY", pl.col("side") == "SELL"
+    repeat = pl.col("repeat_days").drop_nulls()
+    return (
+        trades.group_by("Counterparty")
+        .agg(
+            [
+                cohort_label(pl.first("cohort_index")).alias("cohort"),
+                pl.first("first_trade"),
+                pl.col(time_col).last().alias("last_trade"),
+                pl.len().cast(pl.UInt32).alias("trades"),
+                buy.sum().cast(pl.UInt32).alias("buy_trades"),
+                sell.sum().cast(pl.UInt32).alias("sell_trades"),
+                pl.col("TotalPrice_num").filter(buy).sum().alias("buy_volume"),
+                pl.col("TotalPrice_num").filter(sell).sum().alias("sell_volume"),
+                pl.col("TotalPrice_num").sum().alias("lifetime_value"),
+                (pl.col("months_since_first").max() + 1).cast(pl.UInt32).alias("months_span"),
+                pl.col("months_since_first").n_unique().cast(pl.UInt32).alias("active_months"),
+                repeat.mean().alias("mean_repeat_days"),
+            ]
+            + [
+                repeat.quantile(q, interpolation="linear").alias(f"p{int(q * 100)}_repeat_days")
+                for q in REPEAT_QUANTILES
+            ]
+        )
+        .with_columns(
+            (
+                pl.min_horizontal("buy_volume", "sell_volume")
+                / pl.max_horizontal("buy_volume", "sell_volume")
+            )
+            .fill_nan(0.0)
+            .alias("reciprocity"),
+            ((pl.col("buy_trades") > 0) & (pl.col("sell_trades") > 0)).alias("is_reciprocal"),
+            ((pl.col("last_trade") - pl.col("first_trade")).dt.total_seconds() / 86_400).alias("tenure_days"),
+            ((pl.lit(reference_time) - pl.col("last_trade")).dt.total_seconds() / 86_400).alias(
+                "days_since_last"
+            ),
+            pl.max_horizontal(
+                pl.col("p50_repeat_days") * churn_multiplier, pl.lit(float(churn_min_days))
+            ).alias("churn_threshold_days"),
+        )
+        .with_columns(
+            pl.col("Counterparty").cast(pl.Utf8),
+            (pl.col("days_since_last") > pl.col("churn_threshold_days")).alias("churned"),
+        )
+        .sort("lifetime_value", descending=True)
+    )
+
+
+def _repeat_histogram(trades: pl.DataFrame, bin_edges_days: List[float]) -> pl.DataFrame:
+    """Histograma de días desde la operación anterior de la contraparte, global y por lado de la que repite."""
+    edges = sorted(bin_edges_days)
+    labels = [f"[{lo:g}d, {hi:g}d)" for lo, hi in zip(edges, edges[1:])] + [f">= {edges[-1]:g}d"]
+    bin_bounds = pl.DataFrame(
+        {
+            "bin": pl.Series(range(len(edges)), dtype=pl.UInt32),
+            "bin_label": labels,
+            "bin_lower_days": [float(e) for e in edges],
+            "bin_upper_days": [float(e) for e in edges[1:]] + [None],
+        }
+    )
+    binned = trades.select("side", "repeat_days").filter(pl.col("repeat_days") >= edges[0]).with_columns(
+        pl.lit(pl.Series(edges[1:], dtype=pl.Float64))
+        .search_sorted(pl.col("repeat_days"), side="right")
+        .cast(pl.UInt32)
+        .alias("bin")
+    )
+    counts = pl.concat(
+        [
+            binned.group_by("bin").agg(pl.len().cast(pl.UInt32).alias("count")).select(
+                pl.lit("all").alias("side"), "bin", "count"
+            ),
+            binned.group_by(["side", "bin"]).agg(pl.len().cast(pl.UInt32).alias("count")),
+        ]
+    )
+    return (
+        counts.with_columns((pl.col("count") / pl.col("count").sum().over("side")).alias("share"))
+        .join(bin_bounds, on="bin", how="left")
+        .sort(["side", "bin"])
+        .select(["side", "bin_label", "bin_lower_days", "bin_upper_days", "count", "share"])
+    )
+
+
+def _cohort_summary(relationships: pl.DataFrame) -> pl.DataFrame:
+    """Retención (volvió en un mes posterior), abandono y valor por cohorte."""
+    return (
+        relationships.group_by("cohort")
+        .agg(
+            pl.len().cast(pl.UInt32).alias("counterparties"),
+            (pl.col("active_months") > 1).sum().cast(pl.UInt32).alias("retained"),
+            pl.col("is_reciprocal").sum().cast(pl.UInt32).alias("reciprocal"),
+            pl.col("churned").sum().cast(pl.UInt32).alias("churned"),
+            pl.col("lifetime_value").sum().alias("cohort_volume"),
+            pl.col("lifetime_value").mean().alias("avg_lifetime_value"),
+            pl.col("p50_repeat_days").median().alias("median_repeat_days"),
+        )
+        .with_columns(
+            (pl.col("retained") / pl.col("counterparties")).alias("retention_rate"),
+            (pl.col("churned") / pl.col("counterparties")).alias("churn_rate"),
+            (pl.col("reciprocal") / pl.col("counterparties")).alias("reciprocal_share"),
+        )
+        .sort("cohort")
+    )
@@ -9,7 +9,7 @@ import polars as pl
 from . import utils
 import numpy as np
 from typing import Dict, List, Union, Optional
-from .plot_utils import set_default_style, save_figure
+from .plot_utils import set_default_style, save_figure, savefig
 
 logger = logging.getLogger(__name__)
 sns.set_theme(style="whitegrid")
@@ -202,7 +202,7 @@ def plot_counterparty_volume_ranking(
         # Guardar
         filename = f"counterparty_volume_ranking{file_identifier}.png"
         file_path = os.path.join(out_dir, filename)
-        plt.savefig(file_path, dpi=300, bbox_inches="tight")
+        savefig(plt.gcf(), file_path, bbox_inches="tight")
         plt.close()
         saved_paths.append(file_path)
 
@@ -282,7 +282,7 @@ def plot_volume_vs_frequency_scatter(
         # Guardar
         filename = f"counterparty_volume_vs_frequency{file_identifier}.png"
         file_path = os.path.join(out_dir, filename)
-        plt.savefig(file_path, dpi=300, bbox_inches="tight")
+        savefig(plt.gcf(), file_path, bbox_inches="tight")
         plt.close()
         saved_paths.append(file_path)
 
@@ -356,7 +356,7 @@ def plot_vip_tier_distribution(
 
         # Guardar utilizando utilidades
         filename = f"counterparty_vip_tier_distribution{file_identifier}.png"
-        file_path = save_figure(fig, out_dir, filename, dpi=300)
+        file_path = save_figure(fig, out_dir, filename)
         saved_paths.append(file_path)
 
         logger.info(f"Distribución VIP guardada: {file_path}")
@@ -431,7 +431,7 @@ def plot_payment_preferences_heatmap(
         # Guardar
         filename = f"counterparty_payment_preferences_heatmap{file_identifier}.png"
         file_path = os.path.join(out_dir, filename)
-        plt.savefig(file_path, dpi=300, bbox_inches="tight")
+        savefig(plt.gcf(), file_path, bbox_inches="tight")
         plt.close()
         saved_paths.append(file_path)
 
@@ -503,7 +503,7 @@ def plot_temporal_timeline(
         # Guardar
         filename = f"counterparty_temporal_timeline{file_identifier}.png"
         file_path = os.path.join(out_dir, filename)
-        plt.savefig(file_path, dpi=300, bbox_inches="tight")
+        savefig(plt.gcf(), file_path, bbox_inches="tight")
         plt.close()
         saved_paths.append(file_path)
 
@@ -589,7 +589,7 @@ def plot_efficiency_vs_volume(
         # Guardar
         filename = f"counterparty_efficiency_vs_volume{file_identifier}.png"
         file_path = os.path.join(out_dir, filename)
-        plt.savefig(file_path, dpi=300, bbox_inches="tight")
+        savefig(plt.gcf(), file_path, bbox_inches="tight")
         plt.close()
         saved_paths.append(file_path)
 
@@ -0,0 +1,305 @@
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import polars as pl
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_N_CLUSTERS = 6
+DEFAULT_BATCH_SIZE = 4096
+MODEL_FILENAME = "counterparty_segments.joblib"
+MODELS_DIRNAME = "models"
+
+# Métrica de contraparte -> columnas que aporta a la matriz de rasgos
+FEATURE_SOURCES = {
+    "general_stats": [
+        "total_operations",
+        "total_volume",
+        "avg_volume_per_op",
+        "operations_per_day",
+        "days_active",
+        "payment_methods_used",
+        "price_cv",
+    ],
+    "efficiency_stats": ["completion_rate", "cancellation_rate", "volume_consistency"],
+    "trading_patterns": ["hour_spread", "unique_hour_day_combinations"],
+}
+# Rasgos de cola larga que se comprimen con log1p antes de escalar
+LOG_FEATURES = ["total_operations", "total_volume", "avg_volume_per_op", "operations_per_day", "days_active"]
+SEGMENT_FEATURES = (
+    [col for cols in FEATURE_SOURCES.values() for col in cols]
+    + ["active_hour_sin", "active_hour_cos", "top_method_share"]
+)
+
+_model_cache: Dict[Tuple[str, int], Dict[str, Any]] = {}
+_model_lock = threading.Lock()
+
+
+def segments_model_path(segments_config: Optional[Dict[str, Any]], output_dir: Optional[str]) -> Optional[str]:
+    """
+    Ruta del modelo: `model_path` del config o `<output_dir>/models/`.
+
+    `output_dir` es el directorio de la categoría: cada categoría tiene sus
+    contrapartes y, por defecto, su propio modelo.
+    """
+    configured = (segments_config or {}).get("model_path")
+    if configured:
+        return configured
+    if output_dir:
+        return os.path.join(output_dir, MODELS_DIRNAME, MODEL_FILENAME)
+    return None
+
+
+def build_feature_matrix(cp_metrics: Dict[str, pl.DataFrame]) -> Tuple[pl.DataFrame, np.ndarray]:
+    """
+    Matriz de rasgos numéricos por contraparte en un único array de NumPy.
+
+    Une estadísticas generales, eficiencia, patrones horarios (la hora más
+    activa como seno/coseno para que 23h y 0h queden cerca) y la
+    concentración en el método de pago principal. Los nulos y NaN (p. ej.
+    dispersión de una sola operación) valen 0.
+
+    Returns:
+        (DataFrame con `Counterparty` y los rasgos sin transformar,
+        matriz contrapartes x `SEGMENT_FEATURES` lista para el modelo)
+    """
+    general = cp_metrics.get("general_stats")
+    if general is None or general.is_empty():
+        return pl.DataFrame(), np.empty((0, len(SEGMENT_FEATURES)))
+
+    features = general.select(["Counterparty"] + FEATURE_SOURCES["general_stats"])
+    for source in ("efficiency_stats", "trading_patterns"):
+        table = cp_metrics.get(source)
+        columns = [col for col in FEATURE_SOURCES[source] if table is not None and col in table.columns]
+        extra = ["most_active_hour"] if source == "trading_patterns" else []
+        extra = [col for col in extra if table is not None and col in table.columns]
+        if columns or extra:
+            features = features.join(table.select(["Counterparty"] + columns + extra), on="Counterparty", how="left")
+
+    hour_angle = 2 * np.pi * pl.col("most_active_hour").cast(pl.Float64) / 24
+    if "most_active_hour" not in features.columns:
+        hour_angle = pl.lit(None, dtype=pl.Float64)
+    features = features.with_columns(
+        hour_angle.sin().alias("active_hour_sin"), hour_angle.cos().alias("active_hour_cos")
+    )
+
+    preferences = cp_metrics.get("payment_preferences")
+    if preferences is not None and not preferences.is_empty():
+        features = features.join(
+            preferences.group_by("Counterparty").agg(
+                (pl.col("pct_operations").max() / 100).alias("top_method_share")
+            ),
+            on="Counterparty",
+            how="left",
+        )
+
+    features = features.with_columns(
+        [
+            pl.col(col).cast(pl.Float64).fill_nan(None).fill_null(0.0)
+            if col in features.columns
+            else pl.lit(0.0).alias(col)
+            for col in SEGMENT_FEATURES
+        ]
+    ).select(["Counterparty"] + SEGMENT_FEATURES)
+
+    matrix = features.select(
+        [
+            pl.col(col).clip(lower_bound=0).log1p() if col in LOG_FEATURES else pl.col(col)
+            for col in SEGMENT_FEATURES
+        ]
+    ).to_numpy()
+    return features, matrix
+
+
+def fit_segment_model(
+    matrix: np.ndarray,
+    n_clusters: int = DEFAULT_N_CLUSTERS,
+    random_state: int = 42,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Dict[str, Any]:
+    """
+    Ajusta escalado + MiniBatchKMeans sobre la matriz de rasgos.
+
+    Los segmentos se renumeran de menor a mayor volumen total del centroide,
+    para que el número de segmento se pueda leer sin mirar los centroides.
+    El modelo guarda los parámetros pedidos para detectar, al cargarlo, si
+    corresponde a otra configuración.
+    """
+    params = {"n_clusters": n_clusters, "random_state": random_state, "batch_size": batch_size}
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    n_clusters = max(1, min(n_clusters, matrix.shape[0]))
+    pipeline = make_pipeline(
+        StandardScaler(),
+        MiniBatchKMeans(
+            n_clusters=n_clusters,
+            batch_size=batch_size,
+            random_state=random_state,
+            n_init=3,
+        ),
+    )
+    pipeline.fit(matrix)
+    centers = pipeline[0].inverse_transform(pipeline[-1].cluster_centers_)
+    volume_rank = np.argsort(np.argsort(centers[:, SEGMENT_FEATURES.index("total_volume")], kind="stable"))
+    logger.info(f"Modelo de segmentos ajustado: {n_clusters} segmentos, {matrix.shape[0]} contrapartes.")
+    return {
+        "pipeline": pipeline,
+        "features": list(SEGMENT_FEATURES),
+        "segment_of_cluster": volume_rank,
+        "params": params,
+    }
+
+
+def save_segment_model(model: Dict[str, Any], model_path: str) -> None:
+    """Guarda el modelo de forma atómica (archivo temporal + `os.replace`)."""
+    import joblib
+
+    os.makedirs(os.path.dirname(os.path.abspath(model_path)), exist_ok=True)
+    tmp_path = f"{model_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, model_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    logger.info(f"Modelo de segmentos de contrapartes guardado en: {model_path}")
+
+
+def load_segment_model(
+    model_path: Optional[str], params: Optional[Dict[str, Any]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Modelo guardado y compatible, o None.
+
+    Además de los rasgos actuales, si se indican `params` (ver
+    `segment_params`) el modelo debe haberse ajustado con ellos.
+    """
+    if not model_path or not os.path.isfile(model_path):
+        return None
+    key = (os.path.abspath(model_path), os.stat(model_path).st_mtime_ns)
+    with _model_lock:
+        if key not in _model_cache:
+            import joblib
+
+            try:
+                model = joblib.load(model_path)
+            except Exception as e:
+                logger.warning(f"No se pudo leer el modelo de segmentos {model_path}: {e}")
+                return None
+            if model.get("features") != SEGMENT_FEATURES:
+                logger.warning(
+                    f"El modelo de segmentos {model_path} usa otros rasgos; se ajustará uno nuevo."
+                )
+                return None
+            _model_cache[key] = model
+        model = _model_cache[key]
+    if params is not None and model.get("params") != params:
+        logger.info(
+            f"El modelo de segmentos {model_path} se ajustó con otros parámetros "
+            f"({model.get('params')}); se ajustará uno nuevo."
+        )
+        return None
+    return model
+
+
+def ensure_segment_model(
+    df: pl.DataFrame, segments_config: Optional[Dict[str, Any]], model_path: str
+) -> Optional[str]:
+    """
+    Ajusta y guarda el modelo con todas las operaciones si hace falta.
+
+    Es la tarea previa a las celdas: así todas las celdas de la ejecución
+    (y las siguientes) asignan segmentos con el mismo modelo. El modelo
+    guardado se reutiliza aunque haya operaciones nuevas, mientras coincidan
+    rasgos y parámetros; `refit: true` en el config fuerza un ajuste nuevo.
+    """
+    config = segments_config or {}
+    if not config.get("refit", False) and load_segment_model(model_path, segment_params(config)) is not None:
+        return model_path
+    if "Counterparty" not in df.columns:
+        return None
+    from . import counterparty_analyzer
+    from .transformations.numeric import process_numeric_columns
+
+    if "TotalPrice_num" not in df.columns:
+        df = process_numeric_columns(df)
+    cp_metrics = counterparty_analyzer.analyze_counterparties(df)
+    _, matrix = build_feature_matrix(cp_metrics)
+    if matrix.shape[0] < 2:
+        logger.info("Contrapartes insuficientes para ajustar el modelo de segmentos.")
+        return None
+    model = fit_segment_model(matrix, **segment_params(config))
+    save_segment_model(model, model_path)
+    return model_path
+
+
+def assign_segments(
+    cp_metrics: Dict[str, pl.DataFrame],
+    segments_config: Optional[Dict[str, Any]] = None,
+    model_path: Optional[str] = None,
+) -> Dict[str, pl.DataFrame]:
+    """
+    Asigna un segmento de comportamiento a cada contraparte.
+
+    Usa el modelo guardado en `model_path` si se ajustó con los mismos
+    parámetros (los datos no se comparan: cada celda es un subconjunto de
+    las operaciones del modelo); si no, lo ajusta con estas contrapartes y
+    lo guarda.
+
+    Returns:
+        Diccionario con 'segments' (contraparte, segmento, distancia al
+        centroide escalada y rasgos) y 'segment_profiles' (tamaño y
+        mediana de cada rasgo por segmento).
+    """
+    features, matrix = build_feature_matrix(cp_metrics)
+    if matrix.shape[0] == 0:
+        return {}
+    params = segment_params(segments_config)
+    model = load_segment_model(model_path, params)
+    if model is None:
+        if matrix.shape[0] < 2:
+            logger.info("Contrapartes insuficientes para segmentar.")
+            return {}
+        model = fit_segment_model(matrix, **params)
+        if model_path:
+            save_segment_model(model, model_path)
+
+    pipeline = model["pipeline"]
+    distances = pipeline.transform(matrix)
+    clusters = distances.argmin(axis=1)
+    segments = features.select(
+        "Counterparty",
+        pl.Series("segment", model["segment_of_cluster"][clusters], dtype=pl.UInt32),
+        pl.Series("distance_to_center", distances.min(axis=1)),
+        *SEGMENT_FEATURES,
+    ).sort(["segment", "total_volume"], descending=[False, True])
+    profiles = (
+        segments.group_by("segment")
+        .agg(
+            [pl.len().alias("counterparties")]
+            + [pl.col(col).median().alias(f"median_{col}") for col in _profile_columns()]
+        )
+        .with_columns((pl.col("counterparties") / segments.height).alias("share"))
+        .sort("segment")
+    )
+    logger.info(f"Segmentos de contrapartes asignados: {segments.height} contrapartes en {profiles.height} segmentos.")
+    return {"segments": segments, "segment_profiles": profiles}
+
+
+def segment_params(segments_config: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Parámetros de ajuste del config, con sus valores por defecto."""
+    config = segments_config or {}
+    return {
+        "n_clusters": config.get("n_clusters", DEFAULT_N_CLUSTERS),
+        "random_state": config.get("random_state", 42),
+        "batch_size": config.get("batch_size", DEFAULT_BATCH_SIZE),
+    }
+
+
+def _profile_columns() -> List[str]:
+    return [col for col in SEGMENT_FEATURES if not col.startswith("active_hour_")]
@@ -0,0 +1,57 @@
+import argparse
+import logging
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# Etapas de salida que un perfil puede activar o desactivar. Las tablas CSV
+# de métricas se generan siempre.
+STAGES = ("figures", "html", "excel", "unified_report")
+
+EXECUTION_PROFILES: Dict[str, Dict[str, bool]] = {
+    # Solo métricas en CSV: sin conversiones a Pandas ni gráficos
+    "tables": {
+        "figures": False,
+        "html": False,
+        "excel": False,
+        "unified_report": False,
+    },
+    # Reportes HTML/Excel por período sin gráficos ni reporte unificado
+    "report": {
+        "figures": False,
+        "html": True,
+        "excel": True,
+        "unified_report": False,
+    },
+    "full": {
+        "figures": True,
+        "html": True,
+        "excel": True,
+        "unified_report": True,
+    },
+}
+
+DEFAULT_PROFILE = "full"
+
+
+def get_stage_flags(cli_args: argparse.Namespace) -> Dict[str, bool]:
+    """
+    Resuelve qué etapas de salida se ejecutan según el perfil de la CLI.
+
+    Args:
+        cli_args: Argumentos de la CLI. Se usan `profile` y `no_unified_report`;
+            si no existen se asume el perfil 'full'.
+
+    Returns:
+        Diccionario etapa -> bool con las claves de `STAGES`.
+    """
+    profile = getattr(cli_args, "profile", None) or DEFAULT_PROFILE
+    if profile not in EXECUTION_PROFILES:
+        logger.warning(
+            f"Perfil de ejecución '{profile}' desconocido. Se usa '{DEFAULT_PROFILE}'."
+        )
+        profile = DEFAULT_PROFILE
+    flags = dict(EXECUTION_PROFILES[profile])
+    if getattr(cli_args, "no_unified_report", False):
+        flags["unified_report"] = False
+    return flags
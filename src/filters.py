@@ -1,11 +1,35 @@
+import datetime
+import logging
+from typing import Callable, List, Optional, Tuple
+
 import polars as pl
 
+from .transformations.categoricals import is_categorical_dtype
+
+logger = logging.getLogger(__name__)
+
+
+def _values_expr(df: pl.DataFrame, column: str, values: list[str]) -> pl.Expr:
+    """
+    Construye la expresión de pertenencia para un filtro de valores.
+
+    La comparación no distingue mayúsculas ni espacios. En columnas
+    categóricas la normalización se resuelve sobre las categorías y el
+    filtro compara los códigos, sin transformar cada fila.
+    """
+    processed = [v.strip().upper() for v in values]
+    if is_categorical_dtype(df.schema[column]):
+        categories = df.get_column(column).cat.get_categories().to_list()
+        matching = [c for c in categories if c.strip().upper() in processed]
+        return pl.col(column).is_in(matching)
+    return pl.col(column).str.to_uppercase().str.strip_chars().is_in(processed)
+
 
 def apply_generic_filter(
     df: pl.DataFrame, column: str, values: list[str]
 ) -> pl.DataFrame:
     """
-    Aplica un filtro genérico a una columna de tipo cadena.
+    Aplica un filtro genérico a una columna de tipo cadena o categórica.
 
     Args:
         df: DataFrame a filtrar.
@@ -17,15 +41,12 @@ def apply_generic_filter(
     """
     if not values or column not in df.columns:
         return df
-    processed = [v.strip().upper() for v in values]
-    return df.filter(
-        pl.col(column).str.to_uppercase().str.strip_chars().is_in(processed)
-    )
+    return df.filter(_values_expr(df, column, values))
 
 
 def apply_filters(df: pl.DataFrame, filters: dict[str, list[str]]) -> pl.DataFrame:
     """
-    Aplica múltiples filtros genéricos a un DataFrame.
+    Aplica múltiples filtros genéricos a un DataFrame en una sola pasada.
 
     Args:
         df: DataFrame a filtrar.
@@ -34,6 +55,178 @@ def apply_filters(df: pl.DataFrame, filters: dict[str, list[str]]) -> pl.DataFra
     Returns:
         DataFrame filtrado.
     """
+    plan = FilterPlan()
     for column, values in filters.items():
-        df = apply_generic_filter(df, column, values)
-    return df
+        plan.add_values(column, values)
+    return plan.apply(df, collect_diagnostics=False)
+
+
+class FilterPlan:
+    """
+    Plan de filtrado que compila todos los filtros en un único predicado.
+
+    Los filtros se registran con los métodos `add_*` y se combinan con AND en
+    una sola expresión, de modo que el DataFrame se recorre una única vez.
+    Opcionalmente se calcula la selectividad de cada filtro por separado
+    (filas que lo cumplen sobre el total) para diagnóstico.
+    """
+
+    def __init__(self) -> None:
+        self._steps: List[Tuple[str, str, Callable[[pl.DataFrame], pl.Expr]]] = []
+        self.last_diagnostics: Optional[pl.DataFrame] = None
+
+    def __len__(self) -> int:
+        return len(self._steps)
+
+    def add_values(
+        self, column: str, values: Optional[list[str]], name: Optional[str] = None
+    ) -> "FilterPlan":
+        """Incluye solo las filas cuyo valor en `column` esté en `values`."""
+        if values:
+            self._steps.append(
+                (
+                    name or f"{column} in {values}",
+                    column,
+                    lambda df: _values_expr(df, column, values),
+                )
+            )
+        return self
+
+    def add_month(
+        self, month_number: Optional[int], column: str = "Match_time_local"
+    ) -> "FilterPlan":
+        """Incluye solo las filas del mes indicado (1-12), de cualquier año."""
+        if month_number:
+            self._steps.append(
+                (
+                    f"mes == {month_number}",
+                    column,
+                    lambda df: pl.col(column).dt.month() == month_number,
+                )
+            )
+        return self
+
+    def add_date_range(
+        self,
+        date_from: Optional[datetime.date],
+        date_to: Optional[datetime.date],
+        column: str = "Match_time_local",
+    ) -> "FilterPlan":
+        """Incluye las filas entre dos fechas locales, ambas inclusive."""
+        if date_from:
+            self._steps.append(
+                (
+                    f"fecha >= {date_from}",
+                    column,
+                    lambda df: pl.col(column).dt.date() >= date_from,
+                )
+            )
+        if date_to:
+            self._steps.append(
+                (
+                    f"fecha <= {date_to}",
+                    column,
+                    lambda df: pl.col(column).dt.date() <= date_to,
+                )
+            )
+        return self
+
+    def add_amount_range(
+        self,
+        min_amount: Optional[float],
+        max_amount: Optional[float],
+        column: str = "TotalPrice_num",
+    ) -> "FilterPlan":
+        """Incluye las filas cuyo monto esté entre los límites, ambos inclusive."""
+        if min_amount is not None:
+            self._steps.append(
+                (
+                    f"{column} >= {min_amount}",
+                    column,
+                    lambda df: pl.col(column) >= min_amount,
+                )
+            )
+        if max_amount is not None:
+            self._steps.append(
+                (
+                    f"{column} <= {max_amount}",
+                    column,
+                    lambda df: pl.col(column) <= max_amount,
+                )
+            )
+        return self
+
+    def compile(self, df: pl.DataFrame) -> List[Tuple[str, pl.Expr]]:
+        """
+        Resuelve los filtros contra el esquema de `df`.
+
+        Los filtros sobre columnas inexistentes se omiten con un aviso.
+
+        Args:
+            df: DataFrame al que se aplicará el plan.
+
+        Returns:
+            Lista de pares (nombre del filtro, expresión booleana).
+        """
+        compiled = []
+        for name, column, build in self._steps:
+            if column not in df.columns:
+                logger.warning(
+                    f"Filtro '{name}' omitido: columna '{column}' no encontrada."
+                )
+                continue
+            compiled.append((name, build(df)))
+        return compiled
+
+    def predicate(self, df: pl.DataFrame) -> Optional[pl.Expr]:
+        """Devuelve el predicado combinado o None si no hay filtros aplicables."""
+        compiled = self.compile(df)
+        if not compiled:
+            return None
+        return pl.all_horizontal([expr for _, expr in compiled])
+
+    def apply(
+        self, df: pl.DataFrame, collect_diagnostics: bool = True
+    ) -> pl.DataFrame:
+        """
+        Aplica el plan en una sola pasada.
+
+        Args:
+            df: DataFrame a filtrar.
+            collect_diagnostics: Si es True, calcula la selectividad de cada
+                filtro, la registra en el log y la guarda en `last_diagnostics`.
+
+        Returns:
+            DataFrame filtrado.
+        """
+        compiled = self.compile(df)
+        if not compiled:
+            return df
+
+        combined = pl.all_horizontal([expr for _, expr in compiled])
+        if collect_diagnostics:
+            self.last_diagnostics = self._selectivity(df, compiled, combined)
+            for row in self.last_diagnostics.iter_rows(named=True):
+                logger.info(
+                    f"Filtro '{row['filter']}': {row['rows_passed']}/{df.height} filas "
+                    f"({row['selectivity']:.1%})"
+                )
+        return df.filter(combined)
+
+    @staticmethod
+    def _selectivity(
+        df: pl.DataFrame, compiled: List[Tuple[str, pl.Expr]], combined: pl.Expr
+    ) -> pl.DataFrame:
+        """Cuenta, en una única agregación, las filas que cumple cada filtro."""
+        named = compiled + [("TOTAL (combinado)", combined)]
+        counts = df.select(
+            [expr.sum().alias(f"_f{i}") for i, (_, expr) in enumerate(named)]
+        ).row(0)
+        total = max(df.height, 1)
+        return pl.DataFrame(
+            {
+                "filter": [name for name, _ in named],
+                "rows_passed": [int(count or 0) for count in counts],
+                "selectivity": [(count or 0) / total for count in counts],
+            }
+        )
@@ -0,0 +1,330 @@
+"""
+Ingesta de exportaciones P2P desde uno o varios archivos CSV.
+
+Permite pasar varias rutas o patrones glob (una exportación por mes y por
+cuenta), parsea cada archivo en paralelo mediante frames lazy de Polars,
+reconcilia las diferencias de cabeceras entre versiones de la exportación
+usando `column_mapping` y elimina las órdenes duplicadas que aparecen en
+exportaciones solapadas.
+
+Las exportaciones archivadas (`.csv.gz`, `.csv.zst`, `.zip`) se leen sin
+descomprimir a un archivo temporal: gzip y zstd los descomprime Polars en
+memoria y los miembros de un `.zip` se pasan al lector como flujo.
+"""
+
+import glob
+import logging
+import os
+import zipfile
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import polars as pl
+
+logger = logging.getLogger(__name__)
+
+CSV_NULL_VALUES = ["", "NA", "N/A", "NaN", "null"]
+
+# Columnas internas que identifican una orden de forma única
+ORDER_KEY_COLUMNS = ["order_number", "adv_order_number"]
+
+DEFAULT_ORDER_KEY_CSV_NAMES = {
+    "order_number": "Order Number",
+    "adv_order_number": "Advertisement Order Number",
+}
+
+# Sufijo de archivo -> tipo de compresión soportado
+COMPRESSION_SUFFIXES = {
+    ".gz": "gzip",
+    ".zst": "zstd",
+    ".zstd": "zstd",
+    ".zip": "zip",
+}
+
+
+def csv_name_candidates(csv_names: Union[str, Sequence[str], None]) -> List[str]:
+    """Normaliza un valor de `column_mapping` a la lista de cabeceras aceptadas.
+
+    Un valor de `column_mapping` puede ser un único nombre de columna del CSV
+    o una lista de nombres alternativos (uno por versión de la exportación).
+    El primero de la lista es el nombre canónico.
+
+    Args:
+        csv_names: Valor del mapeo (str, lista de str o None).
+
+    Returns:
+        Lista (posiblemente vacía) de nombres candidatos.
+    """
+    if not csv_names:
+        return []
+    if isinstance(csv_names, str):
+        return [csv_names]
+    return [name for name in csv_names if name]
+
+
+def canonical_csv_name(
+    column_map_config: Dict[str, Any], internal_name: str, default: Optional[str] = None
+) -> Optional[str]:
+    """Devuelve el nombre canónico de CSV para una columna interna."""
+    candidates = csv_name_candidates(column_map_config.get(internal_name))
+    return candidates[0] if candidates else default
+
+
+def resolve_input_paths(sources: Union[str, Sequence[str]]) -> List[str]:
+    """Expande rutas y patrones glob a una lista ordenada de archivos.
+
+    Args:
+        sources: Ruta, patrón glob o lista de ellos (ej. `data/2023-*.csv`).
+
+    Returns:
+        Lista de rutas sin duplicados, en el orden en que se indicaron y
+        ordenadas alfabéticamente dentro de cada patrón.
+
+    Raises:
+        FileNotFoundError: Si alguna ruta no existe o ningún patrón encuentra archivos.
+    """
+    if isinstance(sources, str):
+        sources = [sources]
+
+    resolved: List[str] = []
+    for source in sources:
+        if glob.has_magic(source):
+            matches = sorted(
+                path for path in glob.glob(source, recursive=True) if os.path.isfile(path)
+            )
+            if not matches:
+                logger.warning(f"El patrón '{source}' no encontró archivos.")
+            resolved.extend(matches)
+        elif os.path.isfile(source):
+            resolved.append(source)
+        else:
+            raise FileNotFoundError(source)
+
+    unique_paths = list(dict.fromkeys(os.path.normpath(path) for path in resolved))
+    if not unique_paths:
+        raise FileNotFoundError(", ".join(sources))
+    return unique_paths
+
+
+def _reconcile_header_map(
+    columns: Sequence[str], column_map_config: Dict[str, Any]
+) -> Dict[str, str]:
+    """Calcula el renombrado de cabeceras alternativas a su nombre canónico."""
+    rename_map: Dict[str, str] = {}
+    for csv_names in column_map_config.values():
+        candidates = csv_name_candidates(csv_names)
+        if len(candidates) < 2 or candidates[0] in columns:
+            continue
+        for alternative in candidates[1:]:
+            if alternative in columns:
+                rename_map[alternative] = candidates[0]
+                break
+    return rename_map
+
+
+def detect_compression(path: str) -> Optional[str]:
+    """Detecta la compresión de un archivo por su extensión.
+
+    Args:
+        path: Ruta al archivo.
+
+    Returns:
+        'gzip', 'zstd', 'zip' o None si el archivo es un CSV plano.
+    """
+    return COMPRESSION_SUFFIXES.get(os.path.splitext(path)[1].lower())
+
+
+def _string_overrides(
+    columns: Sequence[str], column_map_config: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Tipos forzados a texto para las columnas de número de orden presentes."""
+    string_overrides: Dict[str, Any] = {}
+    for internal_name in ORDER_KEY_COLUMNS:
+        candidates = csv_name_candidates(column_map_config.get(internal_name)) or [
+            DEFAULT_ORDER_KEY_CSV_NAMES[internal_name]
+        ]
+        for csv_name in candidates:
+            if csv_name in columns:
+                string_overrides[csv_name] = pl.String
+    return string_overrides
+
+
+def _zip_csv_members(archive: zipfile.ZipFile) -> List[str]:
+    """Miembros CSV de un archivo zip, en orden alfabético."""
+    return sorted(
+        name
+        for name in archive.namelist()
+        if name.lower().endswith(".csv")
+        and not name.endswith("/")
+        and not os.path.basename(name).startswith(".")
+        and not name.startswith("__MACOSX/")
+    )
+
+
+def _read_compressed_source(
+    path: str, compression: str, column_map_config: Dict[str, Any]
+) -> pl.DataFrame:
+    """Lee un CSV comprimido sin escribir una copia descomprimida en disco.
+
+    Args:
+        path: Ruta al archivo comprimido.
+        compression: Tipo de compresión devuelto por `detect_compression`.
+        column_map_config: Mapeo de columnas de configuración.
+
+    Returns:
+        DataFrame con las columnas tal y como aparecen en el CSV.
+
+    Raises:
+        ValueError: Si un `.zip` no contiene ningún CSV.
+    """
+    read_options: Dict[str, Any] = {
+        "infer_schema_length": 10000,
+        "null_values": CSV_NULL_VALUES,
+    }
+
+    if compression != "zip":
+        # Polars detecta gzip/zstd por la cabecera y descomprime en memoria
+        header = pl.read_csv(path, n_rows=0, infer_schema=False).columns
+        return pl.read_csv(
+            path,
+            schema_overrides=_string_overrides(header, column_map_config),
+            **read_options,
+        )
+
+    with zipfile.ZipFile(path) as archive:
+        members = _zip_csv_members(archive)
+        if not members:
+            raise ValueError(f"El archivo '{path}' no contiene ningún CSV.")
+        frames = []
+        for member in members:
+            with archive.open(member) as member_stream:
+                header_line = member_stream.readline()
+            header = pl.read_csv(header_line, n_rows=0, infer_schema=False).columns
+            with archive.open(member) as member_stream:
+                frames.append(
+                    pl.read_csv(
+                        member_stream,
+                        schema_overrides=_string_overrides(header, column_map_config),
+                        **read_options,
+                    )
+                )
+    if len(members) > 1:
+        logger.info(f"Leídos {len(members)} CSV desde '{path}': {members}")
+    return pl.concat(frames, how="diagonal_relaxed")
+
+
+def scan_csv_source(path: str, column_map_config: Dict[str, Any]) -> pl.LazyFrame:
+    """Crea un LazyFrame para un archivo con las cabeceras ya reconciliadas.
+
+    Las columnas de número de orden se leen siempre como texto para no perder
+    precisión en identificadores de 20 dígitos. Los archivos comprimidos se
+    descomprimen en memoria y se leen de forma eager.
+
+    Args:
+        path: Ruta al archivo CSV (plano, `.gz`, `.zst` o `.zip`).
+        column_map_config: Mapeo de columnas de configuración.
+
+    Returns:
+        LazyFrame con las columnas renombradas a los nombres canónicos del CSV.
+    """
+    compression = detect_compression(path)
+    if compression:
+        lazy_df = _read_compressed_source(path, compression, column_map_config).lazy()
+        header = lazy_df.collect_schema().names()
+    else:
+        header = pl.read_csv(path, n_rows=0, infer_schema=False).columns
+        lazy_df = pl.scan_csv(
+            path,
+            infer_schema_length=10000,
+            null_values=CSV_NULL_VALUES,
+            schema_overrides=_string_overrides(header, column_map_config),
+        )
+
+    rename_map = _reconcile_header_map(header, column_map_config)
+    if rename_map:
+        logger.info(f"Cabeceras reconciliadas en '{path}': {rename_map}")
+        lazy_df = lazy_df.rename(rename_map)
+    return lazy_df
+
+
+def _order_key_columns(
+    columns: Sequence[str], column_map_config: Dict[str, Any]
+) -> List[str]:
+    """Columnas (con nombre canónico de CSV) que identifican una orden."""
+    keys = []
+    for internal_name in ORDER_KEY_COLUMNS:
+        csv_name = canonical_csv_name(
+            column_map_config, internal_name, DEFAULT_ORDER_KEY_CSV_NAMES[internal_name]
+        )
+        if csv_name in columns:
+            keys.append(csv_name)
+    return keys
+
+
+def deduplicate_orders(
+    lazy_df: pl.LazyFrame, column_map_config: Dict[str, Any]
+) -> pl.LazyFrame:
+    """Elimina órdenes repetidas entre exportaciones solapadas.
+
+    Se conserva la última aparición de cada orden (la de la exportación más
+    reciente en el orden de entrada), de modo que un estado actualizado
+    reemplaza al anterior. Las filas sin número de orden se conservan.
+
+    Args:
+        lazy_df: Datos concatenados de todas las exportaciones.
+        column_map_config: Mapeo de columnas de configuración.
+
+    Returns:
+        LazyFrame sin órdenes duplicadas.
+    """
+    keys = _order_key_columns(lazy_df.collect_schema().names(), column_map_config)
+    if not keys:
+        logger.warning(
+            "No se encontraron columnas de número de orden. No se eliminarán duplicados."
+        )
+        return lazy_df
+    return lazy_df.filter(
+        pl.struct(keys).is_last_distinct() | pl.col(keys[0]).is_null()
+    )
+
+
+def load_input_data(
+    sources: Union[str, Sequence[str]], column_map_config: Dict[str, Any]
+) -> pl.DataFrame:
+    """Carga una o varias exportaciones en un único DataFrame.
+
+    Cada archivo se escanea de forma lazy y la concatenación se evalúa en
+    paralelo. Con más de un archivo se eliminan las órdenes duplicadas.
+
+    Args:
+        sources: Ruta, patrón glob o lista de ellos.
+        column_map_config: Mapeo de columnas de configuración.
+
+    Returns:
+        DataFrame con los datos combinados y las cabeceras canónicas del CSV.
+
+    Raises:
+        FileNotFoundError: Si no se encuentra ningún archivo.
+        polars.exceptions.NoDataError: Si un CSV está vacío.
+        ValueError: Si un `.zip` no contiene ningún CSV.
+    """
+    paths = resolve_input_paths(sources)
+    logger.info(f"Archivos de entrada ({len(paths)}): {paths}")
+
+    lazy_frames = [scan_csv_source(path, column_map_config) for path in paths]
+    if len(lazy_frames) == 1:
+        return lazy_frames[0].collect()
+
+    # Un único plan lazy (lectura, concatenación y deduplicación) que se
+    # evalúa una vez; las filas leídas viajan como columna para el log.
+    combined = pl.concat(lazy_frames, how="diagonal_relaxed", parallel=True).with_columns(
+        pl.len().alias("_rows_read")
+    )
+    deduplicated_df = deduplicate_orders(combined, column_map_config).collect()
+    rows_read = deduplicated_df["_rows_read"][0] if deduplicated_df.height else 0
+    deduplicated_df = deduplicated_df.drop("_rows_read")
+    removed = rows_read - deduplicated_df.height
+    if removed > 0:
+        logger.info(
+            f"Eliminadas {removed} órdenes duplicadas entre exportaciones solapadas."
+        )
+    return deduplicated_df
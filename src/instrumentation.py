@@ -0,0 +1,309 @@
+import datetime
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+try:  # No disponible en Windows
+    import resource
+except ImportError:  # pragma: no cover - depende de la plataforma
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+RUN_PROFILE_FILENAME = "run_profile.json"
+CHROME_TRACE_FILENAME = "run_trace.json"
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Pico de memoria residente del proceso (MB) o None si no se puede medir."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reporta KB; macOS, bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def current_rss_mb() -> Optional[float]:
+    """Memoria residente actual (MB) leída de /proc; None fuera de Linux."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+class RunProfiler:
+    """
+    Registro de tiempos y memoria por etapa del pipeline.
+
+    Cada etapa guarda tiempo de pared, tiempo de CPU del proceso (incluye los
+    hilos de Polars), pico de RSS al terminar, RSS actual y filas. Las etapas
+    pueden anidarse y se asocian a la celda año/estado activa, si la hay, y
+    al ámbito activo (`scope`, p. ej. el directorio de una categoría).
+
+    Se usa de dos formas:
+        - `with profiler.stage("ingest") as rec: ...; rec["rows"] = df.height`
+        - `clock = profiler.clock()` y luego `clock.lap("nombre", rows=...)`
+          en funciones largas y lineales como `analyze`, donde cada vuelta
+          mide desde la anterior.
+    """
+
+    def __init__(self) -> None:
+        self.records: List[Dict[str, Any]] = []
+        self.created = datetime.datetime.now().isoformat(timespec="seconds")
+        self._origin = time.perf_counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Ámbito de todo el proceso (no por hilo): lo heredan los hilos del
+        # grafo de tareas; las categorías de un proceso corren en serie
+        self._scope: Optional[str] = None
+
+    # --- Estado por hilo -------------------------------------------------
+    def _stack(self) -> List[str]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _current_cell(self) -> Optional[Dict[str, str]]:
+        return getattr(self._local, "cell", None)
+
+    def _snapshot(self) -> Dict[str, float]:
+        return {"wall": time.perf_counter(), "cpu": time.process_time()}
+
+    def _record(
+        self, name: str, start: Dict[str, float], rows: Optional[int] = None
+    ) -> Dict[str, Any]:
+        end = self._snapshot()
+        stack = self._stack()
+        record = {
+            "name": name,
+            "parent": stack[-1] if stack else None,
+            "cell": self._current_cell(),
+            "scope": self._scope,
+            "start_s": round(start["wall"] - self._origin, 6),
+            "wall_s": round(end["wall"] - start["wall"], 6),
+            "cpu_s": round(end["cpu"] - start["cpu"], 6),
+            "peak_rss_mb": peak_rss_mb(),
+            "rss_mb": current_rss_mb(),
+            "rows": rows,
+            "thread": threading.get_ident(),
+        }
+        with self._lock:
+            self.records.append(record)
+        return record
+
+    # --- API -------------------------------------------------------------
+    @contextmanager
+    def stage(self, name: str, rows: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Mide el bloque como una etapa.
+
+        Args:
+            name: Nombre de la etapa (p. ej. 'ingest', 'figure:plot_hourly').
+            rows: Filas procesadas, si se conocen de antemano.
+
+        Yields:
+            Diccionario donde el bloque puede fijar `rows` al terminar.
+        """
+        info: Dict[str, Any] = {"rows": rows}
+        start = self._snapshot()
+        self._stack().append(name)
+        try:
+            yield info
+        finally:
+            self._stack().pop()
+            self._record(name, start, info.get("rows"))
+
+    @contextmanager
+    def cell(self, year: str, status: str) -> Iterator[None]:
+        """Asocia las etapas del bloque a la celda año/estado y mide su total."""
+        previous = self._current_cell()
+        self._local.cell = {"year": str(year), "status": str(status)}
+        try:
+            with self.stage("cell"):
+                yield
+        finally:
+            self._local.cell = previous
+
+    @contextmanager
+    def scope(self, name: str) -> Iterator[None]:
+        """Asocia las etapas registradas dentro del bloque (en cualquier hilo) al ámbito `name`."""
+        previous = self._scope
+        self._scope = name
+        try:
+            yield
+        finally:
+            self._scope = previous
+
+    def clock(self) -> "StageClock":
+        """Devuelve un cronómetro de vueltas anidado en la etapa actual."""
+        return StageClock(self)
+
+    def _scoped_records(self, scope: Optional[str]) -> List[Dict[str, Any]]:
+        with self._lock:
+            records = list(self.records)
+        if scope is None:
+            return records
+        return [r for r in records if r["scope"] == scope]
+
+    def to_dict(self, scope: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Resume las etapas globales y las de cada celda año/estado.
+
+        Args:
+            scope: Si se indica, solo las etapas de ese ámbito y el tiempo
+                transcurrido entre la primera y la última; si no, todas.
+        """
+        records = self._scoped_records(scope)
+        global_stages = [r for r in records if r["cell"] is None]
+        cells: Dict[tuple, Dict[str, Any]] = {}
+        for r in records:
+            if r["cell"] is None:
+                continue
+            # Mismo año/estado en dos categorías son celdas distintas
+            key = (r["scope"], r["cell"]["year"], r["cell"]["status"])
+            entry = cells.setdefault(
+                key,
+                {"scope": key[0], "year": key[1], "status": key[2], "wall_s": None, "stages": []},
+            )
+            if r["name"] == "cell":
+                # Con el grafo de tareas cada paso de la celda abre su propio bloque
+                entry["wall_s"] = round((entry["wall_s"] or 0.0) + r["wall_s"], 6)
+            else:
+                entry["stages"].append({k: v for k, v in r.items() if k != "cell"})
+        elapsed = time.perf_counter() - self._origin
+        if scope is not None:
+            elapsed = (
+                max(r["start_s"] + r["wall_s"] for r in records) - min(r["start_s"] for r in records)
+                if records
+                else 0.0
+            )
+        return {
+            "created": self.created,
+            "pid": os.getpid(),
+            "scope": scope,
+            "elapsed_s": round(elapsed, 6),
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": global_stages,
+            "cells": list(cells.values()),
+        }
+
+    def to_chrome_trace(self, scope: Optional[str] = None) -> Dict[str, Any]:
+        """Exporta las etapas en formato Chrome Trace (chrome://tracing, Perfetto)."""
+        pid = os.getpid()
+        events = []
+        for r in self._scoped_records(scope):
+            label = r["name"]
+            if r["cell"] is not None:
+                label = f"{label} [{r['cell']['year']}/{r['cell']['status']}]"
+            events.append(
+                {
+                    "name": label,
+                    "cat": "stage",
+                    "ph": "X",
+                    "ts": r["start_s"] * 1e6,
+                    "dur": r["wall_s"] * 1e6,
+                    "pid": pid,
+                    "tid": r["thread"],
+                    "args": {
+                        "cpu_s": r["cpu_s"],
+                        "rows": r["rows"],
+                        "peak_rss_mb": r["peak_rss_mb"],
+                    },
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write(
+        self, out_dir: str, chrome_trace: bool = False, scope: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Escribe `run_profile.json` (y opcionalmente `run_trace.json`) en `out_dir`.
+
+        Con `scope` solo se escriben las etapas de ese ámbito (ver `to_dict`).
+
+        Returns:
+            Ruta del perfil escrito o None si falló.
+        """
+        profile_path = Path(out_dir) / RUN_PROFILE_FILENAME
+        try:
+            profile_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(profile_path, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(scope), f, indent=2, ensure_ascii=False)
+            logger.info(f"Perfil de ejecución guardado en: {profile_path}")
+            if chrome_trace:
+                trace_path = Path(out_dir) / CHROME_TRACE_FILENAME
+                with open(trace_path, "w", encoding="utf-8") as f:
+                    json.dump(self.to_chrome_trace(scope), f)
+                logger.info(f"Traza Chrome guardada en: {trace_path}")
+        except Exception as e:
+            logger.error(f"Error guardando el perfil de ejecución en {out_dir}: {e}")
+            return None
+        return str(profile_path)
+
+
+class StageClock:
+    """Cronómetro de vueltas: cada `lap` registra una etapa desde la vuelta anterior."""
+
+    def __init__(self, profiler: RunProfiler) -> None:
+        self._profiler = profiler
+        self._start = profiler._snapshot()
+
+    def lap(self, name: str, rows: Optional[int] = None) -> None:
+        self._profiler._record(name, self._start, rows)
+        self._start = self._profiler._snapshot()
+
+
+class _InstrumentedModule:
+    """Envuelve las funciones de un módulo para medir cada llamada como etapa."""
+
+    def __init__(self, module: Any, prefix: str, profiler: RunProfiler) -> None:
+        self._module = module
+        self._prefix = prefix
+        self._profiler = profiler
+
+    def __getattr__(self, attr: str) -> Any:
+        value = getattr(self._module, attr)
+        if not callable(value) or attr.startswith("_"):
+            return value
+        stage_name = f"{self._prefix}:{attr}"
+        profiler = self._profiler
+
+        def _wrapped(*args: Any, **kwargs: Any) -> Any:
+            with profiler.stage(stage_name):
+                return value(*args, **kwargs)
+
+        return _wrapped
+
+
+_active_profiler: Optional[RunProfiler] = None
+
+
+def get_profiler() -> RunProfiler:
+    """Devuelve el perfilador del proceso, creándolo si no existe."""
+    global _active_profiler
+    if _active_profiler is None:
+        _active_profiler = RunProfiler()
+    return _active_profiler
+
+
+def stage(name: str, rows: Optional[int] = None):
+    """Atajo de `get_profiler().stage(...)`."""
+    return get_profiler().stage(name, rows)
+
+
+def stage_clock() -> StageClock:
+    """Atajo de `get_profiler().clock()`."""
+    return get_profiler().clock()
+
+
+def instrument_module(module: Any, prefix: str) -> Any:
+    """Devuelve un proxy de `module` que registra cada función como etapa `prefix:nombre`."""
+    return _InstrumentedModule(module, prefix, get_profiler())
@@ -0,0 +1,163 @@
+import datetime
+import logging
+from typing import Dict, List, Optional, Sequence, Union
+
+import polars as pl
+
+from .cost_basis import PAIR_COLUMNS, completed_fills
+
+logger = logging.getLogger(__name__)
+
+# Las fotos horarias multiplican las filas por celda; se piden por config
+DEFAULT_SNAPSHOT_INTERVALS = ["1d"]
+
+STATE_COLUMNS = ["position", "net_fiat", "last_price", "exposure"]
+
+
+def analyze_inventory(
+    df: pl.DataFrame, snapshot_intervals: Optional[List[str]] = None
+) -> Dict[str, pl.DataFrame]:
+    """
+    Inventario y exposición fiat a lo largo del tiempo por par activo/fiat.
+
+    Args:
+        df: DataFrame procesado por `analyze`.
+        snapshot_intervals: Intervalos de las fotos periódicas
+            (default: `DEFAULT_SNAPSHOT_INTERVALS`).
+
+    Returns:
+        Diccionario con 'events' (serie por operación) y una entrada
+        `snapshots_<intervalo>` por intervalo.
+    """
+    events = inventory_events(df)
+    if events is None or events.is_empty():
+        logger.info("Sin operaciones completadas para la serie de inventario.")
+        return {}
+
+    result = {"events": events}
+    for every in snapshot_intervals or DEFAULT_SNAPSHOT_INTERVALS:
+        try:
+            result[f"snapshots_{every}"] = inventory_snapshots(events, every)
+        except Exception as e:
+            logger.error(f"Error generando fotos de inventario cada '{every}': {e}")
+    logger.info(
+        f"Serie de inventario: {events.height} operaciones en "
+        f"{events.select(PAIR_COLUMNS).n_unique()} pares."
+    )
+    return result
+
+
+def inventory_events(df: pl.DataFrame) -> Optional[pl.DataFrame]:
+    """
+    Serie de inventario a nivel de operación, con un orden y una suma acumulada.
+
+    Las compras suman cantidad y restan fiat, las ventas al revés. Por par y
+    tras cada operación:
+        - position: cantidad acumulada del activo (negativa si se vendió
+          activo que llegó por fuera de P2P)
+        - net_fiat: flujo fiat acumulado (negativo = fiat invertido)
+        - last_price: precio unitario de la operación
+        - exposure: position valorada a last_price, en la fiat del par
+    """
+    fills = completed_fills(df)
+    if fills is None or fills.is_empty():
+        return fills
+
+    sign = pl.when(pl.col("is_buy")).then(1.0).otherwise(-1.0)
+    return (
+        fills.with_columns(
+            (sign * pl.col("quantity")).alias("quantity_delta"),
+            (-sign * pl.col("value")).alias("fiat_delta"),
+            (pl.col("value") / pl.col("quantity")).alias("last_price"),
+        )
+        .with_columns(
+            pl.col("quantity_delta").cum_sum().over(PAIR_COLUMNS).alias("position"),
+            pl.col("fiat_delta").cum_sum().over(PAIR_COLUMNS).alias("net_fiat"),
+        )
+        .with_columns((pl.col("position") * pl.col("last_price")).alias("exposure"))
+        .select(
+            PAIR_COLUMNS
+            + ["time", "order_number", "is_buy", "quantity_delta", "fiat_delta"]
+            + STATE_COLUMNS
+        )
+    )
+
+
+def inventory_snapshots(events: pl.DataFrame, every: str = "1d") -> pl.DataFrame:
+    """
+    Foto del inventario al final de cada intervalo, por par.
+
+    Toma el último estado de cada intervalo con `group_by_dynamic` y rellena
+    hacia adelante los intervalos sin operaciones, desde la primera
+    operación del par hasta la última.
+
+    Args:
+        events: Resultado de `inventory_events`.
+        every: Intervalo en formato de duración de Polars ('1h', '1d', ...).
+    """
+    # `inventory_events` ya viene ordenado por par y tiempo
+    last_state = (
+        events.group_by_dynamic("time", every=every, group_by=PAIR_COLUMNS, label="left")
+        .agg(
+            [pl.col(col).last() for col in STATE_COLUMNS]
+            + [pl.len().cast(pl.UInt32).alias("trades")]
+        )
+        .sort(PAIR_COLUMNS + ["time"])
+    )
+    return (
+        last_state.upsample("time", every=every, group_by=PAIR_COLUMNS, maintain_order=True)
+        # Las filas insertadas quedan con el par nulo; cada par es un bloque
+        # contiguo que empieza con una fila real, así que basta rellenar en orden.
+        .with_columns(
+            pl.col(PAIR_COLUMNS + STATE_COLUMNS).forward_fill(),
+            pl.col("trades").fill_null(0),
+        )
+        .rename({"time": "snapshot_start"})
+        .select(PAIR_COLUMNS + ["snapshot_start"] + STATE_COLUMNS + ["trades"])
+    )
+
+
+def inventory_asof(
+    events: pl.DataFrame,
+    at: Union[datetime.datetime, Sequence[datetime.datetime], pl.Series],
+) -> pl.DataFrame:
+    """
+    Estado del inventario de cada par en instantes arbitrarios.
+
+    Para cada instante y par devuelve el estado tras la última operación
+    anterior o igual a ese instante (`join_asof` hacia atrás). Los pares sin
+    operaciones previas quedan con estado nulo.
+
+    Args:
+        events: Resultado de `inventory_events`.
+        at: Uno o varios instantes. Si no tienen zona horaria se interpretan
+            en la de la serie.
+    """
+    if isinstance(at, datetime.datetime):
+        at = [at]
+    instants = pl.Series("at", at)
+    time_dtype = events.schema["time"]
+    events_tz = getattr(time_dtype, "time_zone", None)
+    if events_tz and getattr(instants.dtype, "time_zone", None) is None:
+        instants = instants.dt.replace_time_zone(events_tz)
+    instants = instants.cast(time_dtype)
+
+    queries = (
+        events.select(PAIR_COLUMNS)
+        .unique(maintain_order=True)
+        .join(pl.DataFrame(instants).with_row_index("_query"), how="cross")
+        .sort("at")
+    )
+    return (
+        queries.join_asof(
+            events.sort("time").select(PAIR_COLUMNS + ["time"] + STATE_COLUMNS),
+            left_on="at",
+            right_on="time",
+            by=PAIR_COLUMNS,
+            strategy="backward",
+            check_sortedness=False,
+        )
+        .sort(["_query"] + PAIR_COLUMNS)
+        .rename({"time": "last_trade_time"})
+        .select(PAIR_COLUMNS + ["at", "last_trade_time"] + STATE_COLUMNS)
+    )
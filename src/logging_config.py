@@ -2,13 +2,15 @@ import logging
 from pathlib import Path
 
 
-def setup_logging(out_dir: str, log_level: str) -> None:
+def setup_logging(out_dir: str, log_level: str, error_log_mode: str = "w") -> None:
     """
     Configura el logging para la aplicación.
 
     Args:
         out_dir: Directorio base para logs.
         log_level: Nivel de logging (ej: 'DEBUG', 'INFO').
+        error_log_mode: Modo de apertura de `log_error.txt`. Los procesos
+            worker usan 'a' para no truncar el log del proceso principal.
     """
     level = getattr(logging, log_level.upper(), logging.INFO)
     logging.basicConfig(
@@ -21,7 +23,7 @@ def setup_logging(out_dir: str, log_level: str) -> None:
     # Handler de archivo para errores
     error_log_file = Path(out_dir) / "log_error.txt"
     error_log_file.parent.mkdir(parents=True, exist_ok=True)
-    file_handler = logging.FileHandler(error_log_file, mode="w")
+    file_handler = logging.FileHandler(error_log_file, mode=error_log_mode)
     file_handler.setLevel(logging.ERROR)
     file_formatter = logging.Formatter(
         "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -4,6 +4,9 @@ Módulo para la lógica principal de análisis y configuración inicial.
 """
 
 import argparse
+import contextlib
+import hashlib
+import json
 import logging
 import os  # Necesario para algunas operaciones de Path, aunque Path maneja mucho
 import re
@@ -15,16 +18,46 @@ import warnings
 
 # Asegurarse de que DEFAULT_CONFIG esté disponible
 from .config_loader import DEFAULT_CONFIG
-from .analyzer import analyze
-
-# from .plotting import get_plot_config # Eliminada esta importación
-from .reporter import (
-    save_outputs,
-)  # Contiene generate_html_report, generate_summary_excel, save_metric_tables
-from .unified_reporter import UnifiedReporter
+from .execution_profiles import DEFAULT_PROFILE, EXECUTION_PROFILES, get_stage_flags
+from .instrumentation import get_profiler
+from .pipeline_dag import TaskGraph
+from .report_assets import (
+    DEFAULT_REPORT_MODE,
+    REPORT_MODES,
+    THUMBNAILS_DIRNAME,
+    configure_report_assets,
+    ensure_plotly_bundle,
+)
+
+# analyzer (sklearn), reporter (pandas, matplotlib, plotly) y unified_reporter
+# se importan dentro de execute_analysis para que `--help` y la carga de
+# datos no paguen el coste de importarlos.
 
 logger = logging.getLogger(__name__)
 
+# Subdirectorios de estado que produce _apply_status_filters_for_period
+STATUS_SUBDIRS = ["todas", "completadas", "canceladas"]
+
+# Índice de figuras que permite recuperar la lista sin regenerarlas
+FIGURES_INDEX_FILENAME = "figures_index.json"
+
+# Argumentos que no cambian el contenido de las salidas (no invalidan el grafo)
+_ARGS_WITHOUT_OUTPUT_EFFECT = {
+    "log_level",
+    "category_workers",
+    "workers",
+    "task",
+    "force",
+    "list_tasks",
+    "chrome_trace",
+    "profile_cells",
+    "profile_top",
+    "unified_only",
+    "no_unified_report",
+    "profile",
+    "out",
+}
+
 MONTH_NAMES_MAP = {
     "enero": 1,
     "febrero": 2,
@@ -74,7 +107,15 @@ def initialize_analysis(
         formatter_class=argparse.RawTextHelpFormatter,
     )
     parser.add_argument(
-        "--csv", type=str, required=True, help="Ruta al archivo CSV de datos P2P."
+        "--csv",
+        type=str,
+        nargs="+",
+        required=True,
+        help=(
+            "Rutas o patrones glob de los CSV de datos P2P (ej. 'data/*.csv').\n"
+            "Admite CSV comprimidos (.csv.gz, .csv.zst, .zip).\n"
+            "Con varios archivos se eliminan las órdenes duplicadas."
+        ),
     )
     parser.add_argument(
         "--out",
@@ -100,35 +141,63 @@ def initialize_analysis(
         "--fiat_filter",
         nargs="+",
         default=None,
-        help="Filtrar por monedas Fiat (no implementado centralmente aquí aún).",
+        help="Filtrar por monedas Fiat (ej. USD UYU).",
     )
     parser.add_argument(
         "--asset_filter",
         nargs="+",
         default=None,
-        help="Filtrar por tipos de Activos (no implementado centralmente aquí aún).",
+        help="Filtrar por tipos de Activos (ej. USDT BTC).",
     )
     parser.add_argument(
         "--status_filter",
         nargs="+",
         default=None,
-        help="Filtrar por Estados de orden (CLI, para sufijo global o si app.py no filtra).",
+        help="Filtrar por Estados de orden (ej. Completed). También se añade al sufijo global.",
     )
     parser.add_argument(
         "--payment_method_filter",
         nargs="+",
         default=None,
-        help="Filtrar por Métodos de Pago (no implementado centralmente aquí aún).",
+        help="Filtrar por Métodos de Pago.",
     )
     parser.add_argument(
         "--mes",
         help="Analizar solo un mes específico (nombre o número). Ej: --mes mayo",
     )
+    parser.add_argument(
+        "--date_from",
+        default=None,
+        help="Incluir solo operaciones desde esta fecha local (YYYY-MM-DD, inclusive).",
+    )
+    parser.add_argument(
+        "--date_to",
+        default=None,
+        help="Incluir solo operaciones hasta esta fecha local (YYYY-MM-DD, inclusive).",
+    )
+    parser.add_argument(
+        "--min_amount",
+        type=float,
+        default=None,
+        help="Monto total mínimo de la operación en su moneda fiat (TotalPrice).",
+    )
+    parser.add_argument(
+        "--max_amount",
+        type=float,
+        default=None,
+        help="Monto total máximo de la operación en su moneda fiat (TotalPrice).",
+    )
     parser.add_argument(
         "--event_date",
         help="Fecha de evento para análisis comparativo Antes/Después (YYYY-MM-DD) (no implementado centralmente aquí aún).",
     )
 
+    parser.add_argument(
+        "--category_workers",
+        type=int,
+        default=1,
+        help="Número de categorías (MAIN_CATEGORIES) a procesar en paralelo, en procesos separados. 1 = secuencial.",
+    )
     parser.add_argument(
         "--no-annual-breakdown",
         action="store_true",
@@ -150,6 +219,87 @@ def initialize_analysis(
         action="store_true",
         help="Omitir la generación del reporte unificado global.",
     )
+    parser.add_argument(
+        "--profile",
+        choices=sorted(EXECUTION_PROFILES),
+        default=DEFAULT_PROFILE,
+        help=(
+            "Perfil de ejecución: 'tables' (solo CSV de métricas), 'report' "
+            "(CSV + HTML/Excel por período, sin gráficos) o 'full' (todo). "
+            f"Default: {DEFAULT_PROFILE}."
+        ),
+    )
+    parser.add_argument(
+        "--chrome-trace",
+        action="store_true",
+        help=(
+            "Además de run_profile.json, exporta run_trace.json en formato "
+            "Chrome Trace (chrome://tracing o Perfetto)."
+        ),
+    )
+    parser.add_argument(
+        "--profile-cells",
+        action="store_true",
+        help=(
+            "Perfila cada analyze/save_outputs por año/estado con cProfile y "
+            "muestreo de pilas: escribe profile/<paso>.prof y .collapsed junto "
+            "a las salidas y profile_hotspots.csv en el directorio de salida."
+        ),
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=25,
+        help="Funciones por paso en profile_hotspots.csv (Default: 25).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help=(
+            "Hilos del grafo de tareas: celdas año/estado, tablas, HTML y Excel "
+            "independientes se ejecutan en paralelo (Default: 1)."
+        ),
+    )
+    parser.add_argument(
+        "--task",
+        action="append",
+        default=None,
+        help=(
+            "Ejecuta solo esta tarea del grafo (y sus dependencias desactualizadas), "
+            "aunque esté al día. Admite comodines y puede repetirse. "
+            "Ej: --task 'html:2024/*' --task unified_html"
+        ),
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Ejecuta todas las tareas aunque sus salidas estén al día.",
+    )
+    parser.add_argument(
+        "--list-tasks",
+        action="store_true",
+        help="Lista las tareas del grafo y si están al día, sin ejecutarlas.",
+    )
+    parser.add_argument(
+        "--draft",
+        action="store_true",
+        help=(
+            "Modo borrador: figuras a baja resolución (figure_output.draft_dpi "
+            "del config, 72 por defecto) y solo PNG, sin copias SVG/PDF."
+        ),
+    )
+    parser.add_argument(
+        "--report-mode",
+        choices=REPORT_MODES,
+        default=DEFAULT_REPORT_MODE,
+        help=(
+            "'standard': HTML de Plotly autocontenidos e imágenes a resolución "
+            "completa. 'light': plotly.js compartido en assets/, miniaturas web "
+            "con carga diferida enlazadas a la imagen completa y gráficos "
+            f"pequeños incrustados como JSON. Default: {DEFAULT_REPORT_MODE}."
+        ),
+    )
     parser.add_argument(
         "--detect_outliers", action="store_true", help="Activar detección de outliers."
     )
@@ -265,17 +415,18 @@ def _apply_status_filters_for_period(
     df_schema = df.schema  # Usar para crear DFs vacíos si es necesario
 
     if status_column in df.columns:
-        completed_df = df.filter(
-            pl.col(status_column).str.to_titlecase().str.strip_chars() == "Completed"
-        )
+        status_expr = pl.col(status_column)
+        if df.schema[status_column] == pl.String:
+            # Sin normalizar en la ingesta: canonicalizar fila a fila
+            status_expr = status_expr.str.to_titlecase().str.strip_chars()
+
+        completed_df = df.filter(status_expr == "Completed")
         datasets["completadas"] = completed_df.clone()
         logger.info(
             f"Dataset para '{period_name} - completadas' preparado con {completed_df.height} filas."
         )
 
-        cancelled_df = df.filter(
-            pl.col(status_column).str.to_titlecase().str.strip_chars() == "Cancelled"
-        )
+        cancelled_df = df.filter(status_expr == "Cancelled")
         datasets["canceladas"] = cancelled_df.clone()
         logger.info(
             f"Dataset para '{period_name} - canceladas' preparado con {cancelled_df.height} filas."
@@ -374,9 +525,43 @@ def execute_analysis(
     """
     Orquesta el análisis por año y estado y genera salidas y reporte unificado.
 
+    Cada paso se modela como una tarea de `pipeline_dag.TaskGraph`: ingesta,
+    filtro por período, métricas, tablas, gráficos, HTML y Excel por celda,
+    consolidación y los tres pasos del reporte unificado. Las tareas
+    independientes se ejecutan en paralelo (`--workers`), las que están al
+    día se omiten y `--task` permite repetir solo algunas.
+
     Esta función existe para compatibilidad con tests y para facilitar su reuse.
     """
-    all_period_data: Dict[str, Dict[str, Any]] = {}
+    from .analyzer import analyze
+    from .cohorts import COHORTS_DIRNAME
+    from .counterparty_segments import MODELS_DIRNAME, ensure_segment_model, segments_model_path
+    from .reporter import (
+        cell_output_paths,
+        export_excel,
+        generate_figures,
+        metrics_to_pandas,
+        render_html_report,
+        write_metric_tables,
+    )
+    from .plot_utils import configure_figure_output
+    from .transformations.categoricals import decode_categorical_columns
+
+    configure_figure_output(config, draft=getattr(cli_args, "draft", False))
+    profiler = get_profiler()
+    cell_profiler = None
+    if getattr(cli_args, "profile_cells", False):
+        from .profiling import CellProfiler
+
+        cell_profiler = CellProfiler(top_n=getattr(cli_args, "profile_top", 25))
+
+    def _profiled(step: str, year: str, status: str):
+        """Perfila el paso con cProfile si se pidió --profile-cells."""
+        if cell_profiler is None:
+            return contextlib.nullcontext()
+        # Mismo directorio de la celda que usa save_outputs
+        cell_dir = Path(output_dir) / year / year / status
+        return cell_profiler.profile(str(cell_dir), year, status, step)
 
     # Determinar años a analizar (reutiliza la lógica de AnalysisRunner)
     def _determine_years_local() -> list[str]:
@@ -404,57 +589,431 @@ def execute_analysis(
             return unique_years + ["total"]
 
     years = _determine_years_local()
-
-    for year in years:
-        period_output = Path(output_dir) / year
-        # Preparar DataFrame para este periodo
-        if year == "total":
-            df_period = df.clone()
-        else:
-            df_period = (
-                df.filter(pl.col("Year") == int(year)).clone()
-                if "Year" in df.columns
-                else df.clone()
+    stages = get_stage_flags(cli_args)
+    report_mode = getattr(cli_args, "report_mode", DEFAULT_REPORT_MODE)
+    assets_dir = str(Path(output_dir) / "assets")
+    configure_report_assets(report_mode, assets_dir)
+    light_mode = report_mode == "light"
+    if light_mode and (stages["figures"] or stages["html"]):
+        ensure_plotly_bundle(assets_dir)
+    graph = TaskGraph(state_dir=str(output_dir), fingerprint=_dag_fingerprint(cli_args, config))
+
+    # La carga ocurre en app.main (compartida entre categorías); la tarea
+    # 'ingest' publica el DataFrame y declara los archivos de los que depende.
+    graph.add("ingest", lambda _: df, inputs=_dag_input_files(cli_args, config))
+
+    # El modelo de segmentos de contrapartes de la categoría se ajusta una vez
+    # con todas sus operaciones y las celdas solo asignan; solo se reajusta si
+    # cambian rasgos o parámetros, o con `refit: true`.
+    metrics_deps: List[str] = []
+    segments_config = config.get("counterparty_segments") or {}
+    segments_model = segments_model_path(segments_config, output_dir)
+    if segments_config.get("enabled", True) and segments_model:
+        graph.add(
+            "segments_model",
+            lambda deps: ensure_segment_model(deps["ingest"], segments_config, segments_model),
+            deps=["ingest"],
+            outputs=[segments_model],
+        )
+        metrics_deps.append("segments_model")
+
+    # Triángulo de cohortes con todas las operaciones; su estado en
+    # <salida>/models/ hace que una ejecución con meses nuevos solo
+    # recalcule las diagonales a partir del último mes guardado. El heatmap
+    # es una tarea aparte para que activar los gráficos (--profile, que no
+    # entra en la huella) la ejecute aunque las tablas estén al día.
+    cohorts_config = config.get("cohorts") or {}
+    if cohorts_config.get("enabled", True):
+        cohorts_dir = os.path.join(output_dir, COHORTS_DIRNAME)
+        cohort_matrix_path = os.path.join(
+            cohorts_dir, "tables", f"cohort_retention_matrix{clean_filename_suffix_cli}.csv"
+        )
+        graph.add(
+            "cohorts",
+            lambda deps: _write_cohort_tables(
+                deps["ingest"],
+                cohorts_dir,
+                os.path.join(output_dir, MODELS_DIRNAME),
+                clean_filename_suffix_cli,
+            ),
+            deps=["ingest"],
+            outputs=[os.path.join(cohorts_dir, "tables")],
+            load=lambda: cohort_matrix_path if os.path.isfile(cohort_matrix_path) else None,
+        )
+        if stages["figures"]:
+            graph.add(
+                "cohorts_figures",
+                lambda deps: _plot_cohort_heatmap(
+                    deps["cohorts"], os.path.join(cohorts_dir, "figures"), clean_filename_suffix_cli
+                ),
+                deps=["cohorts"],
+                outputs=[os.path.join(cohorts_dir, "figures")],
+                resource="matplotlib",
             )
 
-        # Aplicar filtros de estado
-        status_datasets = _apply_status_filters_for_period(df_period, year, config)
-        all_period_data[year] = {}
+    def _period_task(year: str):
+        def run(deps):
+            base = deps["ingest"]
+            if year == "total":
+                df_period = base.clone()
+            elif "Year" in base.columns:
+                df_period = base.filter(pl.col("Year") == int(year)).clone()
+            else:
+                df_period = base.clone()
+            return _apply_status_filters_for_period(df_period, year, config)
+
+        return run
 
-        for status, df_status in status_datasets.items():
+    def _metrics_task(year: str, status: str):
+        def run(deps):
+            df_status = deps[f"period:{year}"][status]
             if df_status.is_empty():
-                all_period_data[year][status] = {
-                    "df": df_status.clone(),
-                    "metrics": {},
-                }
-                continue
+                return {"df": df_status.clone(), "metrics": {}}
+            with profiler.cell(year, status), profiler.stage(
+                "analyze", rows=df_status.height
+            ), _profiled("analyze", year, status):
+                processed_df, metrics = analyze(
+                    df=df_status.clone(),
+                    col_map=col_map,
+                    sell_config=config,
+                    cli_args=cli_args,
+                    output_dir=output_dir,
+                )
+            return {"df": processed_df, "metrics": metrics}
+
+        return run
+
+    def _pandas_task(year: str, status: str, metrics_key: str):
+        def run(deps):
+            cell_data = _own_frames(deps[metrics_key])
+            if not cell_data["metrics"]:
+                return {"metrics": {}, "df": None}
+            with profiler.cell(year, status), profiler.stage(
+                "to_pandas", rows=cell_data["df"].height
+            ):
+                df_pandas = None
+                if stages["figures"] or stages["excel"]:
+                    df_pandas = decode_categorical_columns(cell_data["df"]).to_pandas(
+                        use_pyarrow_extension_array=True
+                    )
+                return {"metrics": metrics_to_pandas(cell_data["metrics"]), "df": df_pandas}
+
+        return run
+
+    def _cell_step(year: str, status: str, step: str, body):
+        """Ejecuta un paso de salida de la celda con su medición y perfil."""
+
+        metrics_key = f"metrics:{year}/{status}"
+
+        def run(deps):
+            if not deps[metrics_key]["metrics"]:
+                return [] if step == "figures" else None
+            deps = {**deps, metrics_key: _own_frames(deps[metrics_key])}
+            with profiler.cell(year, status), profiler.stage(step), _profiled(
+                step, year, status
+            ):
+                return body(deps)
+
+        return run
 
-            processed_df, metrics = analyze(
-                df=df_status.clone(),
-                col_map=col_map,
-                sell_config=config,
-                cli_args=cli_args,
+    for year in years:
+        period_key = f"period:{year}"
+        graph.add(period_key, _period_task(year), deps=["ingest"])
+        for status in STATUS_SUBDIRS:
+            cell_key = f"{year}/{status}"
+            metrics_key = f"metrics:{cell_key}"
+            pandas_key = f"pandas:{cell_key}"
+            paths = cell_output_paths(
+                str(Path(output_dir) / year), year, status, analysis_title_suffix_cli
             )
-
-            all_period_data[year][status] = {
-                "df": processed_df.clone(),
-                "metrics": metrics,
-            }
-
-            save_outputs(
-                metrics_to_save=metrics,
-                df_to_plot_from=processed_df.clone(),
-                config=config,
-                base_output_dir=str(period_output),
-                output_label=year,
-                status_subdir=status,
-                cli_args=cli_args,
-                col_map=col_map,
-                file_name_suffix_from_cli=clean_filename_suffix_cli,
-                title_suffix_from_cli=analysis_title_suffix_cli,
+            graph.add(metrics_key, _metrics_task(year, status), deps=[period_key] + metrics_deps)
+
+            graph.add(
+                f"tables:{cell_key}",
+                _cell_step(
+                    year,
+                    status,
+                    "tables",
+                    lambda deps, mk=metrics_key, p=paths: write_metric_tables(
+                        deps[mk]["metrics"], p["tables_dir"], clean_filename_suffix_cli
+                    ),
+                ),
+                deps=[metrics_key],
+                outputs=[paths["tables_dir"]],
             )
 
-    # Generar reporte unificado global
-    if not getattr(cli_args, "no_unified_report", False):
-        reporter = UnifiedReporter(str(output_dir), config, cli_args)
-        reporter.generate_unified_report(all_period_data)
+            if not (stages["figures"] or stages["html"] or stages["excel"]):
+                continue
+            graph.add(pandas_key, _pandas_task(year, status, metrics_key), deps=[metrics_key])
+
+            figures_key = f"figures:{cell_key}"
+            if stages["figures"]:
+                index_path = os.path.join(paths["figures_dir"], FIGURES_INDEX_FILENAME)
+
+                def _figures(deps, y=year, s=status, mk=metrics_key, pk=pandas_key, p=paths, index=index_path):
+                    figures = generate_figures(
+                        deps[mk]["df"],
+                        deps[pk]["df"],
+                        deps[pk]["metrics"],
+                        y,
+                        s,
+                        p["figures_dir"],
+                        clean_filename_suffix_cli,
+                        p["final_title_suffix"],
+                        config,
+                    )
+                    _write_json(index, figures)
+                    return figures
+
+                graph.add(
+                    figures_key,
+                    _cell_step(year, status, "figures", _figures),
+                    deps=[metrics_key, pandas_key],
+                    outputs=[paths["figures_dir"]],
+                    resource="matplotlib",
+                    load=lambda index=index_path: _read_json(index, []),
+                )
+
+            if stages["html"]:
+                html_deps = [metrics_key, pandas_key] + ([figures_key] if stages["figures"] else [])
+
+                def _html(deps, y=year, s=status, pk=pandas_key, fk=figures_key, p=paths):
+                    return render_html_report(
+                        deps[pk]["metrics"],
+                        deps.get(fk) or [],
+                        y,
+                        s,
+                        p["reports_dir"],
+                        clean_filename_suffix_cli,
+                        p["report_main_title"],
+                        cli_args,
+                        config,
+                    )
+
+                graph.add(
+                    f"html:{cell_key}",
+                    _cell_step(year, status, "html", _html),
+                    deps=html_deps,
+                    outputs=[
+                        os.path.join(
+                            paths["reports_dir"],
+                            f"p2p_sales_report{clean_filename_suffix_cli}.html",
+                        )
+                    ]
+                    + ([os.path.join(paths["reports_dir"], THUMBNAILS_DIRNAME)] if light_mode else []),
+                )
+
+            if stages["excel"]:
+
+                def _excel(deps, y=year, s=status, pk=pandas_key, p=paths):
+                    export_excel(
+                        deps[pk]["df"],
+                        deps[pk]["metrics"],
+                        y,
+                        s,
+                        p["reports_dir"],
+                        clean_filename_suffix_cli,
+                        config,
+                    )
+
+                graph.add(
+                    f"excel:{cell_key}",
+                    _cell_step(year, status, "excel", _excel),
+                    deps=[metrics_key, pandas_key],
+                    outputs=[
+                        os.path.join(
+                            paths["reports_dir"],
+                            f"p2p_analysis_summary{clean_filename_suffix_cli}.xlsx",
+                        )
+                    ],
+                )
+
+    # Reporte unificado global
+    if stages["unified_report"]:
+        metrics_keys = [
+            f"metrics:{year}/{status}" for year in years for status in STATUS_SUBDIRS
+        ]
+
+        def _consolidate(deps):
+            all_period_data: Dict[str, Dict[str, Any]] = {}
+            for key in metrics_keys:
+                year, status = key.split(":", 1)[1].split("/")
+                all_period_data.setdefault(year, {})[status] = _own_frames(deps[key])
+            return all_period_data
+
+        def _unified_reporter():
+            from .unified_reporter import UnifiedReporter
+
+            return UnifiedReporter(str(output_dir), config, cli_args)
+
+        unified_figures_index = os.path.join(output_dir, "figures", FIGURES_INDEX_FILENAME)
+        unified_excel_path = os.path.join(
+            output_dir, "data_exports", "P2P_Analysis_Consolidated.xlsx"
+        )
+
+        def _unified_figures(deps):
+            with profiler.stage("unified_report.figures"):
+                figure_paths = _unified_reporter().generate_consolidated_figures(
+                    deps["consolidation"]
+                )
+            _write_json(unified_figures_index, figure_paths)
+            return figure_paths
+
+        def _unified_excel(deps):
+            with profiler.stage("unified_report.excel"):
+                return _unified_reporter().generate_consolidated_excel(deps["consolidation"])
+
+        def _unified_html(deps):
+            with profiler.stage("unified_report.html"):
+                return _unified_reporter().generate_unified_html(
+                    deps["consolidation"], deps["unified_figures"], deps["unified_excel"]
+                )
+
+        graph.add("consolidation", _consolidate, deps=metrics_keys)
+        graph.add(
+            "unified_figures",
+            _unified_figures,
+            deps=["consolidation"],
+            outputs=[os.path.join(output_dir, "figures")],
+            resource="matplotlib",
+            load=lambda: _read_json(unified_figures_index, {}),
+        )
+        graph.add(
+            "unified_excel",
+            _unified_excel,
+            deps=["consolidation"],
+            outputs=[unified_excel_path],
+            load=lambda: unified_excel_path,
+        )
+        graph.add(
+            "unified_html",
+            _unified_html,
+            deps=["consolidation", "unified_figures", "unified_excel"],
+            outputs=[os.path.join(output_dir, "reports", "P2P_Unified_Report.html")]
+            + ([os.path.join(output_dir, "reports", THUMBNAILS_DIRNAME)] if light_mode else []),
+        )
+
+    if getattr(cli_args, "list_tasks", False):
+        for row in graph.describe():
+            state = {True: "al día", False: "pendiente", None: "intermedia"}[row["up_to_date"]]
+            logger.info(f"  {row['task']:<40} {state:<11} <- {', '.join(row['deps']) or '-'}")
+        return
+
+    # El perfilador es del proceso: el ámbito separa las etapas de esta
+    # categoría de las de otras categorías del mismo proceso
+    with profiler.scope(str(output_dir)):
+        graph.run(
+            max_workers=getattr(cli_args, "workers", 1),
+            targets=getattr(cli_args, "task", None),
+            force=getattr(cli_args, "force", False),
+        )
+
+    profiler.write(
+        output_dir, chrome_trace=getattr(cli_args, "chrome_trace", False), scope=str(output_dir)
+    )
+    if cell_profiler is not None:
+        cell_profiler.write_summary(output_dir)
+
+
+def _own_frames(cell_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copia superficial de los DataFrames/Series de una celda para un consumidor.
+
+    Las tareas de una misma celda (tablas, Pandas, gráficos, consolidación)
+    pueden ejecutarse a la vez con `--workers > 1`; compartir el mismo objeto
+    Polars entre hilos falla con `RuntimeError: Already mutably borrowed`.
+    `clone()` no copia los datos, solo el envoltorio.
+    """
+
+    def _clone(value):
+        if isinstance(value, (pl.DataFrame, pl.Series)):
+            return value.clone()
+        if isinstance(value, dict):
+            return {key: _clone(item) for key, item in value.items()}
+        return value
+
+    return _clone(cell_data)
+
+
+def _write_cohort_tables(
+    df: pl.DataFrame,
+    cohorts_dir: str,
+    state_dir: str,
+    file_name_suffix: str,
+) -> Optional[str]:
+    """Tablas `cohort_*.csv` en `<salida>/cohorts/tables/`; devuelve la ruta de la matriz de retención."""
+    from .cohorts import analyze_cohorts
+    from .reporter import write_metric_tables
+    from .transformations.numeric import process_numeric_columns
+
+    if "TotalPrice_num" not in df.columns:
+        df = process_numeric_columns(df)
+    result = analyze_cohorts(df, state_dir=state_dir)
+    if not result:
+        return None
+    tables_dir = os.path.join(cohorts_dir, "tables")
+    write_metric_tables(
+        {f"cohort_{key}": value for key, value in result.items()},
+        tables_dir,
+        file_name_suffix,
+    )
+    return os.path.join(tables_dir, f"cohort_retention_matrix{file_name_suffix}.csv")
+
+
+def _plot_cohort_heatmap(matrix_path: Optional[str], figures_dir: str, file_name_suffix: str) -> None:
+    """Heatmap de retención en `<salida>/cohorts/figures/` a partir de la matriz guardada."""
+    if not matrix_path or not os.path.isfile(matrix_path):
+        return
+    from .plotting import plot_cohort_retention_heatmap
+
+    os.makedirs(figures_dir, exist_ok=True)
+    plot_cohort_retention_heatmap(
+        pl.read_csv(matrix_path).to_pandas(), figures_dir, file_identifier=file_name_suffix
+    )
+
+
+def _dag_input_files(cli_args: argparse.Namespace, config: Optional[Dict] = None) -> List[str]:
+    """CSV de entrada, configuración y tabla de tasas FX, para invalidar el grafo."""
+    from .ingest import resolve_input_paths
+
+    inputs: List[str] = []
+    try:
+        inputs.extend(resolve_input_paths(cli_args.csv))
+    except FileNotFoundError:
+        logger.warning("No se pudieron resolver los CSV de entrada para el grafo de tareas.")
+    if getattr(cli_args, "config", None):
+        inputs.append(cli_args.config)
+    rates_path = ((config or {}).get("fx") or {}).get("rates_path")
+    if rates_path:
+        inputs.append(rates_path)
+    return inputs
+
+
+def _dag_fingerprint(cli_args: argparse.Namespace, config: Dict) -> str:
+    """Huella de la configuración y de los argumentos que afectan a las salidas."""
+    relevant_args = {
+        key: value
+        for key, value in sorted(vars(cli_args).items())
+        if key not in _ARGS_WITHOUT_OUTPUT_EFFECT
+    }
+    payload = json.dumps(
+        {"args": relevant_args, "config": config}, sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _write_json(path: str, data: Any) -> None:
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+    except (OSError, TypeError) as e:
+        logger.error(f"Error guardando {path}: {e}")
+
+
+def _read_json(path: str, default: Any) -> Any:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
@@ -0,0 +1,476 @@
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+RUN_MANIFEST_FILENAME = "run_manifest.json"
+_HASH_CHUNK_BYTES = 1 << 20
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 del contenido de un archivo, leído por bloques."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class Task:
+    """
+    Tarea con nombre del pipeline.
+
+    Attributes:
+        name: Identificador único (ej. 'figures:2024/completadas').
+        func: Recibe un diccionario {dependencia: resultado} y devuelve el
+            resultado de la tarea.
+        deps: Tareas cuyo resultado necesita.
+        inputs: Archivos de entrada; si cambia el contenido de alguno, la
+            tarea (y todo lo que depende de ella) se repite.
+        outputs: Archivos o directorios que produce. Las tareas sin salidas
+            son intermedias: solo se ejecutan si alguna tarea que las
+            necesita se ejecuta.
+        resource: Recurso exclusivo (ej. 'matplotlib'); dos tareas con el
+            mismo recurso nunca se ejecutan a la vez.
+        load: Recupera el resultado de una tarea omitida por estar al día,
+            cuando una tarea que depende de ella sí se ejecuta.
+    """
+
+    name: str
+    func: Callable[[Dict[str, Any]], Any]
+    deps: List[str] = field(default_factory=list)
+    inputs: List[str] = field(default_factory=list)
+    outputs: List[str] = field(default_factory=list)
+    resource: Optional[str] = None
+    load: Optional[Callable[[], Any]] = None
+
+
+class TaskGraph:
+    """
+    Grafo de tareas con planificador incremental.
+
+    El directorio de salida lleva un manifiesto (`run_manifest.json`) que
+    registra, por cada archivo producido, la tarea que lo generó, la clave
+    de entradas con que se generó (hash de la huella de configuración y
+    argumentos y del contenido de los archivos de entrada de la tarea y sus
+    ancestros) y su propio hash, tamaño y fecha de modificación.
+
+    Una tarea con salidas está al día si su clave de entradas no cambió y
+    sus archivos siguen como quedaron. Si una tarea se repite, se repiten
+    también sus descendientes. Los archivos regenerados con el mismo
+    contenido recuperan su fecha de modificación anterior, de modo que una
+    publicación con rsync no los vuelve a transferir.
+    """
+
+    def __init__(self, state_dir: Optional[str] = None, fingerprint: str = "") -> None:
+        self.tasks: Dict[str, Task] = {}
+        self.fingerprint = fingerprint
+        self.state_dir = state_dir
+        self.manifest_path = Path(state_dir) / RUN_MANIFEST_FILENAME if state_dir else None
+        self._manifest: Dict[str, Dict[str, Any]] = self._read_manifest()
+        self._manifest_lock = threading.Lock()
+        self._task_keys: Dict[str, str] = {}
+        self._resource_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._consumers: Dict[str, int] = {}
+
+    # --- Construcción ----------------------------------------------------
+    def add(
+        self,
+        name: str,
+        func: Callable[[Dict[str, Any]], Any],
+        deps: Iterable[str] = (),
+        inputs: Iterable[str] = (),
+        outputs: Iterable[str] = (),
+        resource: Optional[str] = None,
+        load: Optional[Callable[[], Any]] = None,
+    ) -> Task:
+        """Registra una tarea. Las dependencias deben existir al planificar."""
+        if name in self.tasks:
+            raise ValueError(f"Tarea duplicada: '{name}'")
+        task = Task(name, func, list(deps), list(inputs), list(outputs), resource, load)
+        self.tasks[name] = task
+        return task
+
+    def order(self) -> List[str]:
+        """
+        Orden topológico estable (respeta el orden de inserción).
+
+        Raises:
+            ValueError: Si hay dependencias desconocidas o ciclos.
+        """
+        for task in self.tasks.values():
+            unknown = [dep for dep in task.deps if dep not in self.tasks]
+            if unknown:
+                raise ValueError(f"La tarea '{task.name}' depende de tareas inexistentes: {unknown}")
+
+        ordered: List[str] = []
+        visiting: Set[str] = set()
+        done: Set[str] = set()
+
+        def visit(name: str, path: List[str]) -> None:
+            if name in done:
+                return
+            if name in visiting:
+                cycle = " -> ".join(path[path.index(name):] + [name])
+                raise ValueError(f"Ciclo en el grafo de tareas: {cycle}")
+            visiting.add(name)
+            for dep in self.tasks[name].deps:
+                visit(dep, path + [name])
+            visiting.discard(name)
+            done.add(name)
+            ordered.append(name)
+
+        for name in self.tasks:
+            visit(name, [])
+        return ordered
+
+    def ancestors(self, names: Iterable[str]) -> Set[str]:
+        """Todas las tareas de las que dependen `names`, directa o indirectamente."""
+        found: Set[str] = set()
+        stack = list(names)
+        while stack:
+            for dep in self.tasks[stack.pop()].deps:
+                if dep not in found:
+                    found.add(dep)
+                    stack.append(dep)
+        return found
+
+    def select(self, patterns: Iterable[str]) -> List[str]:
+        """
+        Tareas cuyo nombre coincide con algún patrón (admite comodines).
+
+        Raises:
+            ValueError: Si un patrón no coincide con ninguna tarea.
+        """
+        selected: List[str] = []
+        for pattern in patterns:
+            matches = [name for name in self.tasks if fnmatch.fnmatchcase(name, pattern)]
+            if not matches:
+                raise ValueError(f"Ninguna tarea coincide con '{pattern}'")
+            selected.extend(name for name in matches if name not in selected)
+        return selected
+
+    # --- Manifiesto incremental --------------------------------------------
+    def _read_manifest(self) -> Dict[str, Dict[str, Any]]:
+        manifest: Dict[str, Dict[str, Any]] = {"inputs": {}, "tasks": {}, "files": {}}
+        if self.manifest_path is None or not self.manifest_path.exists():
+            return manifest
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                stored = json.load(f)
+            for section in manifest:
+                manifest[section].update(stored.get(section, {}))
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Manifiesto ilegible en {self.manifest_path}, se ignora: {e}")
+        return manifest
+
+    def _write_manifest(self) -> None:
+        if self.manifest_path is None:
+            return
+        try:
+            self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            with self._manifest_lock:
+                payload = json.dumps(self._manifest, indent=2, ensure_ascii=False, sort_keys=True)
+            tmp_path = self.manifest_path.with_suffix(".json.tmp")
+            tmp_path.write_text(payload, encoding="utf-8")
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as e:
+            logger.error(f"Error guardando el manifiesto en {self.manifest_path}: {e}")
+
+    def _manifest_key(self, path: str) -> str:
+        """Ruta relativa al directorio de salida (absoluta si está fuera)."""
+        absolute = os.path.abspath(path)
+        if self.state_dir:
+            root = os.path.abspath(self.state_dir)
+            if absolute.startswith(root + os.sep):
+                return os.path.relpath(absolute, root)
+        return absolute
+
+    def _input_digest(self, path: str) -> str:
+        """Hash del contenido de una entrada, cacheado por tamaño y mtime."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return "missing"
+        key = os.path.abspath(path)
+        cached = self._manifest["inputs"].get(key)
+        if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+            return cached["sha256"]
+        digest = file_sha256(path)
+        with self._manifest_lock:
+            self._manifest["inputs"][key] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "sha256": digest,
+            }
+        return digest
+
+    def task_key(self, name: str) -> str:
+        """Hash de la huella y del contenido de las entradas de la tarea y sus ancestros."""
+        if name not in self._task_keys:
+            paths = set(self.tasks[name].inputs)
+            for ancestor in self.ancestors([name]):
+                paths.update(self.tasks[ancestor].inputs)
+            digest = hashlib.sha256(self.fingerprint.encode("utf-8"))
+            for path in sorted(paths):
+                digest.update(f"\0{path}\0{self._input_digest(path)}".encode("utf-8"))
+            self._task_keys[name] = digest.hexdigest()
+        return self._task_keys[name]
+
+    @staticmethod
+    def _output_files(paths: Iterable[str]) -> List[str]:
+        files: List[str] = []
+        for path in paths:
+            if os.path.isdir(path):
+                for root, _, names in os.walk(path):
+                    files.extend(os.path.join(root, n) for n in sorted(names))
+            elif os.path.isfile(path):
+                files.append(path)
+        return files
+
+    def is_up_to_date(self, name: str) -> bool:
+        """Indica si la tarea puede omitirse (ver la descripción de la clase)."""
+        task = self.tasks[name]
+        record = self._manifest["tasks"].get(name)
+        if not task.outputs or not record or record.get("key") != self.task_key(name):
+            return False
+        root = self.state_dir or ""
+        for rel_path in record.get("files", []):
+            entry = self._manifest["files"].get(rel_path)
+            try:
+                stat = os.stat(os.path.join(root, rel_path))
+            except OSError:
+                return False
+            if not entry or (stat.st_size, stat.st_mtime_ns) != (entry["size"], entry["mtime_ns"]):
+                return False
+        return True
+
+    def _mark_done(self, name: str) -> None:
+        """Registra en el manifiesto los archivos producidos por la tarea."""
+        task = self.tasks[name]
+        if not task.outputs:
+            return
+        key = self.task_key(name)
+        produced: List[str] = []
+        unchanged = 0
+        for path in self._output_files(task.outputs):
+            rel_path = self._manifest_key(path)
+            digest = file_sha256(path)
+            previous = self._manifest["files"].get(rel_path)
+            if previous and previous["sha256"] == digest:
+                # Mismo contenido: se conserva la fecha anterior para rsync
+                os.utime(path, ns=(os.stat(path).st_atime_ns, previous["mtime_ns"]))
+                unchanged += 1
+            stat = os.stat(path)
+            produced.append(rel_path)
+            with self._manifest_lock:
+                self._manifest["files"][rel_path] = {
+                    "task": name,
+                    "key": key,
+                    "sha256": digest,
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                }
+        with self._manifest_lock:
+            previous_files = self._manifest["tasks"].get(name, {}).get("files", [])
+            for rel_path in set(previous_files) - set(produced):
+                self._manifest["files"].pop(rel_path, None)
+            self._manifest["tasks"][name] = {"key": key, "files": produced}
+        if unchanged:
+            logger.info(f"Tarea '{name}': {unchanged}/{len(produced)} archivos sin cambios de contenido.")
+
+    # --- Planificación y ejecución ----------------------------------------
+    def plan(
+        self, targets: Optional[Iterable[str]] = None, force: bool = False
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Decide qué tareas ejecutar.
+
+        Args:
+            targets: Patrones de tareas a ejecutar sí o sí (`--task`); sus
+                ancestros desactualizados también se ejecutan, sus
+                descendientes no. Sin targets se considera todo el grafo.
+            force: Ejecutar todas las tareas aunque estén al día.
+
+        Returns:
+            (tareas a ejecutar en orden topológico, tareas al día cuyo
+            resultado hay que recuperar con `load`).
+        """
+        order = self.order()
+        if targets:
+            selected = self.select(targets)
+            scope = set(selected) | self.ancestors(selected)
+            forced = set(selected)
+        else:
+            scope = set(order)
+            forced = scope if force else set()
+
+        dirty: Dict[str, bool] = {}
+        for name in order:
+            if name not in scope:
+                continue
+            task = self.tasks[name]
+            upstream = any(dirty.get(dep, False) for dep in task.deps)
+            if task.outputs:
+                dirty[name] = name in forced or upstream or not self.is_up_to_date(name)
+            else:
+                dirty[name] = upstream
+
+        to_run = {name for name, is_dirty in dirty.items() if is_dirty and self.tasks[name].outputs}
+        to_load: Set[str] = set()
+        stack = list(to_run)
+        while stack:
+            for dep in self.tasks[stack.pop()].deps:
+                if dep in to_run or dep in to_load:
+                    continue
+                if self.tasks[dep].outputs:
+                    to_load.add(dep)
+                else:
+                    to_run.add(dep)
+                    stack.append(dep)
+        return [n for n in order if n in to_run], [n for n in order if n in to_load]
+
+    def describe(self) -> List[Dict[str, Any]]:
+        """Lista las tareas en orden con su tipo, dependencias y si están al día."""
+        rows = []
+        for name in self.order():
+            task = self.tasks[name]
+            rows.append(
+                {
+                    "task": name,
+                    "kind": "output" if task.outputs else "intermediate",
+                    "up_to_date": self.is_up_to_date(name) if task.outputs else None,
+                    "deps": list(task.deps),
+                }
+            )
+        return rows
+
+    def _execute(self, name: str, results: Dict[str, Any]) -> Any:
+        task = self.tasks[name]
+        dep_results = {dep: results.get(dep) for dep in task.deps}
+        lock = self._resource_locks[task.resource] if task.resource else nullcontext()
+        with lock:
+            start = time.perf_counter()
+            result = task.func(dep_results)
+        logger.info(f"Tarea '{name}' completada en {time.perf_counter() - start:.2f}s.")
+        return result
+
+    def run(
+        self,
+        max_workers: int = 1,
+        targets: Optional[Iterable[str]] = None,
+        force: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta el plan: tareas independientes en paralelo con `max_workers`
+        hilos, las que fallan se registran y sus descendientes se omiten.
+
+        Los resultados de las tareas intermedias se liberan en cuanto
+        terminan todas las tareas que los usan, para no retener DataFrames
+        de todas las celdas a la vez.
+
+        Returns:
+            Resultados por tarea ejecutada o recuperada (sin las intermedias
+            ya liberadas).
+        """
+        to_run, to_load = self.plan(targets, force)
+        self._consumers = defaultdict(int)
+        for name in to_run:
+            for dep in self.tasks[name].deps:
+                if not self.tasks[dep].outputs:
+                    self._consumers[dep] += 1
+        skipped = [n for n in self.tasks if self.tasks[n].outputs and n not in to_run]
+        logger.info(
+            f"Grafo de tareas: {len(to_run)} a ejecutar, {len(skipped)} omitidas (al día), {max_workers} hilo(s)."
+        )
+
+        results: Dict[str, Any] = {}
+        for name in to_load:
+            loader = self.tasks[name].load
+            results[name] = loader() if loader else None
+
+        failed: Set[str] = set()
+        try:
+            if max_workers <= 1:
+                for name in to_run:
+                    if self._blocked(name, failed):
+                        self._release_inputs(name, results)
+                        continue
+                    self._run_one(name, results, failed)
+            else:
+                self._run_parallel(to_run, results, failed, max_workers)
+        finally:
+            self._write_manifest()
+
+        if failed:
+            logger.error(f"Tareas fallidas: {sorted(failed)}")
+        return results
+
+    def _release_inputs(self, name: str, results: Dict[str, Any]) -> None:
+        for dep in self.tasks[name].deps:
+            if dep in self._consumers:
+                self._consumers[dep] -= 1
+                if self._consumers[dep] == 0:
+                    results.pop(dep, None)
+
+    def _blocked(self, name: str, failed: Set[str]) -> bool:
+        blocked_by = [dep for dep in self.tasks[name].deps if dep in failed]
+        if blocked_by:
+            logger.warning(f"Tarea '{name}' omitida: fallaron sus dependencias {blocked_by}.")
+            failed.add(name)
+        return bool(blocked_by)
+
+    def _run_one(self, name: str, results: Dict[str, Any], failed: Set[str]) -> None:
+        try:
+            results[name] = self._execute(name, results)
+            self._mark_done(name)
+        except Exception as e:
+            logger.error(f"Error en la tarea '{name}': {e}", exc_info=True)
+            failed.add(name)
+        self._release_inputs(name, results)
+
+    def _run_parallel(
+        self, to_run: List[str], results: Dict[str, Any], failed: Set[str], max_workers: int
+    ) -> None:
+        run_set = set(to_run)
+        pending = {name: {d for d in self.tasks[name].deps if d in run_set} for name in to_run}
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dag") as pool:
+            running = {}
+            while pending or running:
+                for name in [n for n in to_run if n in pending and not pending[n]]:
+                    del pending[name]
+                    if self._blocked(name, failed):
+                        self._release(name, pending)
+                        self._release_inputs(name, results)
+                        continue
+                    running[pool.submit(self._execute, name, results)] = name
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                        self._mark_done(name)
+                    except Exception as e:
+                        logger.error(f"Error en la tarea '{name}': {e}", exc_info=True)
+                        failed.add(name)
+                    self._release(name, pending)
+                    self._release_inputs(name, results)
+
+    @staticmethod
+    def _release(name: str, pending: Dict[str, Set[str]]) -> None:
+        for waiting in pending.values():
+            waiting.discard(name)
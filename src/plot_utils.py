@@ -1,7 +1,88 @@
+import logging
 import os
+from typing import Any, Dict, Optional, Union
+
 import matplotlib.pyplot as plt
 import seaborn as sns
 
+from .config_loader import DEFAULT_FIGURE_OUTPUT
+
+logger = logging.getLogger(__name__)
+
+# Política de salida de figuras del proceso (ver configure_figure_output)
+_figure_output: Dict[str, Any] = dict(DEFAULT_FIGURE_OUTPUT, draft=False)
+
+
+def configure_figure_output(config: Optional[Dict] = None, draft: bool = False) -> Dict[str, Any]:
+    """
+    Fija la política de salida de figuras: DPI y copias vectoriales.
+
+    Toma la sección `figure_output` de la configuración (ver
+    `config_loader.DEFAULT_FIGURE_OUTPUT`). En modo borrador (`--draft`) se
+    usa `draft_dpi` como tope de resolución y solo se escribe el PNG.
+
+    Returns:
+        La política efectiva.
+    """
+    policy = dict(DEFAULT_FIGURE_OUTPUT)
+    policy.update((config or {}).get("figure_output") or {})
+    policy["draft"] = draft
+    if draft:
+        policy["dpi"] = policy["draft_dpi"]
+        policy["vector_formats"] = []
+    elif not policy.get("export_vector", True):
+        policy["vector_formats"] = []
+    _figure_output.clear()
+    _figure_output.update(policy)
+    logger.info(
+        f"Figuras: {policy['dpi']} DPI"
+        f"{', borrador' if draft else ''}; copias vectoriales: {policy['vector_formats'] or 'no'}"
+    )
+    return dict(policy)
+
+
+def get_figure_output() -> Dict[str, Any]:
+    """Devuelve una copia de la política de salida de figuras vigente."""
+    return dict(_figure_output)
+
+
+def output_dpi(fig: plt.Figure, dpi: Union[float, str, None] = None) -> float:
+    """
+    Resolución con la que guardar `fig`.
+
+    Args:
+        fig: Figura a guardar.
+        dpi: None usa la DPI de la política; 'figure' la DPI propia de la
+            figura; un número fija la resolución. En modo borrador cualquier
+            valor se limita a la DPI de borrador.
+    """
+    if dpi is None:
+        resolved = float(_figure_output["dpi"])
+    elif dpi == "figure":
+        resolved = float(fig.dpi)
+    else:
+        resolved = float(dpi)
+    if _figure_output.get("draft"):
+        resolved = min(resolved, float(_figure_output["dpi"]))
+    return resolved
+
+
+def savefig(fig: plt.Figure, file_path: str, dpi: Union[float, str, None] = None, **kwargs: Any) -> str:
+    """
+    Guarda `fig` en `file_path` aplicando la política de DPI.
+
+    Args:
+        fig: Figura de Matplotlib.
+        file_path: Ruta de destino.
+        dpi: Ver `output_dpi`.
+        **kwargs: Argumentos adicionales para `Figure.savefig`.
+
+    Returns:
+        `file_path`.
+    """
+    fig.savefig(file_path, dpi=output_dpi(fig, dpi), **kwargs)
+    return file_path
+
 
 def set_default_style(style: str = "whitegrid") -> None:
     """
@@ -34,9 +115,9 @@ def save_figure(
     fig: plt.Figure,
     out_dir: str,
     filename: str,
-    dpi: int = 300,
+    dpi: Union[float, str, None] = None,
     tight_layout: bool = True,
-    export_svg_pdf: bool = True,
+    export_svg_pdf: Optional[bool] = None,
 ) -> str:
     """
     Guarda una figura en disco, creando el directorio si hace falta.
@@ -45,8 +126,10 @@ def save_figure(
         fig: Objeto Figure de Matplotlib.
         out_dir: Directorio donde guardar.
         filename: Nombre de archivo (con extensión, e.g. 'grafico.png').
-        dpi: Resolución en puntos por pulgada.
+        dpi: Resolución en puntos por pulgada (None: la de la política).
         tight_layout: Si aplicar tight_layout antes de guardar.
+        export_svg_pdf: False omite las copias vectoriales; si no, se
+            exportan las de la política (`figure_output.vector_formats`).
 
     Returns:
         Ruta absoluta al archivo guardado.
@@ -58,16 +141,13 @@ def save_figure(
         except Exception:
             pass
     file_path = os.path.join(out_dir, filename)
-    fig.savefig(file_path, dpi=dpi, bbox_inches="tight")
+    savefig(fig, file_path, dpi=dpi, bbox_inches="tight")
     # Exportaciones adicionales para presentaciones de alta calidad
-    if export_svg_pdf:
-        base, _ = os.path.splitext(file_path)
-        try:
-            fig.savefig(f"{base}.svg", bbox_inches="tight")
-        except Exception:
-            pass
+    vector_formats = _figure_output["vector_formats"] if export_svg_pdf is not False else []
+    base, _ = os.path.splitext(file_path)
+    for fmt in vector_formats:
         try:
-            fig.savefig(f"{base}.pdf", bbox_inches="tight")
+            fig.savefig(f"{base}.{fmt}", bbox_inches="tight")
         except Exception:
             pass
     plt.close(fig)
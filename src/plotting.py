@@ -10,7 +10,9 @@ from . import utils
 import matplotlib.ticker as mticker
 from typing import Union
 import numpy as np
-from .plot_utils import set_default_style, create_figure, save_figure
+from .plot_utils import set_default_style, create_figure, save_figure, savefig
+from .report_assets import write_plotly_html
+from .transformations.categoricals import decode_categorical_columns
 
 logger = logging.getLogger(__name__)
 
@@ -127,7 +129,7 @@ def plot_hourly(
     # Guardar con utilidades
     filename = f"hourly_counts{file_identifier}.png"
     try:
-        file_path = save_figure(fig, out_dir, filename, dpi=300)
+        file_path = save_figure(fig, out_dir, filename)
         logger.info(f"Gráfico horario guardado en: {file_path}")
         return file_path
     except Exception as e:
@@ -364,7 +366,7 @@ def plot_monthly(
 
         file_path = os.path.join(out_dir, file_name_temporal)
         try:
-            plt.savefig(file_path, dpi=300)
+            savefig(plt.gcf(), file_path)
             saved_paths.append(file_path)
             logger.info(
                 f"Gráfico de evolución temporal guardado (agregación {aggregation_level}, ventana {monthly_rolling_window}): {file_path}"
@@ -476,7 +478,7 @@ def plot_pie(
 
     file_path = os.path.join(out_dir, f"{fname_prefix}{file_identifier}.png")
     try:
-        plt.savefig(file_path, dpi=300)
+        savefig(plt.gcf(), file_path)
         logger.info(f"Gráfico de torta '{title}' guardado en: {file_path}")
         plt.close()
         return file_path
@@ -665,7 +667,7 @@ def plot_price_distribution(
             plt.tight_layout(
                 rect=[0, 0.03, 1, 0.93]
             )  # Ajustar rect para suptitle y subtítulo
-            plt.savefig(file_path, dpi=300)
+            savefig(plt.gcf(), file_path)
             saved_paths.append(file_path)
 
         except (Exception, KeyboardInterrupt) as e:
@@ -693,7 +695,7 @@ def plot_price_distribution(
                 )
                 error_ax.axis("off")
                 plt.tight_layout()
-                error_fig.savefig(file_path, dpi=100)
+                savefig(error_fig, file_path, dpi=100)
                 if file_path not in saved_paths:
                     saved_paths.append(file_path)
             except Exception as e_placeholder:
@@ -870,7 +872,7 @@ def plot_volume_vs_price_scatter(
         file_name_scatter = f'volume_vs_price_scatter_{str(asset_val).lower().replace(" ", "_")}_{str(fiat_val).lower().replace(" ", "_")}{file_identifier}.png'
         file_path = os.path.join(out_dir, file_name_scatter)
         try:
-            fig.savefig(file_path, dpi=300)  # Usar fig.savefig
+            savefig(fig, file_path)
             saved_paths.append(file_path)
         except (Exception, KeyboardInterrupt) as e:
             logger.error(
@@ -886,7 +888,7 @@ def plot_volume_vs_price_scatter(
                 plt.text(0.5, 0.5, "Gráfico no disponible", ha="center", va="center")
                 plt.title("Placeholder de Scatter", y=0.5)
                 placeholder_path = file_path.replace(".png", "_placeholder.png")
-                error_fig.savefig(placeholder_path, dpi=150)
+                savefig(error_fig, placeholder_path, dpi=150)
                 saved_paths.append(placeholder_path)
             except Exception as e_placeholder:
                 logger.error(
@@ -901,6 +903,86 @@ def plot_volume_vs_price_scatter(
     return saved_paths
 
 
+def _plot_vwap_over_time(
+    vwap_table: pd.DataFrame,
+    out_dir: str,
+    title_suffix: str,
+    file_identifier: str,
+    bucket_label: str,
+) -> list[str]:
+    """VWAP de compra/venta y spread por par desde una tabla ya agregada."""
+    saved_paths = []
+    required_cols = ["asset_type", "fiat_type", "bucket_start", "buy_vwap", "sell_vwap", "spread_pct"]
+    if vwap_table.empty or not all(col in vwap_table.columns for col in required_cols):
+        logger.info(f"Tabla de VWAP vacía o incompleta para Precio a lo largo del Tiempo{title_suffix}.")
+        return saved_paths
+
+    table = vwap_table.copy()
+    table["bucket_start"] = pd.to_datetime(table["bucket_start"].to_numpy())
+    for column in ["buy_vwap", "sell_vwap", "spread_pct"]:
+        table[column] = pd.to_numeric(table[column], errors="coerce").astype(float)
+    window_text = f" ({bucket_label})" if bucket_label else ""
+
+    for (asset_val, fiat_val), pair_table in table.groupby(["asset_type", "fiat_type"]):
+        pair_table = pair_table.sort_values("bucket_start")
+        if pair_table[["buy_vwap", "sell_vwap"]].isna().all().all():
+            continue
+
+        fig, (ax_price, ax_spread) = plt.subplots(
+            2, 1, figsize=(15, 9), sharex=True, gridspec_kw={"height_ratios": [3, 1]}
+        )
+        for column, label, color in [
+            ("buy_vwap", "VWAP BUY", "#27ae60"),
+            ("sell_vwap", "VWAP SELL", "#e74c3c"),
+        ]:
+            series = pair_table[["bucket_start", column]].dropna()
+            if not series.empty:
+                ax_price.plot(series["bucket_start"], series[column], marker=".", label=label, color=color)
+        ax_price.set_ylabel(f"Precio en {fiat_val}", fontsize=12)
+        ax_price.legend(fontsize=9)
+        ax_price.grid(True, linestyle="--", alpha=0.7)
+        ax_price.yaxis.set_major_formatter(
+            mticker.FuncFormatter(lambda x, p: utils.format_large_number(x, precision=2))
+        )
+
+        spread = pair_table[["bucket_start", "spread_pct"]].dropna()
+        if not spread.empty:
+            colors = ["#27ae60" if v >= 0 else "#e74c3c" for v in spread["spread_pct"]]
+            ax_spread.bar(spread["bucket_start"], spread["spread_pct"], color=colors, width=0.8 * _bar_width(spread["bucket_start"]))
+        ax_spread.axhline(0, color="gray", linewidth=0.8)
+        ax_spread.set_ylabel("Spread %", fontsize=12)
+        ax_spread.set_xlabel("Fecha y Hora (Local)", fontsize=12)
+        ax_spread.grid(True, linestyle="--", alpha=0.7)
+
+        fig.suptitle(f"VWAP y Spread para {asset_val}/{fiat_val}{window_text}{title_suffix}", fontsize=16)
+        ax_price.set_title(
+            "Precio ponderado por cantidad de compras y ventas por ventana; spread = VWAP venta - VWAP compra sobre el precio medio.",
+            fontsize=10,
+        )
+        plt.setp(ax_spread.get_xticklabels(), rotation=45, ha="right")
+        fig.tight_layout(rect=[0, 0, 1, 0.95])
+
+        file_name = f'price_over_time_{str(asset_val).lower().replace(" ", "_")}_{str(fiat_val).lower().replace(" ", "_")}{file_identifier}.png'
+        file_path = os.path.join(out_dir, file_name)
+        try:
+            savefig(fig, file_path)
+            saved_paths.append(file_path)
+            logger.info(f"Gráfico de VWAP/spread guardado: {file_path}")
+        except Exception as e:
+            logger.error(f"Error al guardar el gráfico de VWAP/spread {file_path}: {e}")
+        finally:
+            plt.close(fig)
+    return saved_paths
+
+
+def _bar_width(times: pd.Series) -> float:
+    """Ancho de barra (en días) igual al paso mínimo entre ventanas."""
+    if len(times) < 2:
+        return 1.0
+    step = times.sort_values().diff().dropna().min()
+    return max(step / pd.Timedelta(days=1), 1e-4)
+
+
 def plot_price_over_time(
     df_completed: pd.DataFrame,
     out_dir: str,
@@ -908,8 +990,20 @@ def plot_price_over_time(
     file_identifier: str = "_general",
     rolling_window_short: int = 7,  # Corta media móvil (ej. 7 periodos)
     rolling_window_long: int = 30,  # Larga media móvil (ej. 30 periodos)
+    vwap_table: pd.DataFrame | None = None,
+    bucket_label: str = "",
 ) -> list[str]:
-    """Genera gráficos de evolución de precios con configuraciones adaptivas para filtros de mes."""
+    """
+    Genera gráficos de evolución de precios con configuraciones adaptivas para filtros de mes.
+
+    Si se pasa `vwap_table` (una tabla `vwap_<ventana>` de
+    `vwap_analyzer.analyze_vwap_spread`), grafica directamente sus VWAP de
+    compra/venta y el spread por ventana, sin volver a agregar operaciones.
+    """
+    if vwap_table is not None:
+        return _plot_vwap_over_time(
+            vwap_table, out_dir, title_suffix, file_identifier, bucket_label
+        )
     saved_paths = []
     if df_completed.empty:
         logger.info(
@@ -1078,7 +1172,7 @@ def plot_price_over_time(
         file_name_price_time = f'price_over_time_{str(asset_val).lower().replace(" ", "_")}_{str(fiat_val).lower().replace(" ", "_")}{file_identifier}.png'
         file_path = os.path.join(out_dir, file_name_price_time)
         try:
-            fig.savefig(file_path, dpi=300)
+            savefig(fig, file_path)
             saved_paths.append(file_path)
             logger.info(
                 f"Gráfico de precio temporal guardado (ventanas adaptivas {rolling_window_short}/{rolling_window_long}P): {file_path}"
@@ -1299,7 +1393,7 @@ def plot_volume_over_time(
             file_name_volume_time = f'volume_over_time_{vol_type_suffix_filename}_{str(asset_val).lower().replace(" ", "_")}_{str(fiat_val).lower().replace(" ", "_")}{file_identifier}.png'
             file_path = os.path.join(out_dir, file_name_volume_time)
             try:
-                fig.savefig(file_path, dpi=300)
+                savefig(fig, file_path)
                 saved_paths.append(file_path)
                 logger.info(
                     f"Gráfico de volumen temporal guardado (ventanas adaptivas {rolling_window_short}/{rolling_window_long}P): {file_path}"
@@ -1441,7 +1535,7 @@ def plot_price_vs_payment_method(
         file_name_pvpm = f'price_vs_payment_method_{str(asset_val).lower().replace(" ", "_")}_{str(fiat_val).lower().replace(" ", "_")}{file_identifier}.png'
         file_path = os.path.join(out_dir, file_name_pvpm)
         try:
-            fig.savefig(file_path, dpi=300)
+            savefig(fig, file_path)
             saved_paths.append(file_path)
         except Exception as e:
             logger.error(
@@ -1713,7 +1807,7 @@ def plot_activity_heatmap(
     )
 
     try:
-        fig.savefig(file_path, dpi=300)
+        savefig(fig, file_path)
         logger.info(
             f"Heatmap de actividad guardado (anotaciones: {show_annotations}): {file_path}"
         )
@@ -1840,7 +1934,7 @@ def plot_fees_analysis(
         f"fees_analysis_by_{utils.sanitize_filename_component(x_label_text.lower())}_{utils.sanitize_filename_component(plot_col.lower())}{file_identifier}.png",
     )
     try:
-        fig.savefig(file_path, dpi=300)
+        savefig(fig, file_path)
         logger.info(
             f"Gráfico de análisis de comisiones ({x_label_text}) guardado en: {file_path}"
         )
@@ -1884,7 +1978,7 @@ def plot_sankey_fiat_asset(
         )
         return None
 
-    sankey_agg_pd = df_agg.to_pandas()
+    sankey_agg_pd = decode_categorical_columns(df_agg).to_pandas()
 
     # Combinar las dos listas de nodos (origen y destino)
     combined_node_list = (
@@ -1930,7 +2024,7 @@ def plot_sankey_fiat_asset(
         out_dir, f"sankey_fiat_to_asset{file_identifier}.html"
     )  # Guardar como HTML para interactividad
     try:
-        fig.write_html(file_path)
+        write_plotly_html(fig, file_path)
         logger.info(f"Gráfico Sankey guardado en: {file_path}")
         return file_path
     except Exception as e:
@@ -2157,7 +2251,7 @@ def plot_heatmap_hour_day(
     )
 
     try:
-        plt.savefig(file_path)
+        savefig(plt.gcf(), file_path, dpi="figure")
         logger.info(f"Heatmap guardado en: {file_path}")
         plt.close()
         return file_path
@@ -2167,6 +2261,53 @@ def plot_heatmap_hour_day(
         return None
 
 
+def plot_cohort_retention_heatmap(
+    retention_matrix: pd.DataFrame,
+    out_dir: str,
+    title_suffix: str = "",
+    file_identifier: str = "",
+) -> str | None:
+    """Triángulo de retención (cohorte x meses desde la primera operación) de `cohorts.analyze_cohorts`."""
+    offset_cols = [col for col in retention_matrix.columns if str(col).startswith("m") and str(col)[1:].isdigit()]
+    if retention_matrix.empty or not offset_cols:
+        logger.info(f"No hay matriz de cohortes para el heatmap de retención{title_suffix}.")
+        return None
+
+    table = retention_matrix.set_index("cohort")[offset_cols].apply(pd.to_numeric, errors="coerce") * 100
+    sizes = retention_matrix.set_index("cohort")["cohort_size"]
+    table.index = [f"{cohort} (n={int(size)})" for cohort, size in sizes.items()]
+
+    n_rows, n_cols = table.shape
+    fig, ax = plt.subplots(figsize=(max(8, 0.6 * n_cols + 3), max(4, 0.4 * n_rows + 2)))
+    sns.heatmap(
+        table,
+        cmap="YlGnBu",
+        vmin=0,
+        vmax=100,
+        linewidths=0.5,
+        annot=n_rows <= 24 and n_cols <= 24,
+        fmt=".0f",
+        cbar_kws={"label": "% de la cohorte activa"},
+        ax=ax,
+    )
+    ax.set_title(f"Retención por Cohorte (mes de la primera operación){title_suffix}")
+    ax.set_xlabel("Meses desde la primera operación")
+    ax.set_ylabel("Cohorte")
+    plt.yticks(rotation=0)
+    fig.tight_layout()
+
+    file_path = os.path.join(out_dir, f"cohort_retention_heatmap{file_identifier}.png")
+    try:
+        savefig(fig, file_path)
+        logger.info(f"Heatmap de retención por cohorte guardado en: {file_path}")
+        return file_path
+    except Exception as e:
+        logger.error(f"Error al guardar el heatmap de cohortes {file_path}: {e}")
+        return None
+    finally:
+        plt.close(fig)
+
+
 # DONE: 2.3 Violín Precio vs. Método de pago
 def plot_violin_price_vs_payment_method(
     df_data: pl.DataFrame,
@@ -2207,7 +2348,7 @@ def plot_violin_price_vs_payment_method(
         return saved_paths
 
     # Convertir a Pandas para Seaborn
-    df_violin_pd = df_violin_base.select(required_cols).to_pandas(
+    df_violin_pd = decode_categorical_columns(df_violin_base.select(required_cols)).to_pandas(
         use_pyarrow_extension_array=True
     )
 
@@ -2264,7 +2405,7 @@ def plot_violin_price_vs_payment_method(
         file_name_part = f"violin_price_payment_{str(current_asset).lower()}_{str(current_fiat).lower()}{file_identifier}.png"
         file_path = os.path.join(out_dir, file_name_part)
         try:
-            plt.savefig(file_path)
+            savefig(plt.gcf(), file_path, dpi="figure")
             logger.info(
                 f"Gráfico Violín ({current_asset}/{current_fiat}) guardado en: {file_path}"
             )
@@ -2325,7 +2466,7 @@ def plot_yoy_monthly_comparison(
     )
 
     # Convertir a Pandas para pivotar y graficar
-    df_yoy_pd = df_yoy.to_pandas(use_pyarrow_extension_array=True)
+    df_yoy_pd = decode_categorical_columns(df_yoy).to_pandas(use_pyarrow_extension_array=True)
 
     # Un gráfico por cada combinación Asset/Fiat
     for (current_asset, current_fiat), group_df_asset_fiat in df_yoy_pd.groupby(
@@ -2417,7 +2558,7 @@ def plot_yoy_monthly_comparison(
         file_name_part = f"yoy_monthly_{value_col}_{agg_func}_{str(current_asset).lower()}_{str(current_fiat).lower()}{file_identifier}.png"
         file_path = os.path.join(out_dir, file_name_part)
         try:
-            plt.savefig(file_path)
+            savefig(plt.gcf(), file_path, dpi="figure")
             logger.info(
                 f"Gráfico YoY ({current_asset}/{current_fiat}, {value_col}) guardado en: {file_path}"
             )
@@ -2484,8 +2625,10 @@ def plot_animated_scatter_price_volume(
     # Convertir la columna de tiempo a string para que Plotly la ordene correctamente como animación discreta
     # o asegurarse de que sea un tipo datetime que Plotly pueda manejar.
     # Usar Date para la animación (frame diario)
-    df_scatter_pd = df_scatter.with_columns(
-        pl.col(time_col).dt.date().cast(pl.Utf8).alias("animation_frame_date")
+    df_scatter_pd = decode_categorical_columns(
+        df_scatter.with_columns(
+            pl.col(time_col).dt.date().cast(pl.Utf8).alias("animation_frame_date")
+        )
     ).to_pandas(use_pyarrow_extension_array=True)
 
     if df_scatter_pd.empty:
@@ -2555,7 +2698,7 @@ def plot_animated_scatter_price_volume(
         out_dir, f"scatter_animated_price_qty{file_identifier}.html"
     )
     try:
-        fig.write_html(file_path)
+        write_plotly_html(fig, file_path)
         logger.info(f"Scatter animado guardado en: {file_path}")
         return file_path
     except Exception as e:
@@ -2697,7 +2840,7 @@ def plot_price_vs_total_fiat_scatter(
     file_path = os.path.join(out_dir, file_name)
 
     try:
-        plt.savefig(file_path)
+        savefig(plt.gcf(), file_path, dpi="figure")
         logger.info(
             f"Scatter Precio vs Volumen Fiat ({x_axis_label} vs {y_axis_label}) guardado en: {file_path}"
         )
@@ -2823,7 +2966,7 @@ def plot_boxplot_by_payment_method(
         file_path = os.path.join(out_dir, file_name)
 
         try:
-            plt.savefig(file_path)
+            savefig(plt.gcf(), file_path, dpi="figure")
             logger.info(
                 f"Boxplot ({current_asset}/{current_fiat} - {value_col_label}) guardado en: {file_path}"
             )
@@ -2953,7 +3096,7 @@ def plot_order_status_over_time(
     file_path = os.path.join(out_dir, file_name)
 
     try:
-        plt.savefig(file_path)
+        savefig(plt.gcf(), file_path, dpi="figure")
         logger.info(
             f"Gráfico de Completitud de Órdenes por Mes guardado en: {file_path}"
         )
@@ -3069,7 +3212,7 @@ def plot_volume_by_day_of_week(
     file_path = os.path.join(out_dir, file_name)
 
     try:
-        plt.savefig(file_path)
+        savefig(plt.gcf(), file_path, dpi="figure")
         logger.info(
             f"Gráfico de Volumen por Día de la Semana ({volume_col_label}) guardado en: {file_path}"
         )
@@ -3202,7 +3345,7 @@ def plot_buy_sell_volume_over_time(
     file_path = os.path.join(out_dir, file_name)
 
     try:
-        plt.savefig(file_path)
+        savefig(plt.gcf(), file_path, dpi="figure")
         logger.info(
             f"Gráfico de Volumen Compra vs. Venta ({volume_col_label}) guardado en: {file_path}"
         )
@@ -3354,7 +3497,7 @@ def plot_price_vs_total_fiat_scatter(
     file_path = os.path.join(out_dir, file_name)
 
     try:
-        plt.savefig(file_path)
+        savefig(plt.gcf(), file_path, dpi="figure")
         logger.info(
             f"Scatter Precio vs Volumen Fiat ({x_axis_label} vs {y_axis_label}) guardado en: {file_path}"
         )
@@ -3517,7 +3660,7 @@ def plot_simplified_market_depth(
         file_path = os.path.join(out_dir, file_name_part)
 
         try:
-            plt.savefig(file_path)
+            savefig(plt.gcf(), file_path, dpi="figure")
             logger.info(
                 f"Gráfico de Profundidad de Mercado ({current_asset}/{current_fiat}) guardado en: {file_path}"
             )
@@ -3748,7 +3891,7 @@ def plot_daily_average(
             out_dir, f"daily_average_volume{fiat_file_part}{file_identifier}.png"
         )
         try:
-            plt.savefig(file_path, dpi=300)
+            savefig(plt.gcf(), file_path)
             logger.info(
                 f"Gráfico de volumen promedio diario ({current_fiat_label_for_title}) guardado en: {file_path}"
             )
@@ -0,0 +1,186 @@
+import cProfile
+import logging
+import os
+import pstats
+import sys
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import polars as pl
+
+logger = logging.getLogger(__name__)
+
+HOTSPOTS_FILENAME = "profile_hotspots.csv"
+DEFAULT_TOP_N = 25
+DEFAULT_SAMPLE_INTERVAL_S = 0.005
+
+
+class StackSampler:
+    """
+    Muestreador de pilas de un hilo, con salida en formato "collapsed stacks".
+
+    Cada `interval` segundos toma la pila actual del hilo observado y cuenta
+    cuántas veces aparece. El resultado (una línea `f1;f2;f3 N` por pila) es
+    el mismo formato que produce `py-spy record --format raw` y lo aceptan
+    flamegraph.pl y speedscope. Como Polars libera el GIL, las muestras
+    también caen durante el cómputo en Rust, atribuidas a la llamada Python.
+    """
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL_S) -> None:
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self._target_thread = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _frame_label(frame: Any) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target_thread)
+            stack: List[str] = []
+            while frame is not None:
+                stack.append(self._frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.counts[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def write_collapsed(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class CellProfiler:
+    """
+    Perfilado opcional de cada celda año/estado (`--profile-cells`).
+
+    Cada paso de la celda (`analyze`, `tables`, `figures`, `html`, `excel`)
+    se ejecuta bajo cProfile y un `StackSampler`. Junto a las salidas de la celda se escriben
+    `profile/<paso>.prof` (abrible con snakeviz o `python -m pstats`) y
+    `profile/<paso>.collapsed` (flamegraph). Al final, `write_summary` guarda
+    en el directorio de la ejecución una tabla con las N funciones con más
+    tiempo propio de cada paso.
+    """
+
+    def __init__(
+        self,
+        top_n: int = DEFAULT_TOP_N,
+        sample_interval: float = DEFAULT_SAMPLE_INTERVAL_S,
+    ) -> None:
+        self.top_n = top_n
+        self.sample_interval = sample_interval
+        self._rows: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def profile(self, out_dir: str, year: str, status: str, step: str) -> Iterator[None]:
+        """
+        Perfila el bloque y escribe sus archivos en `out_dir/profile/`.
+
+        Args:
+            out_dir: Directorio de salidas de la celda.
+            year: Etiqueta del período ('2024', 'total').
+            status: Subdirectorio de estado ('completadas', ...).
+            step: Nombre del paso perfilado ('analyze', 'tables', 'figures', ...).
+        """
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError as e:
+            # Python 3.12+ no admite dos cProfile activos a la vez (--workers > 1)
+            logger.warning(f"No se pudo perfilar '{step}' ({year}/{status}): {e}")
+            yield
+            return
+        sampler = StackSampler(self.sample_interval)
+        sampler.start()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            sampler.stop()
+            self._save(profiler, sampler, out_dir, year, status, step)
+
+    def _save(
+        self,
+        profiler: cProfile.Profile,
+        sampler: StackSampler,
+        out_dir: str,
+        year: str,
+        status: str,
+        step: str,
+    ) -> None:
+        profile_dir = Path(out_dir) / "profile"
+        try:
+            profile_dir.mkdir(parents=True, exist_ok=True)
+            prof_path = profile_dir / f"{step}.prof"
+            profiler.dump_stats(str(prof_path))
+            sampler.write_collapsed(str(profile_dir / f"{step}.collapsed"))
+            logger.info(f"Perfil de '{step}' ({year}/{status}) guardado en: {prof_path}")
+        except Exception as e:
+            logger.error(f"Error guardando el perfil de '{step}' ({year}/{status}): {e}")
+            return
+
+        stats = pstats.Stats(profiler).stats
+        ranked = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)
+        for rank, ((filename, line, func), (_, ncalls, tottime, cumtime, _)) in enumerate(
+            ranked[: self.top_n], start=1
+        ):
+            self._rows.append(
+                {
+                    "year": str(year),
+                    "status": status,
+                    "step": step,
+                    "rank": rank,
+                    "function": func,
+                    "location": f"{os.path.basename(filename)}:{line}",
+                    "ncalls": ncalls,
+                    "tottime_s": round(tottime, 6),
+                    "cumtime_s": round(cumtime, 6),
+                }
+            )
+
+    def hotspots(self) -> pl.DataFrame:
+        """Tabla de las N funciones con más tiempo propio por celda y paso."""
+        return pl.DataFrame(self._rows)
+
+    def write_summary(self, run_dir: str) -> Optional[str]:
+        """
+        Guarda `profile_hotspots.csv` en `run_dir` y registra el top global.
+
+        Returns:
+            Ruta escrita o None si no hay datos.
+        """
+        table = self.hotspots()
+        if table.is_empty():
+            return None
+        path = Path(run_dir) / HOTSPOTS_FILENAME
+        try:
+            table.write_csv(path)
+        except Exception as e:
+            logger.error(f"Error guardando la tabla de hotspots en {path}: {e}")
+            return None
+
+        overall = (
+            table.group_by(["function", "location"])
+            .agg(pl.sum("tottime_s"), pl.sum("ncalls"))
+            .sort("tottime_s", descending=True)
+            .head(self.top_n)
+        )
+        logger.info(f"Funciones con más tiempo propio (todas las celdas):\n{overall}")
+        logger.info(f"Tabla de hotspots guardada en: {path}")
+        return str(path)
@@ -0,0 +1,178 @@
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+REPORT_MODES = ["standard", "light"]
+DEFAULT_REPORT_MODE = "standard"
+
+PLOTLY_BUNDLE_NAME = "plotly.min.js"
+THUMBNAILS_DIRNAME = "thumbs"
+THUMBNAIL_MAX_WIDTH = 960
+THUMBNAIL_FORMAT = "webp"
+THUMBNAIL_QUALITY = 80
+# Gráficos Plotly cuyo JSON no supera este tamaño se incrustan en el reporte
+INLINE_CHART_MAX_BYTES = 256 * 1024
+
+_IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+_state: Dict[str, Any] = {"mode": DEFAULT_REPORT_MODE, "assets_dir": None}
+_bundle_lock = threading.Lock()
+
+
+def configure_report_assets(mode: str, assets_dir: Optional[str]) -> None:
+    """
+    Fija el modo de reporte del proceso.
+
+    Args:
+        mode: 'standard' (cada HTML de Plotly autocontenido, imágenes a
+            resolución completa) o 'light' (plotly.js compartido en
+            `assets_dir`, miniaturas web con carga diferida y datos de los
+            gráficos pequeños incrustados como JSON).
+        assets_dir: Directorio de recursos compartidos del árbol de salida.
+    """
+    if mode not in REPORT_MODES:
+        logger.warning(f"Modo de reporte desconocido '{mode}'. Se usa '{DEFAULT_REPORT_MODE}'.")
+        mode = DEFAULT_REPORT_MODE
+    _state["mode"] = mode
+    _state["assets_dir"] = assets_dir
+
+
+def is_light_mode() -> bool:
+    return _state["mode"] == "light"
+
+
+def ensure_plotly_bundle(assets_dir: str) -> str:
+    """Escribe `plotly.min.js` una sola vez en `assets_dir` y devuelve su ruta."""
+    bundle_path = os.path.join(assets_dir, PLOTLY_BUNDLE_NAME)
+    with _bundle_lock:
+        if not os.path.isfile(bundle_path) or os.path.getsize(bundle_path) == 0:
+            from plotly.offline import get_plotlyjs
+
+            os.makedirs(assets_dir, exist_ok=True)
+            with open(bundle_path, "w", encoding="utf-8") as f:
+                f.write(get_plotlyjs())
+            logger.info(f"plotly.js compartido escrito en: {bundle_path}")
+    return bundle_path
+
+
+def write_plotly_html(fig: Any, file_path: str) -> str:
+    """
+    Guarda una figura Plotly como HTML según el modo de reporte.
+
+    En modo 'light' el HTML referencia el plotly.js compartido y, junto a
+    él, se guarda `<nombre>.json` con los datos para incrustarlos en el
+    reporte. El `div_id` es fijo para que el HTML no cambie entre
+    ejecuciones con los mismos datos.
+    """
+    div_id = os.path.splitext(os.path.basename(file_path))[0]
+    assets_dir = _state["assets_dir"]
+    if is_light_mode() and assets_dir:
+        bundle_path = ensure_plotly_bundle(assets_dir)
+        bundle_src = os.path.relpath(bundle_path, os.path.dirname(os.path.abspath(file_path)))
+        fig.write_html(file_path, div_id=div_id, include_plotlyjs=bundle_src.replace(os.sep, "/"))
+        with open(os.path.splitext(file_path)[0] + ".json", "w", encoding="utf-8") as f:
+            f.write(fig.to_json())
+    else:
+        fig.write_html(file_path, div_id=div_id)
+    return file_path
+
+
+def make_thumbnail(
+    image_path: str,
+    thumbs_dir: str,
+    max_width: int = THUMBNAIL_MAX_WIDTH,
+    image_format: str = THUMBNAIL_FORMAT,
+) -> Optional[str]:
+    """
+    Crea (o reutiliza si está al día) una miniatura de resolución web.
+
+    Returns:
+        Ruta de la miniatura o None si no se pudo crear.
+    """
+    from PIL import Image
+
+    parent = os.path.basename(os.path.dirname(image_path))
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    thumb_path = os.path.join(thumbs_dir, f"{parent}_{stem}.{image_format}")
+    try:
+        if os.path.exists(thumb_path) and os.path.getmtime(thumb_path) >= os.path.getmtime(image_path):
+            return thumb_path
+        os.makedirs(thumbs_dir, exist_ok=True)
+        with Image.open(image_path) as img:
+            img.thumbnail((max_width, max_width * 4))
+            img.save(thumb_path, format=image_format.upper(), quality=THUMBNAIL_QUALITY)
+        return thumb_path
+    except Exception as e:
+        logger.warning(f"No se pudo crear la miniatura de {image_path}: {e}")
+        return None
+
+
+def inline_chart_json(html_path: str, max_bytes: int = INLINE_CHART_MAX_BYTES) -> Optional[str]:
+    """JSON de una figura Plotly listo para un <script>, si existe y es pequeño."""
+    json_path = os.path.splitext(html_path)[0] + ".json"
+    if not os.path.isfile(json_path) or os.path.getsize(json_path) > max_bytes:
+        return None
+    with open(json_path, encoding="utf-8") as f:
+        payload = f.read()
+    # Evita que un '</script>' dentro de los datos cierre la etiqueta
+    return payload.replace("</", "<\\/")
+
+
+def light_figure_items(figures_for_html: List[Dict[str, Any]], reports_dir: str) -> List[Dict[str, Any]]:
+    """
+    Adapta la lista de figuras de un reporte al modo 'light'.
+
+    Las imágenes pasan a mostrar una miniatura (`thumb`) enlazada a la
+    imagen completa; los gráficos Plotly pequeños se incrustan como JSON
+    (`type: 'plotly_json'`) y el resto se cargan en un iframe diferido.
+    """
+    thumbs_dir = os.path.join(reports_dir, THUMBNAILS_DIRNAME)
+    items = []
+    for index, item in enumerate(figures_for_html):
+        item = dict(item)
+        path = item.get("path")
+        full_path = os.path.normpath(os.path.join(reports_dir, path)) if path else None
+        if full_path and item.get("type") == "html":
+            payload = inline_chart_json(full_path)
+            if payload is not None:
+                item.update(type="plotly_json", json=payload, div_id=f"chart-{index}")
+        elif full_path and full_path.lower().endswith(_IMAGE_EXTENSIONS):
+            thumb_path = make_thumbnail(full_path, thumbs_dir)
+            if thumb_path:
+                item["thumb"] = os.path.relpath(thumb_path, reports_dir).replace(os.sep, "/")
+        items.append(item)
+    return items
+
+
+def plotly_bundle_src(reports_dir: str) -> Optional[str]:
+    """Ruta relativa del plotly.js compartido desde `reports_dir` (modo 'light')."""
+    assets_dir = _state["assets_dir"]
+    if not (is_light_mode() and assets_dir):
+        return None
+    bundle_path = ensure_plotly_bundle(assets_dir)
+    return os.path.relpath(bundle_path, reports_dir).replace(os.sep, "/")
+
+
+def figure_thumbnails(paths: List[str], reports_dir: str) -> Dict[str, Dict[str, str]]:
+    """
+    Miniaturas y enlaces relativos para una lista de imágenes (reporte unificado).
+
+    Returns:
+        {ruta original: {'thumb': ruta relativa, 'full': ruta relativa}}
+    """
+    thumbs_dir = os.path.join(reports_dir, THUMBNAILS_DIRNAME)
+    result = {}
+    for path in paths:
+        if not path or not path.lower().endswith(_IMAGE_EXTENSIONS):
+            continue
+        thumb_path = make_thumbnail(path, thumbs_dir)
+        if thumb_path:
+            result[path] = {
+                "thumb": os.path.relpath(thumb_path, reports_dir).replace(os.sep, "/"),
+                "full": os.path.relpath(path, reports_dir).replace(os.sep, "/"),
+            }
+    return result
+
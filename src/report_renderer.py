@@ -0,0 +1,106 @@
+import logging
+import os
+import pathlib
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = pathlib.Path(__file__).resolve().parent.parent / "templates"
+DEFAULT_BYTECODE_CACHE_DIR = os.path.join(tempfile.gettempdir(), "p2p_jinja_cache")
+
+# Plantillas que se compilan al crear el servicio
+PRECOMPILED_TEMPLATES = ["report_template.html", "unified_report_template.html"]
+
+
+class ReportRenderer:
+    """
+    Servicio de renderizado de reportes HTML.
+
+    Mantiene un único `Environment` de Jinja2 para todo el proceso: cada
+    plantilla se compila una sola vez y queda en la caché del entorno, y el
+    bytecode compilado se guarda en disco (`FileSystemBytecodeCache`) para
+    que las ejecuciones siguientes no vuelvan a compilarla. Las plantillas
+    compiladas son seguras para renderizar desde varios hilos, como hacen
+    las tareas `html:*` del grafo con `--workers`.
+    """
+
+    def __init__(
+        self,
+        templates_dir: str = str(TEMPLATES_DIR),
+        bytecode_cache_dir: Optional[str] = DEFAULT_BYTECODE_CACHE_DIR,
+    ) -> None:
+        bytecode_cache = None
+        if bytecode_cache_dir:
+            try:
+                os.makedirs(bytecode_cache_dir, exist_ok=True)
+                bytecode_cache = FileSystemBytecodeCache(bytecode_cache_dir)
+            except OSError as e:
+                logger.warning(
+                    f"No se pudo usar la caché de plantillas en {bytecode_cache_dir}: {e}"
+                )
+        self.templates_dir = templates_dir
+        self.env = Environment(
+            loader=FileSystemLoader(templates_dir),
+            autoescape=True,
+            bytecode_cache=bytecode_cache,
+            auto_reload=False,
+        )
+        self._templates: Dict[str, Template] = {}
+        self._lock = threading.Lock()
+
+    def precompile(self, *names: str) -> None:
+        """Compila las plantillas indicadas (las que existan) por adelantado."""
+        for name in names:
+            try:
+                self.get_template(name)
+            except Exception as e:
+                logger.warning(f"No se pudo precompilar la plantilla '{name}': {e}")
+
+    def get_template(self, name: str) -> Template:
+        """
+        Devuelve la plantilla compilada, compilándola la primera vez.
+
+        Raises:
+            jinja2.TemplateNotFound: Si la plantilla no existe.
+        """
+        template = self._templates.get(name)
+        if template is None:
+            with self._lock:
+                template = self._templates.get(name)
+                if template is None:
+                    template = self.env.get_template(name)
+                    self._templates[name] = template
+                    logger.info(f"Plantilla '{name}' compilada desde {self.templates_dir}")
+        return template
+
+    def render(self, name: str, context: Dict[str, Any]) -> str:
+        """Renderiza la plantilla `name` con `context`."""
+        return self.get_template(name).render(context)
+
+    def render_to_file(self, name: str, context: Dict[str, Any], path: str) -> str:
+        """Renderiza la plantilla y la guarda en `path` (UTF-8)."""
+        html_output = self.render(name, context)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(html_output)
+        return path
+
+
+_renderer: Optional[ReportRenderer] = None
+_renderer_lock = threading.Lock()
+
+
+def get_renderer() -> ReportRenderer:
+    """Devuelve el servicio de renderizado del proceso, creándolo si no existe."""
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                renderer = ReportRenderer()
+                renderer.precompile(*PRECOMPILED_TEMPLATES)
+                _renderer = renderer
+    return _renderer
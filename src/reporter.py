@@ -2,16 +2,19 @@ import os
 import logging
 import datetime
 import polars as pl
-import pandas as pd
-from jinja2 import Environment, FileSystemLoader
 import argparse
-import pathlib
+from typing import Dict, Optional
 
-from . import plotting
-from . import counterparty_plotting  # Importar el nuevo módulo
+from .transformations.categoricals import decode_categorical_columns
+from .execution_profiles import get_stage_flags
+from .instrumentation import instrument_module, stage, stage_clock
+from .report_assets import is_light_mode, light_figure_items, plotly_bundle_src
+from .report_renderer import get_renderer
 
 logger = logging.getLogger(__name__)
 
+REPORT_TEMPLATE = "report_template.html"
+
 
 def save_outputs(
     df_to_plot_from: pl.DataFrame,
@@ -25,82 +28,98 @@ def save_outputs(
     cli_args: argparse.Namespace,
     config: dict,
 ):
+    """
+    Guarda las salidas de una celda año/estado: tablas, gráficos, HTML y Excel.
+
+    Ejecuta en orden los pasos `write_metric_tables`, `generate_figures`,
+    `render_html_report` y `export_excel`, respetando el perfil de ejecución
+    (`--profile`). El executor de tareas (`pipeline_dag`) llama a los mismos
+    pasos por separado.
+    """
     section_id = f"{output_label.upper()} - {status_subdir.upper()}"
     logger.info(f"\n--- INICIO: Procesamiento y Guardado para: {section_id} ---")
 
-    # Construcción robusta de la ruta a la carpeta de plantillas usando pathlib
-    try:
-        script_path = pathlib.Path(__file__).resolve()
-        project_root = script_path.parent.parent  # Sube dos niveles: src -> p2p
-        templates_path = project_root / "templates"
-        templates_path_str = str(templates_path)
-        logger.info(
-            f"[REPORTER_DEBUG] Ruta de templates construida con pathlib: {templates_path_str}"
-        )
-    except Exception as e_path:
-        logger.error(
-            f"[REPORTER_DEBUG] Error al construir ruta de templates con pathlib: {e_path}"
+    stages = get_stage_flags(cli_args)
+    clock = stage_clock()
+    cell = cell_output_paths(
+        base_output_dir, output_label, status_subdir, title_suffix_from_cli
+    )
+
+    write_metric_tables(metrics_to_save, cell["tables_dir"], file_name_suffix_from_cli)
+    clock.lap("tables", rows=len(metrics_to_save))
+
+    # Las conversiones a Pandas solo alimentan gráficos, HTML y Excel
+    metrics_to_save_pandas = {}
+    df_to_plot_from_pandas = None
+    if stages["figures"] or stages["html"] or stages["excel"]:
+        metrics_to_save_pandas = metrics_to_pandas(metrics_to_save)
+        if stages["figures"] or stages["excel"]:
+            df_to_plot_from_pandas = decode_categorical_columns(df_to_plot_from).to_pandas(use_pyarrow_extension_array=True)
+        clock.lap("to_pandas", rows=df_to_plot_from.height)
+
+    if stages["figures"]:
+        figures_for_html = generate_figures(
+            df_to_plot_from,
+            df_to_plot_from_pandas,
+            metrics_to_save_pandas,
+            output_label,
+            status_subdir,
+            cell["figures_dir"],
+            file_name_suffix_from_cli,
+            cell["final_title_suffix"],
+            config,
         )
-        # Fallback a la lógica anterior si pathlib falla (aunque es improbable)
-        script_dir_fallback = os.path.dirname(os.path.abspath(__file__))
-        templates_path_str = os.path.join(script_dir_fallback, "..", "templates")
-        logger.warning(
-            f"[REPORTER_DEBUG] Usando ruta de fallback para templates: {templates_path_str}"
+        clock.lap("figures", rows=len(figures_for_html))
+    else:
+        figures_for_html = []
+        logger.info(
+            f"Gráficos omitidos por el perfil de ejecución para '{output_label} - {status_subdir}'."
         )
 
-    env = None
-    template = None
-    try:
-        logger.info(
-            f"[REPORTER_DEBUG] Intentando cargar templates desde: {templates_path_str}"
+    if stages["html"]:
+        render_html_report(
+            metrics_to_save_pandas,
+            figures_for_html,
+            output_label,
+            status_subdir,
+            cell["reports_dir"],
+            file_name_suffix_from_cli,
+            cell["report_main_title"],
+            cli_args,
+            config,
         )
-        if not os.path.isdir(templates_path_str):  # Usar os.path.isdir con la cadena
-            logger.error(
-                f"[REPORTER_DEBUG] La ruta de templates NO es un directorio: {templates_path_str}"
+        clock.lap("html")
+
+    if stages["excel"]:
+        with stage("excel", rows=df_to_plot_from.height):
+            export_excel(
+                df_to_plot_from_pandas,
+                metrics_to_save_pandas,
+                output_label,
+                status_subdir,
+                cell["reports_dir"],
+                file_name_suffix_from_cli,
+                config,
             )
-        else:
-            logger.info(f"[REPORTER_DEBUG] La ruta de templates SÍ es un directorio.")
-            env = Environment(
-                loader=FileSystemLoader(templates_path_str), autoescape=True
-            )
-            logger.info(f"[REPORTER_DEBUG] Jinja Environment creado: {env is not None}")
-            if env:
-                template = env.get_template("report_template.html")
-                logger.info(
-                    f"[REPORTER_DEBUG] Plantilla 'report_template.html' cargada: {template is not None}"
-                )
-            else:
-                logger.error("[REPORTER_DEBUG] Jinja Environment no se pudo crear.")
-                template = None
+    else:
+        logger.info(
+            f"Exportación XLSX omitida por el perfil de ejecución para '{output_label} - {status_subdir}'."
+        )
 
-    except Exception as e:
-        logger.error(f"[REPORTER_DEBUG] Error al cargar plantilla Jinja2: {e}")
-        template = None
-
-    period_and_status_path = os.path.join(base_output_dir, output_label, status_subdir)
-    os.makedirs(period_and_status_path, exist_ok=True)
-    tables_dir = os.path.join(period_and_status_path, "tables")
-    figures_dir = os.path.join(period_and_status_path, "figures")
-    reports_dir = os.path.join(period_and_status_path, "reports")
-    os.makedirs(tables_dir, exist_ok=True)
-    os.makedirs(figures_dir, exist_ok=True)
-    os.makedirs(reports_dir, exist_ok=True)
+    logger.info(f"--- FIN: Procesamiento y Guardado para: {section_id} ---")
 
-    # Crear subdirectorios para figuras por moneda
-    figures_dir_usd = os.path.join(
-        figures_dir, "usd_usdt"
-    )  # Nombrado usd_usdt para claridad
-    figures_dir_uyu = os.path.join(figures_dir, "uyu")
-    figures_dir_general = os.path.join(figures_dir, "general")
-    figures_dir_combined = os.path.join(figures_dir, "combined")
-    # Nuevo subdirectorio para contrapartes
-    figures_dir_counterparty = os.path.join(figures_dir, "counterparty_analysis")
-    os.makedirs(figures_dir_usd, exist_ok=True)
-    os.makedirs(figures_dir_uyu, exist_ok=True)
-    os.makedirs(figures_dir_general, exist_ok=True)
-    os.makedirs(figures_dir_combined, exist_ok=True)
-    os.makedirs(figures_dir_counterparty, exist_ok=True)
 
+def cell_output_paths(
+    base_output_dir: str, output_label: str, status_subdir: str, title_suffix_from_cli: str
+) -> Dict[str, str]:
+    """
+    Rutas y títulos de las salidas de una celda año/estado.
+
+    Returns:
+        Diccionario con 'cell_dir', 'tables_dir', 'figures_dir', 'reports_dir',
+        'final_title_suffix' y 'report_main_title'.
+    """
+    cell_dir = os.path.join(base_output_dir, output_label, status_subdir)
     final_title_suffix = title_suffix_from_cli
     report_main_title = f"Reporte de Operaciones P2P"
     if output_label.lower() != "total":
@@ -113,11 +132,26 @@ def save_outputs(
         report_main_title += f" - Consolidado Total ({status_subdir.capitalize()})"
     if title_suffix_from_cli and title_suffix_from_cli not in report_main_title:
         report_main_title += f" {title_suffix_from_cli}"
+    return {
+        "cell_dir": cell_dir,
+        "tables_dir": os.path.join(cell_dir, "tables"),
+        "figures_dir": os.path.join(cell_dir, "figures"),
+        "reports_dir": os.path.join(cell_dir, "reports"),
+        "final_title_suffix": final_title_suffix,
+        "report_main_title": report_main_title,
+    }
 
-    logger.info(
-        f"Guardando tablas de métricas para '{output_label} - {status_subdir}' en: {tables_dir}"
-    )
-    metrics_to_save_pandas = {}
+
+def write_metric_tables(
+    metrics_to_save: dict[str, pl.DataFrame | pl.Series],
+    tables_dir: str,
+    file_name_suffix_from_cli: str,
+) -> None:
+    """Escribe cada métrica no vacía como `tables/<nombre><sufijo>.csv`."""
+    import pandas as pd
+
+    os.makedirs(tables_dir, exist_ok=True)
+    logger.info(f"Guardando tablas de métricas en: {tables_dir}")
 
     for name, table_data_pl in metrics_to_save.items():
         clean_metric_name = "".join(
@@ -128,11 +162,6 @@ def save_outputs(
         )
 
         if isinstance(table_data_pl, pl.DataFrame):
-            metrics_to_save_pandas[name] = (
-                table_data_pl.to_pandas(use_pyarrow_extension_array=True)
-                if not table_data_pl.is_empty()
-                else pd.DataFrame()
-            )
             if not table_data_pl.is_empty():
                 try:
                     table_data_pl.write_csv(file_path)
@@ -147,7 +176,6 @@ def save_outputs(
                 if not table_data_pl.is_empty()
                 else pd.Series(dtype="object")
             )
-            metrics_to_save_pandas[name] = pandas_equivalent
             if not table_data_pl.is_empty():
                 try:
                     if isinstance(pandas_equivalent, pd.DataFrame):
@@ -168,15 +196,410 @@ def save_outputs(
             else:
                 logger.info(f"  Serie Polars '{name}' vacía, no se guarda CSV.")
         else:
-            metrics_to_save_pandas[name] = table_data_pl
             logger.warning(
                 f"  Resultado '{name}' no es Polars DataFrame/Series. Tipo: {type(table_data_pl)}. Se usa como está para el reporte."
             )
 
+
+def metrics_to_pandas(
+    metrics_to_save: dict[str, pl.DataFrame | pl.Series],
+) -> dict:
+    """Convierte las métricas a Pandas para gráficos, HTML y Excel."""
+    import pandas as pd
+
+    metrics_to_save_pandas = {}
+    for name, table_data_pl in metrics_to_save.items():
+        if isinstance(table_data_pl, pl.DataFrame):
+            metrics_to_save_pandas[name] = (
+                decode_categorical_columns(table_data_pl).to_pandas(use_pyarrow_extension_array=True)
+                if not table_data_pl.is_empty()
+                else pd.DataFrame()
+            )
+        elif isinstance(table_data_pl, pl.Series):
+            metrics_to_save_pandas[name] = (
+                table_data_pl.to_pandas(use_pyarrow_extension_array=True)
+                if not table_data_pl.is_empty()
+                else pd.Series(dtype="object")
+            )
+        else:
+            metrics_to_save_pandas[name] = table_data_pl
+    return metrics_to_save_pandas
+
+
+def render_html_report(
+    metrics_to_save_pandas: dict,
+    figures_for_html: list,
+    output_label: str,
+    status_subdir: str,
+    reports_dir: str,
+    file_name_suffix_from_cli: str,
+    report_main_title: str,
+    cli_args: argparse.Namespace,
+    config: dict,
+) -> Optional[str]:
+    """
+    Renderiza el reporte HTML de una celda con sus tablas y figuras.
+
+    Returns:
+        Ruta del reporte escrito o None si no se generó.
+    """
+    import pandas as pd
+
+    try:
+        template = get_renderer().get_template(REPORT_TEMPLATE)
+    except Exception as e:
+        logger.warning(
+            f"No se pudo cargar la plantilla HTML ({e}). No se generará el reporte HTML para '{output_label} - {status_subdir}'."
+        )
+        return None
+    os.makedirs(reports_dir, exist_ok=True)
+    report_path = None
+
+    light_mode = is_light_mode()
+    if light_mode:
+        # Miniaturas web diferidas y gráficos pequeños incrustados como JSON
+        figures_for_html = light_figure_items(figures_for_html, reports_dir)
+
+    logger.info(
+        f"Preparando datos para el reporte HTML de '{output_label} - {status_subdir}'..."
+    )
+    current_year = datetime.datetime.now().year
+    html_context = {
+        "title": report_main_title,
+        "generation_timestamp": datetime.datetime.now().strftime(
+            "%Y-%m-%d %H:%M:%S"
+        )
+        + " (UTC"
+        + datetime.datetime.now(datetime.timezone.utc).astimezone().strftime("%z")
+        + ")",
+        "current_year": current_year,
+        "applied_filters": {},
+        "sales_summary_data": {},
+        "included_tables": [],
+        "included_figures": figures_for_html,
+        "interactive_mode": cli_args.interactive,
+        "light_mode": light_mode,
+        "plotly_bundle_src": plotly_bundle_src(reports_dir)
+        if any(f.get("type") == "plotly_json" for f in figures_for_html)
+        else None,
+        "whale_trades_data": False,  # Inicializar por si acaso
+        "event_comparison_data": False,  # Inicializar por si acaso
+    }
+
+    if cli_args.fiat_filter:
+        html_context["applied_filters"]["Monedas Fiat (CLI)"] = ", ".join(
+            cli_args.fiat_filter
+        )
+    if cli_args.asset_filter:
+        html_context["applied_filters"]["Activos (CLI)"] = ", ".join(
+            cli_args.asset_filter
+        )
+    if cli_args.status_filter:
+        html_context["applied_filters"]["Estados (CLI)"] = ", ".join(
+            cli_args.status_filter
+        )
+    if cli_args.payment_method_filter:
+        html_context["applied_filters"]["Métodos de Pago (CLI)"] = ", ".join(
+            cli_args.payment_method_filter
+        )
+    if output_label.lower() != "total":
+        html_context["applied_filters"]["Periodo Analizado"] = f"Año {output_label}"
+    else:
+        html_context["applied_filters"]["Periodo Analizado"] = "Total Consolidado"
+    html_context["applied_filters"][
+        "Categoría de Estado Procesada"
+    ] = status_subdir.capitalize()
+
+    # DONE: 3.1 Añadir Whale Trades al contexto HTML
+    whale_trades_df = metrics_to_save_pandas.get("whale_trades")
+    if (
+        whale_trades_df is not None
+        and isinstance(whale_trades_df, pd.DataFrame)
+        and not whale_trades_df.empty
+    ):
+        logger.info(
+            f"Añadiendo 'whale_trades' al reporte HTML para '{output_label} - {status_subdir}'."
+        )
+        html_context["whale_trades_data"] = True  # Indicar que hay datos
+        try:
+            # Formatear columnas de fecha/hora si existen, antes de convertir a HTML
+            if "Match_time_local" in whale_trades_df.columns:
+                # Intentar convertir a datetime si no lo es, luego formatear
+                if not pd.api.types.is_datetime64_any_dtype(
+                    whale_trades_df["Match_time_local"]
+                ):
+                    whale_trades_df["Match_time_local"] = pd.to_datetime(
+                        whale_trades_df["Match_time_local"], errors="coerce"
+                    )
+                # Formatear solo si la conversión fue exitosa y es datetime
+                if pd.api.types.is_datetime64_any_dtype(
+                    whale_trades_df["Match_time_local"]
+                ):
+                    whale_trades_df["Match_time_local"] = whale_trades_df[
+                        "Match_time_local"
+                    ].dt.strftime("%Y-%m-%d %H:%M:%S")
+
+            # Formatear columnas numéricas para mejor lectura
+            for col_num_format in ["Price_num", "Quantity_num", "TotalPrice_num"]:
+                if col_num_format in whale_trades_df.columns:
+                    whale_trades_df[col_num_format] = whale_trades_df[
+                        col_num_format
+                    ].apply(lambda x: f"{x:,.2f}" if pd.notnull(x) else x)
+
+            # DONE: 4.2 Añadir clase datatable-ready
+            html_context["whale_trades_table_html"] = whale_trades_df.to_html(
+                classes="table table-striped table-hover table-sm datatable-ready",
+                border=0,
+                index=False,
+                na_rep="N/A",
+            )
+        except Exception as e_html_whale:
+            logger.error(f"Error generando HTML para whale_trades: {e_html_whale}")
+            html_context[
+                "whale_trades_table_html"
+            ] = "<p>Error al generar tabla de whale trades.</p>"
+            html_context["whale_trades_data"] = False  # Indicar que hubo error
+    else:
+        logger.info(
+            f"No hay datos de 'whale_trades' para el reporte HTML en '{output_label} - {status_subdir}'."
+        )
+        html_context["whale_trades_data"] = False  # Indicar que no hay datos
+
+    # DONE: 3.2 Añadir Event Comparison al contexto HTML
+    event_comp_df = metrics_to_save_pandas.get("event_comparison_stats")
+    if (
+        cli_args.event_date
+        and event_comp_df is not None
+        and isinstance(event_comp_df, pd.DataFrame)
+        and not event_comp_df.empty
+    ):
+        logger.info(
+            f"Añadiendo 'event_comparison_stats' para fecha {cli_args.event_date} al reporte HTML para '{output_label} - {status_subdir}'."
+        )
+        html_context["event_comparison_data"] = True  # Indicar que hay datos
+        html_context["event_date_for_report"] = cli_args.event_date
+        try:
+            # Formatear columnas numéricas para mejor lectura
+            cols_to_format_event = [
+                "num_trades",
+                "total_volume_asset",
+                "total_volume_fiat",
+                "avg_price",
+                "median_price",
+            ]
+            event_comp_df_display = event_comp_df.copy()
+            for col_num_format in cols_to_format_event:
+                if col_num_format in event_comp_df_display.columns:
+                    if col_num_format == "num_trades":
+                        event_comp_df_display[
+                            col_num_format
+                        ] = event_comp_df_display[col_num_format].apply(
+                            lambda x: f"{x:,}" if pd.notnull(x) else "0"
+                        )
+                    else:
+                        event_comp_df_display[
+                            col_num_format
+                        ] = event_comp_df_display[col_num_format].apply(
+                            lambda x: f"{x:,.2f}"
+                            if pd.notnull(x)
+                            else ("N/A" if x is None else x)
+                        )
+
+            # DONE: 4.2 Añadir clase datatable-ready
+            html_context[
+                "event_comparison_table_html"
+            ] = event_comp_df_display.to_html(
+                classes="table table-striped table-hover table-sm datatable-ready",
+                border=0,
+                index=False,
+                na_rep="N/A",
+            )
+        except Exception as e_html_event_comp:
+            logger.error(
+                f"Error generando HTML para event_comparison_stats: {e_html_event_comp}"
+            )
+            html_context[
+                "event_comparison_table_html"
+            ] = "<p>Error al generar tabla de comparación de evento.</p>"
+            html_context["event_comparison_data"] = False
+    else:
+        logger.info(
+            f"No hay datos de 'event_comparison_stats' (o --event-date no usado/datos insuficientes) para el reporte HTML en '{output_label} - {status_subdir}'."
+        )
+        html_context["event_comparison_data"] = False
+
+    sales_summary_df_key = "sales_summary_all_assets_fiat_detailed"
+    sales_summary_pd = metrics_to_save_pandas.get(sales_summary_df_key)
+    if (
+        sales_summary_pd is not None
+        and isinstance(sales_summary_pd, pd.DataFrame)
+        and not sales_summary_pd.empty
+    ):
+        logger.info(
+            f"Añadiendo '{sales_summary_df_key}' al reporte HTML para '{output_label} - {status_subdir}'."
+        )
+        html_context["sales_summary_data"][
+            "sales_summary_all_assets_fiat_detailed"
+        ] = True
+        try:
+            # DONE: 4.2 Añadir clase datatable-ready
+            html_context["sales_summary_data"][
+                "sales_summary_all_assets_fiat_detailed_html"
+            ] = sales_summary_pd.to_html(
+                classes="table table-striped table-hover table-sm datatable-ready",
+                border=0,
+                index=False,
+            )
+        except Exception as e_html_sales:
+            logger.error(f"Error generando HTML para sales_summary: {e_html_sales}")
+            html_context["sales_summary_data"][
+                "sales_summary_all_assets_fiat_detailed_html"
+            ] = "<p>Error al generar tabla de resumen de ventas.</p>"
+    else:
+        logger.info(
+            f"No hay datos de '{sales_summary_df_key}' para el reporte HTML en '{output_label} - {status_subdir}'."
+        )
+
+    html_report_prefs = config.get("html_report", {})
+    tables_to_include_keys = html_report_prefs.get("include_tables_default", [])
+    logger.info(
+        f"Tablas configuradas para incluir en HTML ({output_label} - {status_subdir}): {tables_to_include_keys}"
+    )
+
+    for table_key in tables_to_include_keys:
+        table_df_pandas = metrics_to_save_pandas.get(table_key)
+        if table_df_pandas is not None and not table_df_pandas.empty:
+            logger.info(
+                f"Procesando tabla '{table_key}' para HTML en '{output_label} - {status_subdir}'. Tipo: {type(table_df_pandas)}"
+            )
+            current_table_html = "<p>Error desconocido al generar esta tabla.</p>"
+            try:
+                if isinstance(table_df_pandas, pd.Series):
+                    series_name = (
+                        table_df_pandas.name
+                        if table_df_pandas.name
+                        else table_key.replace("_", " ").title()
+                    )
+                    table_df_pandas_for_html = table_df_pandas.to_frame(
+                        name=series_name
+                    )
+                    should_show_index_for_series = True
+                    # DONE: 4.2 Añadir clase datatable-ready
+                    current_table_html = table_df_pandas_for_html.to_html(
+                        classes="table table-striped table-hover table-sm datatable-ready",
+                        border=0,
+                        index=should_show_index_for_series,
+                    )
+                elif isinstance(table_df_pandas, pd.DataFrame):
+                    should_show_index = True
+                    if table_key in [
+                        "status_counts",
+                        "side_counts",
+                        "hourly_counts",
+                    ]:
+                        should_show_index = False
+                    elif (
+                        isinstance(table_df_pandas.index, pd.RangeIndex)
+                        and table_df_pandas.index.name is None
+                    ):
+                        should_show_index = False
+                    elif isinstance(table_df_pandas.index, pd.MultiIndex):
+                        should_show_index = True
+
+                    # DONE: 4.2 Añadir clase datatable-ready
+                    current_table_html = table_df_pandas.to_html(
+                        classes="table table-striped table-hover table-sm datatable-ready",
+                        border=0,
+                        index=should_show_index,
+                    )
+                else:
+                    logger.warning(
+                        f"El objeto para la tabla '{table_key}' no es ni Serie ni DataFrame de Pandas. Tipo: {type(table_df_pandas)}. Se omite del HTML."
+                    )
+                    continue
+
+                html_context["included_tables"].append(
+                    {
+                        "title": table_key.replace("_", " ").title(),
+                        "html": current_table_html,
+                    }
+                )
+            except Exception as e_html_table:
+                logger.error(
+                    f"Error generando HTML para tabla '{table_key}' ({output_label} - {status_subdir}): {e_html_table}"
+                )
+                html_context["included_tables"].append(
+                    {
+                        "title": table_key.replace("_", " ").title(),
+                        "html": f"<p>Error al generar tabla: {table_key}</p>",
+                    }
+                )
+        else:
+            logger.info(
+                f"Tabla '{table_key}' vacía o no encontrada en metrics_to_save_pandas para '{output_label} - {status_subdir}'. No se incluirá en HTML."
+            )
+
+    try:
+        logger.info(
+            f"Renderizando reporte HTML para '{output_label} - {status_subdir}'..."
+        )
+        html_output = template.render(html_context)
+        report_filename = f"p2p_sales_report{file_name_suffix_from_cli}.html"
+        report_path = os.path.join(reports_dir, report_filename)
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write(html_output)
+        logger.info(f"Reporte HTML guardado en: {report_path}")
+    except Exception as e_render:
+        logger.error(
+            f"Error al renderizar o guardar el reporte HTML para '{output_label} - {status_subdir}': {e_render}"
+        )
+    return report_path
+
+
+def generate_figures(
+    df_to_plot_from: pl.DataFrame,
+    df_to_plot_from_pandas,
+    metrics_to_save_pandas: dict,
+    output_label: str,
+    status_subdir: str,
+    figures_dir: str,
+    file_name_suffix_from_cli: str,
+    final_title_suffix: str,
+    config: dict,
+) -> list:
+    """
+    Genera todos los gráficos de un período/estado.
+
+    Returns:
+        Lista de figuras (título y ruta relativa) para el reporte HTML.
+    """
+    import pandas as pd
+    from . import plotting
+    from . import counterparty_plotting
+
+    # Cada llamada de gráfico queda registrada como etapa 'figure:<función>'
+    plotting = instrument_module(plotting, "figure")
+    counterparty_plotting = instrument_module(counterparty_plotting, "figure")
+
     logger.info(
         f"\nGenerando y guardando gráficos para '{output_label} - {status_subdir}' en: {figures_dir}"
     )
-    df_to_plot_from_pandas = df_to_plot_from.to_pandas(use_pyarrow_extension_array=True)
+    os.makedirs(figures_dir, exist_ok=True)
+
+    # Crear subdirectorios para figuras por moneda
+    figures_dir_usd = os.path.join(
+        figures_dir, "usd_usdt"
+    )  # Nombrado usd_usdt para claridad
+    figures_dir_uyu = os.path.join(figures_dir, "uyu")
+    figures_dir_general = os.path.join(figures_dir, "general")
+    figures_dir_combined = os.path.join(figures_dir, "combined")
+    # Nuevo subdirectorio para contrapartes
+    figures_dir_counterparty = os.path.join(figures_dir, "counterparty_analysis")
+    os.makedirs(figures_dir_usd, exist_ok=True)
+    os.makedirs(figures_dir_uyu, exist_ok=True)
+    os.makedirs(figures_dir_general, exist_ok=True)
+    os.makedirs(figures_dir_combined, exist_ok=True)
+    os.makedirs(figures_dir_counterparty, exist_ok=True)
 
     figures_for_html = []
 
@@ -1141,6 +1564,25 @@ def save_outputs(
                     f"No hay datos 'Completed' para {pair_info['asset']}/{pair_info['fiat']} para Distribución de Precios."
                 )
 
+        # --- plot_price_over_time (desde la tabla VWAP ya agregada) ---
+        vwap_bucket = (config or {}).get("vwap", {}).get("plot_bucket", "1d")
+        vwap_table = metrics_to_save_pandas.get(f"vwap_{vwap_bucket}")
+        if isinstance(vwap_table, pd.DataFrame) and not vwap_table.empty:
+            try:
+                paths_vwap = plotting.plot_price_over_time(
+                    None,
+                    figures_dir_general,
+                    title_suffix=final_title_suffix,
+                    file_identifier=f"_vwap_{vwap_bucket}{file_name_suffix_from_cli}",
+                    vwap_table=vwap_table,
+                    bucket_label=vwap_bucket,
+                )
+                add_figure_to_html_list(
+                    paths_vwap, "VWAP y Spread Compra/Venta", subfolder="general"
+                )
+            except Exception as e:
+                logger.error(f"Error en plot_price_over_time (VWAP): {e}")
+
         # --- plot_volume_vs_price_scatter ---
         for pair_info in target_pairs_for_dist_scatter:
             df_filtered = df_completed_for_plots_pandas[
@@ -1742,301 +2184,20 @@ def save_outputs(
     #     else:
     #         logger.warning(f"Columna '{asset_type_col_name_fees}' no encontrada en fees_stats_pd para ploteo en '{output_label} - {status_subdir}'. DF columns: {fees_stats_pd.columns}")
 
-    # --- HTML Report Generation ---
-    if template:
-        logger.info(
-            f"Preparando datos para el reporte HTML de '{output_label} - {status_subdir}'..."
-        )
-        current_year = datetime.datetime.now().year
-        html_context = {
-            "title": report_main_title,
-            "generation_timestamp": datetime.datetime.now().strftime(
-                "%Y-%m-%d %H:%M:%S"
-            )
-            + " (UTC"
-            + datetime.datetime.now(datetime.timezone.utc).astimezone().strftime("%z")
-            + ")",
-            "current_year": current_year,
-            "applied_filters": {},
-            "sales_summary_data": {},
-            "included_tables": [],
-            "included_figures": figures_for_html,
-            "interactive_mode": cli_args.interactive,
-            "whale_trades_data": False,  # Inicializar por si acaso
-            "event_comparison_data": False,  # Inicializar por si acaso
-        }
-
-        if cli_args.fiat_filter:
-            html_context["applied_filters"]["Monedas Fiat (CLI)"] = ", ".join(
-                cli_args.fiat_filter
-            )
-        if cli_args.asset_filter:
-            html_context["applied_filters"]["Activos (CLI)"] = ", ".join(
-                cli_args.asset_filter
-            )
-        if cli_args.status_filter:
-            html_context["applied_filters"]["Estados (CLI)"] = ", ".join(
-                cli_args.status_filter
-            )
-        if cli_args.payment_method_filter:
-            html_context["applied_filters"]["Métodos de Pago (CLI)"] = ", ".join(
-                cli_args.payment_method_filter
-            )
-        if output_label.lower() != "total":
-            html_context["applied_filters"]["Periodo Analizado"] = f"Año {output_label}"
-        else:
-            html_context["applied_filters"]["Periodo Analizado"] = "Total Consolidado"
-        html_context["applied_filters"][
-            "Categoría de Estado Procesada"
-        ] = status_subdir.capitalize()
+    return figures_for_html
 
-        # DONE: 3.1 Añadir Whale Trades al contexto HTML
-        whale_trades_df = metrics_to_save_pandas.get("whale_trades")
-        if (
-            whale_trades_df is not None
-            and isinstance(whale_trades_df, pd.DataFrame)
-            and not whale_trades_df.empty
-        ):
-            logger.info(
-                f"Añadiendo 'whale_trades' al reporte HTML para '{output_label} - {status_subdir}'."
-            )
-            html_context["whale_trades_data"] = True  # Indicar que hay datos
-            try:
-                # Formatear columnas de fecha/hora si existen, antes de convertir a HTML
-                if "Match_time_local" in whale_trades_df.columns:
-                    # Intentar convertir a datetime si no lo es, luego formatear
-                    if not pd.api.types.is_datetime64_any_dtype(
-                        whale_trades_df["Match_time_local"]
-                    ):
-                        whale_trades_df["Match_time_local"] = pd.to_datetime(
-                            whale_trades_df["Match_time_local"], errors="coerce"
-                        )
-                    # Formatear solo si la conversión fue exitosa y es datetime
-                    if pd.api.types.is_datetime64_any_dtype(
-                        whale_trades_df["Match_time_local"]
-                    ):
-                        whale_trades_df["Match_time_local"] = whale_trades_df[
-                            "Match_time_local"
-                        ].dt.strftime("%Y-%m-%d %H:%M:%S")
-
-                # Formatear columnas numéricas para mejor lectura
-                for col_num_format in ["Price_num", "Quantity_num", "TotalPrice_num"]:
-                    if col_num_format in whale_trades_df.columns:
-                        whale_trades_df[col_num_format] = whale_trades_df[
-                            col_num_format
-                        ].apply(lambda x: f"{x:,.2f}" if pd.notnull(x) else x)
-
-                # DONE: 4.2 Añadir clase datatable-ready
-                html_context["whale_trades_table_html"] = whale_trades_df.to_html(
-                    classes="table table-striped table-hover table-sm datatable-ready",
-                    border=0,
-                    index=False,
-                    na_rep="N/A",
-                )
-            except Exception as e_html_whale:
-                logger.error(f"Error generando HTML para whale_trades: {e_html_whale}")
-                html_context[
-                    "whale_trades_table_html"
-                ] = "<p>Error al generar tabla de whale trades.</p>"
-                html_context["whale_trades_data"] = False  # Indicar que hubo error
-        else:
-            logger.info(
-                f"No hay datos de 'whale_trades' para el reporte HTML en '{output_label} - {status_subdir}'."
-            )
-            html_context["whale_trades_data"] = False  # Indicar que no hay datos
-
-        # DONE: 3.2 Añadir Event Comparison al contexto HTML
-        event_comp_df = metrics_to_save_pandas.get("event_comparison_stats")
-        if (
-            cli_args.event_date
-            and event_comp_df is not None
-            and isinstance(event_comp_df, pd.DataFrame)
-            and not event_comp_df.empty
-        ):
-            logger.info(
-                f"Añadiendo 'event_comparison_stats' para fecha {cli_args.event_date} al reporte HTML para '{output_label} - {status_subdir}'."
-            )
-            html_context["event_comparison_data"] = True  # Indicar que hay datos
-            html_context["event_date_for_report"] = cli_args.event_date
-            try:
-                # Formatear columnas numéricas para mejor lectura
-                cols_to_format_event = [
-                    "num_trades",
-                    "total_volume_asset",
-                    "total_volume_fiat",
-                    "avg_price",
-                    "median_price",
-                ]
-                event_comp_df_display = event_comp_df.copy()
-                for col_num_format in cols_to_format_event:
-                    if col_num_format in event_comp_df_display.columns:
-                        if col_num_format == "num_trades":
-                            event_comp_df_display[
-                                col_num_format
-                            ] = event_comp_df_display[col_num_format].apply(
-                                lambda x: f"{x:,}" if pd.notnull(x) else "0"
-                            )
-                        else:
-                            event_comp_df_display[
-                                col_num_format
-                            ] = event_comp_df_display[col_num_format].apply(
-                                lambda x: f"{x:,.2f}"
-                                if pd.notnull(x)
-                                else ("N/A" if x is None else x)
-                            )
-
-                # DONE: 4.2 Añadir clase datatable-ready
-                html_context[
-                    "event_comparison_table_html"
-                ] = event_comp_df_display.to_html(
-                    classes="table table-striped table-hover table-sm datatable-ready",
-                    border=0,
-                    index=False,
-                    na_rep="N/A",
-                )
-            except Exception as e_html_event_comp:
-                logger.error(
-                    f"Error generando HTML para event_comparison_stats: {e_html_event_comp}"
-                )
-                html_context[
-                    "event_comparison_table_html"
-                ] = "<p>Error al generar tabla de comparación de evento.</p>"
-                html_context["event_comparison_data"] = False
-        else:
-            logger.info(
-                f"No hay datos de 'event_comparison_stats' (o --event-date no usado/datos insuficientes) para el reporte HTML en '{output_label} - {status_subdir}'."
-            )
-            html_context["event_comparison_data"] = False
 
-        sales_summary_df_key = "sales_summary_all_assets_fiat_detailed"
-        sales_summary_pd = metrics_to_save_pandas.get(sales_summary_df_key)
-        if (
-            sales_summary_pd is not None
-            and isinstance(sales_summary_pd, pd.DataFrame)
-            and not sales_summary_pd.empty
-        ):
-            logger.info(
-                f"Añadiendo '{sales_summary_df_key}' al reporte HTML para '{output_label} - {status_subdir}'."
-            )
-            html_context["sales_summary_data"][
-                "sales_summary_all_assets_fiat_detailed"
-            ] = True
-            try:
-                # DONE: 4.2 Añadir clase datatable-ready
-                html_context["sales_summary_data"][
-                    "sales_summary_all_assets_fiat_detailed_html"
-                ] = sales_summary_pd.to_html(
-                    classes="table table-striped table-hover table-sm datatable-ready",
-                    border=0,
-                    index=False,
-                )
-            except Exception as e_html_sales:
-                logger.error(f"Error generando HTML para sales_summary: {e_html_sales}")
-                html_context["sales_summary_data"][
-                    "sales_summary_all_assets_fiat_detailed_html"
-                ] = "<p>Error al generar tabla de resumen de ventas.</p>"
-        else:
-            logger.info(
-                f"No hay datos de '{sales_summary_df_key}' para el reporte HTML en '{output_label} - {status_subdir}'."
-            )
-
-        html_report_prefs = config.get("html_report", {})
-        tables_to_include_keys = html_report_prefs.get("include_tables_default", [])
-        logger.info(
-            f"Tablas configuradas para incluir en HTML ({output_label} - {status_subdir}): {tables_to_include_keys}"
-        )
-
-        for table_key in tables_to_include_keys:
-            table_df_pandas = metrics_to_save_pandas.get(table_key)
-            if table_df_pandas is not None and not table_df_pandas.empty:
-                logger.info(
-                    f"Procesando tabla '{table_key}' para HTML en '{output_label} - {status_subdir}'. Tipo: {type(table_df_pandas)}"
-                )
-                current_table_html = "<p>Error desconocido al generar esta tabla.</p>"
-                try:
-                    if isinstance(table_df_pandas, pd.Series):
-                        series_name = (
-                            table_df_pandas.name
-                            if table_df_pandas.name
-                            else table_key.replace("_", " ").title()
-                        )
-                        table_df_pandas_for_html = table_df_pandas.to_frame(
-                            name=series_name
-                        )
-                        should_show_index_for_series = True
-                        # DONE: 4.2 Añadir clase datatable-ready
-                        current_table_html = table_df_pandas_for_html.to_html(
-                            classes="table table-striped table-hover table-sm datatable-ready",
-                            border=0,
-                            index=should_show_index_for_series,
-                        )
-                    elif isinstance(table_df_pandas, pd.DataFrame):
-                        should_show_index = True
-                        if table_key in [
-                            "status_counts",
-                            "side_counts",
-                            "hourly_counts",
-                        ]:
-                            should_show_index = False
-                        elif (
-                            isinstance(table_df_pandas.index, pd.RangeIndex)
-                            and table_df_pandas.index.name is None
-                        ):
-                            should_show_index = False
-                        elif isinstance(table_df_pandas.index, pd.MultiIndex):
-                            should_show_index = True
-
-                        # DONE: 4.2 Añadir clase datatable-ready
-                        current_table_html = table_df_pandas.to_html(
-                            classes="table table-striped table-hover table-sm datatable-ready",
-                            border=0,
-                            index=should_show_index,
-                        )
-                    else:
-                        logger.warning(
-                            f"El objeto para la tabla '{table_key}' no es ni Serie ni DataFrame de Pandas. Tipo: {type(table_df_pandas)}. Se omite del HTML."
-                        )
-                        continue
-
-                    html_context["included_tables"].append(
-                        {
-                            "title": table_key.replace("_", " ").title(),
-                            "html": current_table_html,
-                        }
-                    )
-                except Exception as e_html_table:
-                    logger.error(
-                        f"Error generando HTML para tabla '{table_key}' ({output_label} - {status_subdir}): {e_html_table}"
-                    )
-                    html_context["included_tables"].append(
-                        {
-                            "title": table_key.replace("_", " ").title(),
-                            "html": f"<p>Error al generar tabla: {table_key}</p>",
-                        }
-                    )
-            else:
-                logger.info(
-                    f"Tabla '{table_key}' vacía o no encontrada en metrics_to_save_pandas para '{output_label} - {status_subdir}'. No se incluirá en HTML."
-                )
-
-        try:
-            logger.info(
-                f"Renderizando reporte HTML para '{output_label} - {status_subdir}'..."
-            )
-            html_output = template.render(html_context)
-            report_filename = f"p2p_sales_report{file_name_suffix_from_cli}.html"
-            report_path = os.path.join(reports_dir, report_filename)
-            with open(report_path, "w", encoding="utf-8") as f:
-                f.write(html_output)
-            logger.info(f"Reporte HTML guardado en: {report_path}")
-        except Exception as e_render:
-            logger.error(
-                f"Error al renderizar o guardar el reporte HTML para '{output_label} - {status_subdir}': {e_render}"
-            )
-    else:
-        logger.warning(
-            f"No se encontró la plantilla HTML. No se generará el reporte HTML para '{section_id}'."
-        )
+def export_excel(
+    df_to_plot_from_pandas,
+    metrics_to_save_pandas: dict,
+    output_label: str,
+    status_subdir: str,
+    reports_dir: str,
+    file_name_suffix_from_cli: str,
+    config: dict,
+):
+    """Exporta el DataFrame base y las métricas a un XLSX multi-hoja."""
+    import pandas as pd
 
     # DONE: 4.3 Export XLSX multi-hoja
     logger.info(
@@ -2046,6 +2207,7 @@ def save_outputs(
     xlsx_path = os.path.join(
         reports_dir, xlsx_filename
     )  # Guardar en la subcarpeta de reports
+    os.makedirs(reports_dir, exist_ok=True)
 
     try:
         with pd.ExcelWriter(xlsx_path, engine="openpyxl") as writer:
@@ -2249,5 +2411,3 @@ def save_outputs(
         logger.error(
             f"Error al generar o guardar el archivo XLSX '{xlsx_path}': {e_xlsx}"
         )
-
-    logger.info(f"--- FIN: Procesamiento y Guardado para: {section_id} ---")
@@ -0,0 +1,210 @@
+import logging
+from typing import Dict, List, Optional
+
+import numpy as np
+import polars as pl
+
+logger = logging.getLogger(__name__)
+
+# Frecuencias de remuestreo soportadas -> horas por paso
+SEASONALITY_FREQUENCIES = {"1h": 1.0, "1d": 24.0}
+DEFAULT_SEASONALITY_FREQUENCIES = ["1h", "1d"]
+DEFAULT_TOP_PEAKS = 5
+
+# Periodos de referencia que se informan siempre (si la serie los admite)
+KNOWN_PERIODS_HOURS = {"24h": 24.0, "7d": 168.0, "30d": 720.0}
+
+SERIES_METRICS = {
+    "volume": pl.col("TotalPrice_num").sum(),
+    "operations": pl.len(),
+}
+
+
+def analyze_seasonality(
+    df: pl.DataFrame,
+    frequencies: Optional[List[str]] = None,
+    top_peaks: int = DEFAULT_TOP_PEAKS,
+) -> Dict[str, pl.DataFrame]:
+    """
+    Estacionalidad del volumen y del número de operaciones por fiat con FFT.
+
+    Para cada frecuencia (`1h`, `1d`) construye series equiespaciadas de
+    volumen (`TotalPrice_num`) y operaciones completadas por fiat sobre una
+    misma rejilla temporal (los intervalos sin operaciones valen 0), las
+    apila en una matriz y calcula de una vez el periodograma de todas con
+    `numpy.fft.rfft` sobre el eje temporal.
+
+    La fuerza (`strength`) de un periodo es su potencia dividida por la
+    potencia total de la serie sin la media: 1 si la serie fuera una
+    sinusoide pura de ese periodo.
+
+    Args:
+        df: DataFrame procesado por `analyze`.
+        frequencies: Frecuencias de remuestreo
+            (default: `DEFAULT_SEASONALITY_FREQUENCIES`).
+        top_peaks: Picos de mayor potencia a informar por serie.
+
+    Returns:
+        Diccionario con 'periods' (fuerza en 24h, 7d y 30d por serie) y
+        'peaks' (periodos dominantes por serie).
+    """
+    time_col = "Match_time_local"
+    required = [time_col, "fiat_type", "TotalPrice_num"]
+    missing = [col for col in required if col not in df.columns]
+    if missing:
+        logger.warning(f"Faltan columnas para la estacionalidad: {missing}")
+        return {}
+
+    trades = df
+    if "status" in df.columns:
+        trades = trades.filter(pl.col("status").cast(pl.Utf8) == "Completed")
+    # Sin fiat no hay serie a la que asignar la operación
+    trades = trades.filter(pl.col(time_col).is_not_null() & pl.col("fiat_type").is_not_null()).select(
+        pl.col(time_col), pl.col("fiat_type").cast(pl.Utf8), pl.col("TotalPrice_num")
+    )
+    if trades.is_empty():
+        logger.info("Sin operaciones completadas para la estacionalidad.")
+        return {}
+
+    periods_parts, peaks_parts = [], []
+    for every in frequencies or DEFAULT_SEASONALITY_FREQUENCIES:
+        step_hours = SEASONALITY_FREQUENCIES.get(every)
+        if step_hours is None:
+            logger.warning(
+                f"Frecuencia de estacionalidad no soportada '{every}'. "
+                f"Opciones: {list(SEASONALITY_FREQUENCIES)}"
+            )
+            continue
+        labels, matrix = _resampled_matrix(trades, time_col, every)
+        if matrix.shape[1] < 4:
+            logger.info(f"Serie '{every}' demasiado corta para estacionalidad ({matrix.shape[1]} puntos).")
+            continue
+        power, periods_hours = _periodogram(matrix, step_hours)
+        labels = labels.with_columns(
+            pl.lit(every).alias("frequency"), pl.lit(matrix.shape[1], dtype=pl.UInt32).alias("points")
+        )
+        periods_parts.append(_known_periods(labels, power, periods_hours))
+        peaks_parts.append(_top_peaks(labels, power, periods_hours, top_peaks))
+
+    if not periods_parts:
+        return {}
+    keys = ["frequency", "fiat_type", "series"]
+    result = {
+        "periods": pl.concat(periods_parts)
+        .sort(keys + ["period_hours"])
+        .select(keys + ["points", "period", "period_hours", "strength"]),
+        "peaks": pl.concat(peaks_parts)
+        .sort(keys + ["rank"])
+        .select(keys + ["points", "rank", "period", "period_hours", "strength"]),
+    }
+    logger.info(
+        f"Estacionalidad: {result['periods'].select(keys).n_unique()} series analizadas."
+    )
+    return result
+
+
+def _resampled_matrix(trades: pl.DataFrame, time_col: str, every: str):
+    """
+    Volumen y operaciones por fiat en una rejilla común de paso `every`.
+
+    Returns:
+        (DataFrame de etiquetas fiat_type/series, matriz series x tiempo)
+    """
+    buckets = (
+        trades.with_columns(pl.col(time_col).dt.truncate(every).alias("_bucket"))
+        .group_by(["fiat_type", "_bucket"])
+        .agg([expr.cast(pl.Float64).alias(name) for name, expr in SERIES_METRICS.items()])
+    )
+    grid = pl.DataFrame(
+        {
+            "_bucket": pl.datetime_range(
+                buckets["_bucket"].min(), buckets["_bucket"].max(), every, eager=True
+            ).cast(buckets.schema["_bucket"])
+        }
+    ).with_row_index("_t")
+    fiats = sorted(buckets["fiat_type"].unique().to_list())
+    located = buckets.join(grid, on="_bucket", how="inner").with_columns(
+        pl.col("fiat_type").replace_strict(fiats, list(range(len(fiats)))).alias("_fiat")
+    )
+
+    series_names = list(SERIES_METRICS)
+    matrix = np.zeros((len(fiats) * len(series_names), grid.height))
+    fiat_index = located["_fiat"].to_numpy()
+    time_index = located["_t"].to_numpy()
+    for offset, name in enumerate(series_names):
+        matrix[fiat_index * len(series_names) + offset, time_index] = located[name].to_numpy()
+    labels = pl.DataFrame(
+        {
+            "fiat_type": [fiat for fiat in fiats for _ in series_names],
+            "series": series_names * len(fiats),
+        }
+    )
+    return labels, matrix
+
+
+def _periodogram(matrix: np.ndarray, step_hours: float):
+    """Potencia normalizada por serie (sin la componente de media) y periodo en horas."""
+    centered = matrix - matrix.mean(axis=1, keepdims=True)
+    power = np.abs(np.fft.rfft(centered, axis=1)) ** 2
+    frequencies = np.fft.rfftfreq(matrix.shape[1], d=step_hours)
+    power, frequencies = power[:, 1:], frequencies[1:]
+    total = power.sum(axis=1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        strength = np.where(total > 0, power / total, 0.0)
+    return strength, 1.0 / frequencies
+
+
+def _known_periods(labels: pl.DataFrame, strength: np.ndarray, periods_hours: np.ndarray) -> pl.DataFrame:
+    """Fuerza en el bin más cercano a cada periodo de referencia representable."""
+    parts = []
+    for name, target in KNOWN_PERIODS_HOURS.items():
+        # Hacen falta al menos dos ciclos y un periodo mayor que el de Nyquist
+        if not (periods_hours.min() <= target <= periods_hours.max() / 2):
+            continue
+        index = int(np.argmin(np.abs(periods_hours - target)))
+        parts.append(
+            labels.with_columns(
+                pl.lit(name).alias("period"),
+                pl.lit(float(periods_hours[index])).alias("period_hours"),
+                pl.Series("strength", strength[:, index]),
+            )
+        )
+    if not parts:
+        return labels.clear().with_columns(
+            pl.lit(None, dtype=pl.Utf8).alias("period"),
+            pl.lit(None, dtype=pl.Float64).alias("period_hours"),
+            pl.lit(None, dtype=pl.Float64).alias("strength"),
+        )
+    return pl.concat(parts)
+
+
+def _top_peaks(
+    labels: pl.DataFrame, strength: np.ndarray, periods_hours: np.ndarray, top_peaks: int
+) -> pl.DataFrame:
+    """Los `top_peaks` bins de mayor potencia de cada serie, ordenados."""
+    top_peaks = min(top_peaks, strength.shape[1])
+    order = np.argsort(-strength, axis=1, kind="stable")[:, :top_peaks]
+    n_series = strength.shape[0]
+    return (
+        labels.with_row_index("_series")
+        .join(
+            pl.DataFrame(
+                {
+                    "_series": np.repeat(np.arange(n_series, dtype=np.uint32), top_peaks),
+                    "rank": np.tile(np.arange(1, top_peaks + 1, dtype=np.uint32), n_series),
+                    "period_hours": periods_hours[order].ravel(),
+                    "strength": np.take_along_axis(strength, order, axis=1).ravel(),
+                }
+            ),
+            on="_series",
+        )
+        .with_columns(_period_label(pl.col("period_hours")).alias("period"))
+        .drop("_series")
+    )
+
+
+def _period_label(hours: pl.Expr) -> pl.Expr:
+    """Periodo legible: 24 -> '24h', 168 -> '7d'."""
+    days = hours >= 48
+    value = pl.when(days).then(hours / 24).otherwise(hours).round_sig_figs(3)
+    return value.cast(pl.Utf8).str.strip_suffix(".0") + pl.when(days).then(pl.lit("d")).otherwise(pl.lit("h"))
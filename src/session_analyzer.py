@@ -4,6 +4,8 @@ import numpy as np
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Any
 
+from .transformations.categoricals import decode_categorical_columns
+
 logger = logging.getLogger(__name__)
 
 
@@ -84,7 +86,7 @@ def _identify_sessions(df: pl.DataFrame, gap_minutes: int, time_col: str) -> pl.
     logger.info("Identificando sesiones basadas en gaps temporales...")
 
     # Convertir a pandas para procesamiento temporal más fácil
-    df_pandas = df.to_pandas()
+    df_pandas = decode_categorical_columns(df).to_pandas()
     df_pandas = df_pandas.sort_values(time_col).reset_index(drop=True)
 
     # Calcular diferencias temporales entre operaciones consecutivas
@@ -113,7 +115,7 @@ def _analyze_session_characteristics(df: pl.DataFrame) -> pl.DataFrame:
     logger.info("Analizando características de sesiones...")
 
     session_stats = (
-        df.group_by("session_id")
+        df.group_by("session_id", maintain_order=True)
         .agg(
             [
                 pl.count("session_id").alias("num_operations"),
@@ -123,8 +125,8 @@ def _analyze_session_characteristics(df: pl.DataFrame) -> pl.DataFrame:
                 pl.min("Match_time_local").alias("session_start"),
                 pl.max("Match_time_local").alias("session_end"),
                 pl.col("Counterparty").n_unique().alias("unique_counterparties"),
-                pl.col("fiat_type").mode().first().alias("dominant_fiat"),
-                pl.col("asset_type").mode().first().alias("dominant_asset"),
+                pl.col("fiat_type").mode().sort().first().alias("dominant_fiat"),
+                pl.col("asset_type").mode().sort().first().alias("dominant_asset"),
             ]
         )
         .with_columns(
@@ -171,14 +173,14 @@ def _analyze_session_patterns(df: pl.DataFrame) -> pl.DataFrame:
 
     # Análisis por hora del día
     hourly_patterns = (
-        df_with_time.group_by(["session_id", "hour"])
+        df_with_time.group_by(["session_id", "hour"], maintain_order=True)
         .agg(
             [
                 pl.count("session_id").alias("ops_in_hour"),
                 pl.sum("TotalPrice_num").alias("volume_in_hour"),
             ]
         )
-        .group_by("session_id")
+        .group_by("session_id", maintain_order=True)
         .agg(
             [
                 pl.col("hour").first().alias("session_start_hour"),
@@ -199,7 +201,7 @@ def _analyze_session_efficiency(df: pl.DataFrame) -> pl.DataFrame:
 
     # Calcular métricas de eficiencia por sesión
     efficiency_stats = (
-        df.group_by("session_id")
+        df.group_by("session_id", maintain_order=True)
         .agg(
             [
                 pl.count("session_id").alias("num_operations"),
@@ -253,7 +255,7 @@ def _analyze_counterparty_sessions(df: pl.DataFrame) -> pl.DataFrame:
     logger.info("Analizando contrapartes en sesiones...")
 
     counterparty_session_stats = (
-        df.group_by(["Counterparty", "session_id"])
+        df.group_by(["Counterparty", "session_id"], maintain_order=True)
         .agg(
             [
                 pl.count("session_id").alias("ops_in_session"),
@@ -262,7 +264,7 @@ def _analyze_counterparty_sessions(df: pl.DataFrame) -> pl.DataFrame:
                 pl.max("Match_time_local").alias("last_op_in_session"),
             ]
         )
-        .group_by("Counterparty")
+        .group_by("Counterparty", maintain_order=True)
         .agg(
             [
                 pl.count("session_id").alias("total_sessions"),
@@ -292,7 +294,7 @@ def _analyze_temporal_distribution(df: pl.DataFrame) -> pl.DataFrame:
 
     # Información temporal por sesión
     temporal_stats = (
-        df.group_by("session_id")
+        df.group_by("session_id", maintain_order=True)
         .agg(
             [
                 pl.min("Match_time_local").alias("session_start"),
@@ -316,7 +318,7 @@ def _analyze_temporal_distribution(df: pl.DataFrame) -> pl.DataFrame:
 
     # Distribución por hora del día
     hourly_distribution = (
-        temporal_stats.group_by("start_hour")
+        temporal_stats.group_by("start_hour", maintain_order=True)
         .agg(
             [
                 pl.count("session_id").alias("num_sessions"),
@@ -0,0 +1,161 @@
+import logging
+from typing import Dict, List, Optional
+
+import polars as pl
+
+logger = logging.getLogger(__name__)
+
+# Bordes de los intervalos del histograma, en minutos (el último queda abierto)
+DEFAULT_TBT_BIN_EDGES_MINUTES = [0, 1, 5, 15, 30, 60, 120, 360, 720, 1440, 2880, 10080, 43200]
+TBT_QUANTILES = [0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+
+# Ámbito -> columna por la que se calcula la diferencia (None = global)
+TBT_SCOPES = {
+    "global": None,
+    "counterparty": "Counterparty",
+    "payment_method": "payment_method",
+    "hour": None,
+}
+
+
+def analyze_time_between_trades(
+    df: pl.DataFrame, bin_edges_minutes: Optional[List[float]] = None
+) -> Dict[str, pl.DataFrame]:
+    """
+    Tiempo entre operaciones (TBT) global, por contraparte, por método de pago
+    y por hora del día.
+
+    Ordena una vez por `Match_time_local` y calcula en una sola selección la
+    diferencia con la operación anterior global y dentro de cada contraparte
+    y método de pago (`diff().over(...)`). La distribución por hora usa el
+    tiempo global hasta cada operación según la hora local en que llega. Las
+    estadísticas y el histograma salen de una agregación por ámbito, sin
+    bucles por grupo.
+
+    Args:
+        df: DataFrame procesado por `analyze`.
+        bin_edges_minutes: Bordes del histograma en minutos
+            (default: `DEFAULT_TBT_BIN_EDGES_MINUTES`).
+
+    Returns:
+        Diccionario con 'summary' (operaciones, media, mín., máx. y cuantiles
+        en minutos por ámbito y grupo) y 'histogram' (conteo y proporción por
+        intervalo).
+    """
+    time_col = "Match_time_local"
+    if time_col not in df.columns:
+        logger.warning(f"Falta la columna '{time_col}' para el tiempo entre operaciones.")
+        return {}
+
+    trades = df
+    if "status" in df.columns:
+        trades = trades.filter(pl.col("status").cast(pl.Utf8) == "Completed")
+    trades = trades.filter(pl.col(time_col).is_not_null()).sort(time_col)
+    if trades.height < 2:
+        logger.info("Menos de dos operaciones completadas: sin tiempo entre operaciones.")
+        return {}
+
+    def gap(over: Optional[str] = None) -> pl.Expr:
+        delta = pl.col(time_col).diff()
+        if over:
+            delta = delta.over(over)
+        return delta.dt.total_microseconds() / 60_000_000
+
+    scopes = [
+        (scope, column)
+        for scope, column in TBT_SCOPES.items()
+        if column is None or column in trades.columns
+    ]
+    gaps = trades.select(
+        [gap(column).alias(f"_gap_{scope}") for scope, column in scopes if scope != "hour"]
+        + [pl.col(column) for _, column in scopes if column is not None]
+        + [pl.col(time_col).dt.hour().alias("_hour")]
+    )
+
+    edges = sorted(bin_edges_minutes or DEFAULT_TBT_BIN_EDGES_MINUTES)
+    labels = [f"[{_fmt(lo)}, {_fmt(hi)})" for lo, hi in zip(edges, edges[1:])] + [f">= {_fmt(edges[-1])}"]
+    bin_bounds = pl.DataFrame(
+        {
+            "bin": pl.Series(range(len(edges)), dtype=pl.UInt32),
+            "bin_label": labels,
+            "bin_lower_minutes": [float(e) for e in edges],
+            "bin_upper_minutes": [float(e) for e in edges[1:]] + [None],
+        }
+    )
+    upper_edges = pl.Series(edges[1:], dtype=pl.Float64)
+    stats = [
+        pl.len().cast(pl.UInt32).alias("gaps"),
+        pl.col("gap_minutes").mean().alias("mean_minutes"),
+        pl.col("gap_minutes").min().alias("min_minutes"),
+        pl.col("gap_minutes").max().alias("max_minutes"),
+    ] + [
+        pl.col("gap_minutes").quantile(q, interpolation="linear").alias(f"p{int(q * 100)}_minutes")
+        for q in TBT_QUANTILES
+    ]
+
+    # Una agregación por ámbito, agrupando por la columna original (categórica
+    # o entera); los grupos solo se pasan a texto en el resultado ya reducido.
+    summaries, histograms = [], []
+    for scope, column in scopes:
+        if scope == "global":
+            group = pl.lit("all")
+        else:
+            group = pl.col("_hour" if scope == "hour" else column)
+        gap_col = "_gap_global" if scope == "hour" else f"_gap_{scope}"
+        # Operaciones sin contraparte o método de pago no forman grupo
+        values = gaps.select(group.alias("group"), pl.col(gap_col).alias("gap_minutes")).filter(
+            pl.col("gap_minutes").is_not_null() & pl.col("group").is_not_null()
+        )
+        if values.is_empty():
+            continue
+        summaries.append(_label_groups(values.group_by("group").agg(stats), scope))
+        histograms.append(
+            _label_groups(
+                values.filter(pl.col("gap_minutes") >= edges[0])
+                .with_columns(
+                    pl.lit(upper_edges)
+                    .search_sorted(pl.col("gap_minutes"), side="right")
+                    .cast(pl.UInt32)
+                    .alias("bin")
+                )
+                .group_by(["group", "bin"])
+                .agg(pl.len().cast(pl.UInt32).alias("count"))
+                .with_columns((pl.col("count") / pl.col("count").sum().over("group")).alias("share")),
+                scope,
+            )
+        )
+    if not summaries:
+        return {}
+
+    keys = ["scope", "group"]
+    summary = pl.concat(summaries).sort(keys)
+    histogram = (
+        pl.concat(histograms)
+        .join(bin_bounds, on="bin", how="left")
+        .sort(keys + ["bin"])
+        .select(keys + ["bin_label", "bin_lower_minutes", "bin_upper_minutes", "count", "share"])
+    )
+    logger.info(
+        f"Tiempo entre operaciones: {trades.height} operaciones, "
+        f"{summary.height} grupos en {len(scopes)} ámbitos."
+    )
+    return {"summary": summary, "histogram": histogram}
+
+
+def _label_groups(table: pl.DataFrame, scope: str) -> pl.DataFrame:
+    """Añade el ámbito y pasa el grupo a texto (horas como '00'..'23')."""
+    group = pl.col("group").cast(pl.Utf8)
+    if scope == "hour":
+        group = group.str.zfill(2)
+    return table.select(pl.lit(scope).alias("scope"), group.alias("group"), pl.exclude("group"))
+
+
+def _fmt(minutes: float) -> str:
+    """Borde de intervalo legible: 90 -> '1.5h', 2880 -> '2d'."""
+    if minutes >= 1440:
+        value, unit = minutes / 1440, "d"
+    elif minutes >= 60:
+        value, unit = minutes / 60, "h"
+    else:
+        value, unit = minutes, "m"
+    return f"{value:g}{unit}"
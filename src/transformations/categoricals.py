@@ -0,0 +1,88 @@
+import polars as pl
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Columna interna -> forma canónica de sus valores
+CATEGORICAL_COLUMNS: Dict[str, str] = {
+    "fiat_type": "upper",
+    "asset_type": "upper",
+    "order_type": "upper",
+    "status": "title",
+    "payment_method": "strip",
+    "Counterparty": "strip",
+}
+
+# Estados de cancelación tal como quedan tras normalizar `status` ('title')
+SYSTEM_CANCELLED_STATUS = "System Cancelled"
+CANCELLED_STATUSES = ["Cancelled", SYSTEM_CANCELLED_STATUS]
+
+_CANONICAL_EXPRS = {
+    "upper": lambda col: pl.col(col).str.strip_chars().str.to_uppercase(),
+    "title": lambda col: pl.col(col).str.strip_chars().str.to_titlecase(),
+    "strip": lambda col: pl.col(col).str.strip_chars(),
+}
+
+
+def is_categorical_dtype(dtype: pl.DataType) -> bool:
+    """Indica si un tipo de Polars es Categorical o Enum."""
+    return isinstance(dtype, (pl.Categorical, pl.Enum))
+
+
+def normalize_categorical_columns(
+    df: pl.DataFrame, columns: Optional[Dict[str, str]] = None
+) -> pl.DataFrame:
+    """
+    Canonicaliza las columnas de baja cardinalidad y las convierte a Categorical.
+
+    Se eliminan espacios y se unifica el uso de mayúsculas una sola vez en la
+    ingesta; a partir de aquí filtros y agrupaciones comparan los códigos
+    enteros de la categoría en lugar de cadenas completas. Se usa orden
+    léxico para que los `sort` devuelvan el mismo orden que con texto.
+
+    Args:
+        df: DataFrame con las columnas ya renombradas a los nombres internos.
+        columns: Mapeo columna -> forma canónica ('upper', 'title' o 'strip').
+            Por defecto `CATEGORICAL_COLUMNS`.
+
+    Returns:
+        DataFrame con las columnas presentes de tipo texto convertidas a Categorical.
+    """
+    columns = CATEGORICAL_COLUMNS if columns is None else columns
+    exprs = [
+        _CANONICAL_EXPRS[form](col).cast(pl.Categorical("lexical"))
+        for col, form in columns.items()
+        if col in df.columns and df.schema[col] == pl.String
+    ]
+    if not exprs:
+        return df
+
+    df = df.with_columns(exprs)
+    logger.info(
+        "Columnas categóricas normalizadas: "
+        f"{[col for col in columns if col in df.columns and is_categorical_dtype(df.schema[col])]}"
+    )
+    return df
+
+
+def decode_categorical_columns(df: pl.DataFrame) -> pl.DataFrame:
+    """
+    Convierte de nuevo a texto las columnas Categorical/Enum.
+
+    Se usa antes de pasar datos a Pandas: una columna `category` de Pandas
+    conserva las categorías no presentes tras filtrar y `groupby`/`value_counts`
+    devolverían filas vacías para ellas.
+
+    Args:
+        df: DataFrame de Polars.
+
+    Returns:
+        DataFrame con las columnas categóricas como `pl.String`.
+    """
+    categorical_cols = [
+        col for col, dtype in df.schema.items() if is_categorical_dtype(dtype)
+    ]
+    if not categorical_cols:
+        return df
+    return df.with_columns(pl.col(categorical_cols).cast(pl.String))
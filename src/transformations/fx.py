@@ -0,0 +1,217 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+import polars as pl
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FX_CACHE_DIR = os.path.join(tempfile.gettempdir(), "p2p_fx_cache")
+
+# Monedas que se valoran 1:1 en USD si la tabla de tasas no las incluye
+USD_PEGGED_CURRENCIES = ["USD", "USDT", "USDC", "BUSD", "FDUSD"]
+
+RATE_TIME_COLUMNS = ["time", "date"]
+RATE_COLUMNS = ["time", "currency", "usd_rate"]
+_RATE_DTYPE = pl.Datetime("us", "UTC")
+# Cambiarlo invalida los índices guardados en disco
+_INDEX_VERSION = "1"
+
+_index_cache: Dict[str, pl.DataFrame] = {}
+_index_lock = threading.Lock()
+
+
+def apply_fx_normalization(df: pl.DataFrame, fx_config: Optional[Dict[str, Any]]) -> pl.DataFrame:
+    """
+    Etapa de normalización a USD con una tabla de tasas de referencia.
+
+    Sin `rates_path` en la configuración no hace nada y se mantiene
+    `TotalPrice_USD_equivalent` tal como lo calcula
+    `patches.create_total_price_usd_equivalent`.
+
+    Args:
+        df: DataFrame con `Match_time_local`, `fiat_type`, `asset_type`,
+            `TotalPrice_num` y `Quantity_num`.
+        fx_config: Sección `fx` del config (`rates_path`, `cache_dir`).
+    """
+    rates_path = (fx_config or {}).get("rates_path")
+    if not rates_path:
+        return df
+    rate_index = load_rate_index(rates_path, (fx_config or {}).get("cache_dir", DEFAULT_FX_CACHE_DIR))
+    if rate_index is None:
+        return df
+    return attach_usd_rates(df, rate_index)
+
+
+def load_rate_index(rates_path: str, cache_dir: Optional[str] = DEFAULT_FX_CACHE_DIR) -> Optional[pl.DataFrame]:
+    """
+    Devuelve la tabla de tasas normalizada y ordenada por moneda y tiempo.
+
+    La tabla (CSV o Parquet) tiene una fila por moneda e instante con las
+    columnas `time` (o `date`), `currency` y `usd_rate` (USD por unidad de
+    la moneda; sirve tanto para fiats como para activos). Los instantes sin
+    zona horaria y las fechas se interpretan en UTC.
+
+    El índice se guarda en memoria y como Parquet en `cache_dir`, con una
+    clave de ruta, tamaño y fecha de modificación del archivo: las celdas
+    del mismo proceso y las ejecuciones siguientes no vuelven a leer ni a
+    ordenar las tasas mientras el archivo no cambie.
+
+    Returns:
+        DataFrame con columnas time, currency, usd_rate o None si no se pudo
+        cargar.
+    """
+    try:
+        stat = os.stat(rates_path)
+    except OSError as e:
+        logger.error(f"No se pudo leer la tabla de tasas FX '{rates_path}': {e}")
+        return None
+    key_source = f"{os.path.abspath(rates_path)}|{stat.st_size}|{stat.st_mtime_ns}|{_INDEX_VERSION}"
+    key = hashlib.sha256(key_source.encode("utf-8")).hexdigest()[:16]
+
+    with _index_lock:
+        if key in _index_cache:
+            return _index_cache[key]
+        cache_path = os.path.join(cache_dir, f"fx_index_{key}.parquet") if cache_dir else None
+        rate_index = None
+        if cache_path and os.path.isfile(cache_path):
+            try:
+                rate_index = pl.read_parquet(cache_path)
+                logger.info(f"Índice de tasas FX leído de la caché: {cache_path}")
+            except Exception as e:
+                logger.warning(f"Caché de tasas FX ilegible ({cache_path}), se reconstruye: {e}")
+        if rate_index is None:
+            try:
+                rate_index = _build_rate_index(_read_rates(rates_path))
+            except Exception as e:
+                logger.error(f"Error cargando la tabla de tasas FX '{rates_path}': {e}")
+                return None
+            logger.info(
+                f"Tabla de tasas FX cargada: {rate_index.height} tasas de "
+                f"{rate_index['currency'].n_unique()} monedas."
+            )
+            if cache_path:
+                try:
+                    os.makedirs(cache_dir, exist_ok=True)
+                    rate_index.write_parquet(cache_path)
+                except OSError as e:
+                    logger.warning(f"No se pudo guardar la caché de tasas FX en {cache_dir}: {e}")
+        _index_cache[key] = rate_index
+        return rate_index
+
+
+def attach_usd_rates(
+    df: pl.DataFrame, rate_index: pl.DataFrame, time_col: str = "Match_time_local"
+) -> pl.DataFrame:
+    """
+    Añade equivalentes en USD a cada fila con la última tasa conocida.
+
+    Ordena las operaciones una vez por tiempo y resuelve con `join_asof`
+    hacia atrás la tasa de la fiat y la del activo vigentes en el momento de
+    la operación. Añade `fiat_usd_rate`, `asset_usd_rate` y
+    `Quantity_USD_equivalent` y recalcula `TotalPrice_USD_equivalent` con
+    la tasa de la fiat; donde no hay tasa se conserva el valor anterior.
+    Las monedas de `USD_PEGGED_CURRENCIES` ausentes de la tabla valen 1.
+    """
+    required = [time_col, "fiat_type", "asset_type"]
+    missing = [col for col in required if col not in df.columns]
+    if missing:
+        logger.warning(f"Faltan columnas para la conversión FX: {missing}")
+        return df
+
+    rates = rate_index.select(
+        pl.col("time").alias("_fx_time"), pl.col("currency").alias("_fx_currency"), "usd_rate"
+    )
+    joined = (
+        df.with_row_index("_fx_row")
+        .with_columns(
+            pl.col(time_col).dt.convert_time_zone("UTC").cast(_RATE_DTYPE).alias("_fx_time")
+            if getattr(df.schema[time_col], "time_zone", None)
+            else pl.col(time_col).dt.replace_time_zone("UTC").cast(_RATE_DTYPE).alias("_fx_time"),
+            pl.col("fiat_type").cast(pl.Utf8).alias("_fx_fiat"),
+            pl.col("asset_type").cast(pl.Utf8).alias("_fx_asset"),
+        )
+        .sort("_fx_time", nulls_last=True)
+    )
+    for role in ("fiat", "asset"):
+        joined = joined.join_asof(
+            rates.rename({"_fx_currency": f"_fx_{role}", "usd_rate": f"{role}_usd_rate"}),
+            on="_fx_time",
+            by=f"_fx_{role}",
+            strategy="backward",
+            check_sortedness=False,
+        ).with_columns(
+            pl.when(pl.col(f"{role}_usd_rate").is_null() & pl.col(f"_fx_{role}").is_in(USD_PEGGED_CURRENCIES))
+            .then(1.0)
+            .otherwise(pl.col(f"{role}_usd_rate"))
+            .alias(f"{role}_usd_rate")
+        )
+
+    conversions = []
+    if "TotalPrice_num" in df.columns:
+        fiat_usd = pl.col("TotalPrice_num") * pl.col("fiat_usd_rate")
+        if "TotalPrice_USD_equivalent" in df.columns:
+            fiat_usd = pl.coalesce(fiat_usd, pl.col("TotalPrice_USD_equivalent"))
+        conversions.append(fiat_usd.alias("TotalPrice_USD_equivalent"))
+    if "Quantity_num" in df.columns:
+        conversions.append(
+            (pl.col("Quantity_num") * pl.col("asset_usd_rate")).alias("Quantity_USD_equivalent")
+        )
+    result = (
+        joined.with_columns(conversions)
+        .sort("_fx_row")
+        .drop(["_fx_row", "_fx_time", "_fx_fiat", "_fx_asset"])
+    )
+
+    unconverted = result.filter(pl.col("fiat_usd_rate").is_null())
+    if not unconverted.is_empty():
+        logger.info(
+            f"{unconverted.height} filas sin tasa FX para su fiat "
+            f"({unconverted['fiat_type'].cast(pl.Utf8).unique().sort().to_list()})."
+        )
+    logger.info(f"Conversión FX a USD aplicada a {result.height} filas.")
+    return result
+
+
+def _read_rates(rates_path: str) -> pl.DataFrame:
+    if rates_path.lower().endswith((".parquet", ".pq")):
+        return pl.read_parquet(rates_path)
+    return pl.read_csv(rates_path, try_parse_dates=True)
+
+
+def _build_rate_index(raw: pl.DataFrame) -> pl.DataFrame:
+    """Normaliza tipos, descarta tasas inválidas y ordena por moneda y tiempo."""
+    time_col = next((col for col in RATE_TIME_COLUMNS if col in raw.columns), None)
+    missing = [col for col in ("currency", "usd_rate") if col not in raw.columns]
+    if time_col is None or missing:
+        raise ValueError(
+            f"la tabla de tasas necesita una columna {' o '.join(RATE_TIME_COLUMNS)} "
+            f"y las columnas currency y usd_rate (faltan: {missing or [time_col]})"
+        )
+
+    time_expr = pl.col(time_col)
+    dtype = raw.schema[time_col]
+    if dtype == pl.Utf8:
+        time_expr = time_expr.str.to_datetime()
+        dtype = pl.Datetime("us")
+    if dtype == pl.Date:
+        time_expr = time_expr.cast(pl.Datetime("us"))
+        dtype = pl.Datetime("us")
+    if getattr(dtype, "time_zone", None):
+        time_expr = time_expr.dt.convert_time_zone("UTC")
+    else:
+        time_expr = time_expr.dt.replace_time_zone("UTC")
+
+    return (
+        raw.select(
+            time_expr.cast(_RATE_DTYPE).alias("time"),
+            pl.col("currency").cast(pl.Utf8).str.strip_chars().str.to_uppercase(),
+            pl.col("usd_rate").cast(pl.Float64),
+        )
+        .filter(pl.col("time").is_not_null() & (pl.col("usd_rate") > 0))
+        .unique(subset=["currency", "time"], keep="last", maintain_order=True)
+        .sort(["currency", "time"])
+    )
@@ -19,7 +19,7 @@ UNIFIED_CONFIG = {
     },
     # Configuración de gráficos optimizados
     "figure_settings": {
-        "dpi": 300,
+        # La DPI de las figuras la fija la política `figure_output` (plot_utils)
         "figsize_default": (12, 8),
         "figsize_large": (16, 12),
         "figsize_comparative": (16, 6),
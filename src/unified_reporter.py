@@ -3,9 +3,8 @@ import logging
 import datetime
 import polars as pl
 import pandas as pd
-from jinja2 import Environment, FileSystemLoader
+from jinja2 import TemplateNotFound
 import argparse
-import pathlib
 from typing import Dict, List, Any, Tuple, Union
 import numpy as np
 import matplotlib.pyplot as plt
@@ -13,7 +12,12 @@ import seaborn as sns
 
 from . import plotting
 from . import counterparty_plotting
+from . import payment_analytics
+from .plot_utils import savefig
 from . import utils
+from .transformations.categoricals import decode_categorical_columns
+from .report_assets import figure_thumbnails, is_light_mode
+from .report_renderer import get_renderer
 
 logger = logging.getLogger(__name__)
 
@@ -86,20 +90,20 @@ class UnifiedReporter:
         logger.info("Iniciando generación de reporte unificado...")
 
         # 1. Generar gráficos consolidados por categoría
-        figure_paths = self._generate_consolidated_figures(all_period_data)
+        figure_paths = self.generate_consolidated_figures(all_period_data)
 
         # 2. Crear Excel multi-periodo consolidado
-        excel_path = self._generate_consolidated_excel(all_period_data)
+        excel_path = self.generate_consolidated_excel(all_period_data)
 
         # 3. Generar HTML unificado con navegación
-        html_path = self._generate_unified_html(
+        html_path = self.generate_unified_html(
             all_period_data, figure_paths, excel_path
         )
 
         logger.info(f"Reporte unificado completado: {html_path}")
         return html_path
 
-    def _generate_consolidated_figures(
+    def generate_consolidated_figures(
         self, all_period_data: Dict[str, Dict[str, Any]]
     ) -> Dict[str, List[str]]:
         """Genera gráficos consolidados organizados por categoría temática."""
@@ -217,7 +221,7 @@ class UnifiedReporter:
         if df.is_empty():
             return saved_paths
 
-        df_pandas = df.to_pandas()
+        df_pandas = decode_categorical_columns(df).to_pandas()
 
         # 1. Evolución temporal por periodo y estado
         if (
@@ -271,7 +275,7 @@ class UnifiedReporter:
 
             plt.tight_layout()
             path = os.path.join(out_dir, f"temporal_evolution_{currency.lower()}.png")
-            plt.savefig(path, dpi=300, bbox_inches="tight")
+            savefig(plt.gcf(), path, bbox_inches="tight")
             plt.close()
             saved_paths.append(path)
 
@@ -284,9 +288,9 @@ class UnifiedReporter:
                 saved_paths.append(path_heatmap)
 
         # 3. Análisis de métodos de pago
-        if "payment_method" in df_pandas.columns:
+        if "payment_method" in df.columns:
             path_payment = self._generate_payment_analysis(
-                df_pandas, out_dir, currency, title_suffix
+                df, out_dir, currency, title_suffix
             )
             if path_payment:
                 saved_paths.append(path_payment)
@@ -304,8 +308,8 @@ class UnifiedReporter:
             return saved_paths
 
         # Convertir a pandas para manipulación
-        usd_pandas = usd_df.to_pandas()
-        uyu_pandas = uyu_df.to_pandas()
+        usd_pandas = decode_categorical_columns(usd_df).to_pandas()
+        uyu_pandas = decode_categorical_columns(uyu_df).to_pandas()
 
         # 1. Comparación de volúmenes mensuales
         if all(
@@ -336,7 +340,7 @@ class UnifiedReporter:
 
             plt.tight_layout()
             path = os.path.join(out_dir, "usd_vs_uyu_volumes.png")
-            plt.savefig(path, dpi=300, bbox_inches="tight")
+            savefig(plt.gcf(), path, bbox_inches="tight")
             plt.close()
             saved_paths.append(path)
 
@@ -377,7 +381,7 @@ class UnifiedReporter:
         plt.tight_layout()
 
         path = os.path.join(out_dir, "usd_vs_uyu_operations.png")
-        plt.savefig(path, dpi=300, bbox_inches="tight")
+        savefig(plt.gcf(), path, bbox_inches="tight")
         plt.close()
         saved_paths.append(path)
 
@@ -418,7 +422,7 @@ class UnifiedReporter:
             return figures
 
         consolidated_df = pl.concat(dfs_to_concat, how="vertical")
-        consolidated_pandas = consolidated_df.to_pandas()
+        consolidated_pandas = decode_categorical_columns(consolidated_df).to_pandas()
 
         # 1. Resumen de estados por periodo
         if "status" in consolidated_pandas.columns:
@@ -440,7 +444,7 @@ class UnifiedReporter:
             plt.tight_layout()
 
             path = os.path.join(out_dir, "status_distribution_by_period.png")
-            plt.savefig(path, dpi=300, bbox_inches="tight")
+            savefig(plt.gcf(), path, bbox_inches="tight")
             plt.close()
             figures.append(path)
 
@@ -474,7 +478,7 @@ class UnifiedReporter:
             plt.tight_layout()
 
             path = os.path.join(out_dir, "asset_evolution.png")
-            plt.savefig(path, dpi=300, bbox_inches="tight")
+            savefig(plt.gcf(), path, bbox_inches="tight")
             plt.close()
             figures.append(path)
 
@@ -574,7 +578,7 @@ class UnifiedReporter:
                             f"las estadísticas podrían no ser representativas de un 'global'. Se necesitaría re-agregación."
                         )
 
-                    final_cp_data_pd[key] = combined_df_pl.to_pandas()
+                    final_cp_data_pd[key] = decode_categorical_columns(combined_df_pl).to_pandas()
                 except Exception as e:
                     logger.error(
                         f"Error al concatenar o convertir a Pandas la métrica de contraparte '{key}': {e}"
@@ -671,7 +675,7 @@ class UnifiedReporter:
                         # combined_df_pl = combined_df_pl.with_row_count(name='global_row_num_for_session_id_regen')
                         # Esto es solo un ejemplo, la lógica de regeneración de IDs de sesión sería más compleja.
                         pass
-                    final_session_data_pd[key] = combined_df_pl.to_pandas()
+                    final_session_data_pd[key] = decode_categorical_columns(combined_df_pl).to_pandas()
                 except Exception as e:
                     logger.error(
                         f"Error al concatenar o convertir a Pandas la métrica de sesión '{key}': {e}"
@@ -709,7 +713,7 @@ class UnifiedReporter:
                     path = os.path.join(
                         out_dir, "session_duration_distribution_consolidated.png"
                     )
-                    plt.savefig(path, dpi=300, bbox_inches="tight")
+                    savefig(plt.gcf(), path, bbox_inches="tight")
                     plt.close()
                     saved_paths.append(path)
                     logger.info(f"Gráfico de duración de sesiones guardado: {path}")
@@ -734,7 +738,7 @@ class UnifiedReporter:
                     path = os.path.join(
                         out_dir, "session_operations_distribution_consolidated.png"
                     )
-                    plt.savefig(path, dpi=300, bbox_inches="tight")
+                    savefig(plt.gcf(), path, bbox_inches="tight")
                     plt.close()
                     saved_paths.append(path)
                     logger.info(f"Gráfico de operaciones por sesión guardado: {path}")
@@ -784,7 +788,7 @@ class UnifiedReporter:
                     path = os.path.join(
                         out_dir, "session_start_hour_distribution_consolidated.png"
                     )
-                    plt.savefig(path, dpi=300, bbox_inches="tight")
+                    savefig(plt.gcf(), path, bbox_inches="tight")
                     plt.close()
                     saved_paths.append(path)
                     logger.info(
@@ -830,7 +834,7 @@ class UnifiedReporter:
                     path = os.path.join(
                         out_dir, "session_volume_vs_duration_consolidated.png"
                     )
-                    plt.savefig(path, dpi=300, bbox_inches="tight")
+                    savefig(plt.gcf(), path, bbox_inches="tight")
                     plt.close()
                     saved_paths.append(path)
                     logger.info(
@@ -884,19 +888,21 @@ class UnifiedReporter:
 
         plt.tight_layout()
         path = os.path.join(out_dir, f"activity_heatmap_{currency.lower()}.png")
-        plt.savefig(path, dpi=300, bbox_inches="tight")
+        savefig(plt.gcf(), path, bbox_inches="tight")
         plt.close()
 
         return path
 
     def _generate_payment_analysis(
-        self, df_pandas: pd.DataFrame, out_dir: str, currency: str, title_suffix: str
+        self, df: pl.DataFrame, out_dir: str, currency: str, title_suffix: str
     ) -> str:
         """Genera análisis de métodos de pago."""
-        if (
-            "payment_method" not in df_pandas.columns
-            or "TotalPrice_num" not in df_pandas.columns
-        ):
+        if "payment_method" not in df.columns or "TotalPrice_num" not in df.columns:
+            return None
+
+        # Operaciones y volumen por método en una sola agregación de Polars
+        totals = payment_analytics.method_totals(df)
+        if totals.is_empty():
             return None
 
         fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
@@ -907,31 +913,31 @@ class UnifiedReporter:
         )
 
         # Distribución por número de operaciones
-        payment_counts = df_pandas["payment_method"].value_counts()
-        payment_counts.head(10).plot(kind="bar", ax=ax1)
+        payment_counts = totals.sort("operations", descending=True).head(10)
+        ax1.bar(payment_counts["payment_method"].to_list(), payment_counts["operations"].to_list())
         ax1.set_title("Top 10 Métodos por Número de Operaciones")
         ax1.set_ylabel("Número de Operaciones")
         plt.setp(ax1.xaxis.get_majorticklabels(), rotation=45, ha="right")
 
         # Distribución por volumen
-        payment_volume = (
-            df_pandas.groupby("payment_method")["TotalPrice_num"]
-            .sum()
-            .sort_values(ascending=False)
+        payment_volume = totals.sort("volume", descending=True).head(10)
+        ax2.bar(
+            payment_volume["payment_method"].to_list(),
+            payment_volume["volume"].to_list(),
+            color="orange",
         )
-        payment_volume.head(10).plot(kind="bar", ax=ax2, color="orange")
         ax2.set_title("Top 10 Métodos por Volumen")
         ax2.set_ylabel(f"Volumen Total ({currency})")
         plt.setp(ax2.xaxis.get_majorticklabels(), rotation=45, ha="right")
 
         plt.tight_layout()
         path = os.path.join(out_dir, f"payment_methods_{currency.lower()}.png")
-        plt.savefig(path, dpi=300, bbox_inches="tight")
+        savefig(plt.gcf(), path, bbox_inches="tight")
         plt.close()
 
         return path
 
-    def _generate_consolidated_excel(self, all_period_data: Dict) -> str:
+    def generate_consolidated_excel(self, all_period_data: Dict) -> str:
         """Genera un Excel consolidado con múltiples hojas organizadas."""
         logger.info("Generando Excel consolidado...")
 
@@ -977,7 +983,7 @@ class UnifiedReporter:
                     )
 
                 if not current_df.is_empty():
-                    df_pandas = current_df.to_pandas()
+                    df_pandas = decode_categorical_columns(current_df).to_pandas()
 
                     # Calcular métricas resumidas
                     total_ops = len(df_pandas)
@@ -1062,7 +1068,7 @@ class UnifiedReporter:
 
             df_for_excel_pl = pl.concat(currency_dfs, how="vertical")
             df_for_excel_pd = (
-                df_for_excel_pl.to_pandas()
+                decode_categorical_columns(df_for_excel_pl).to_pandas()
             )  # Convertir a Pandas DataFrame
 
             # Convertir datetimes timezone-aware a timezone-naive
@@ -1098,21 +1104,19 @@ class UnifiedReporter:
         # Placeholder - implementar análisis comparativo
         pass
 
-    def _generate_unified_html(
+    def generate_unified_html(
         self, all_period_data: Dict, figure_paths: Dict, excel_path: str
     ) -> str:
         """Genera HTML unificado con navegación."""
         logger.info("Generando HTML unificado...")
 
-        # Cargar template
-        templates_path = pathlib.Path(__file__).parent.parent / "templates"
-        env = Environment(loader=FileSystemLoader(str(templates_path)), autoescape=True)
-
+        # Plantilla compilada compartida con los reportes por celda
+        renderer = get_renderer()
         try:
-            template = env.get_template("unified_report_template.html")
-        except:
+            template = renderer.get_template("unified_report_template.html")
+        except TemplateNotFound:
             # Fallback a template básico si el unificado no existe
-            template = env.get_template("report_template.html")
+            template = renderer.get_template("report_template.html")
 
         # Preparar contexto
         html_context = {
@@ -1126,7 +1130,14 @@ class UnifiedReporter:
             "summary_stats": self._calculate_summary_stats(all_period_data),
             "periods_analyzed": list(all_period_data.keys()),
             "interactive_mode": self.cli_args.interactive,
+            "figure_thumbs": None,
         }
+        if is_light_mode():
+            # Miniaturas diferidas enlazadas a la figura a resolución completa
+            all_figures = [path for paths in figure_paths.values() for path in paths]
+            html_context["figure_thumbs"] = figure_thumbnails(
+                all_figures, self.structure["reports"]
+            )
 
         # Renderizar y guardar
         html_output = template.render(html_context)
@@ -0,0 +1,115 @@
+import logging
+from typing import Dict, List, Optional
+
+import polars as pl
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VWAP_BUCKETS = ["5m", "1h", "1d"]
+DEFAULT_VWAP_PLOT_BUCKET = "1d"
+
+PAIR_COLUMNS = ["asset_type", "fiat_type"]
+BUCKET_COLUMN = "bucket_start"
+
+
+def analyze_vwap_spread(
+    df: pl.DataFrame, buckets: Optional[List[str]] = None
+) -> Dict[str, pl.DataFrame]:
+    """
+    VWAP de compras y ventas y spread realizado por par y ventana temporal.
+
+    Para cada ventana (`buckets`, duraciones de Polars como '5m', '1h' o
+    '1d') agrupa con `group_by_dynamic` sobre `Match_time_local` todos los
+    pares activo/fiat a la vez y calcula, por lado, el precio ponderado por
+    cantidad (`sum(Price_num * Quantity_num) / sum(Quantity_num)`), la
+    cantidad, el nocional y el número de operaciones. El spread es
+    `sell_vwap - buy_vwap` (positivo si se vende más caro de lo que se
+    compra) y `spread_pct` lo expresa sobre el precio medio.
+
+    Args:
+        df: DataFrame procesado por `analyze`.
+        buckets: Ventanas a calcular (default: `DEFAULT_VWAP_BUCKETS`).
+
+    Returns:
+        Diccionario {ventana: tabla} con columnas asset_type, fiat_type,
+        bucket_start, buy_vwap, sell_vwap, spread, spread_pct, buy_quantity,
+        sell_quantity, buy_notional, sell_notional, buy_trades, sell_trades.
+    """
+    buckets = buckets or DEFAULT_VWAP_BUCKETS
+    time_col = "Match_time_local"
+    required = PAIR_COLUMNS + ["order_type", "Price_num", "Quantity_num", time_col]
+    missing = [col for col in required if col not in df.columns]
+    if missing:
+        logger.warning(f"Faltan columnas para VWAP/spread: {missing}")
+        return {}
+
+    trades = df
+    if "status" in df.columns:
+        trades = trades.filter(pl.col("status").cast(pl.Utf8) == "Completed")
+    side = pl.col("order_type").cast(pl.Utf8).str.to_uppercase()
+    trades = (
+        trades.filter(
+            pl.col(time_col).is_not_null()
+            & pl.col("Price_num").is_not_null()
+            & (pl.col("Quantity_num") > 0)
+            & side.is_in(["BUY", "SELL"])
+        )
+        .select(
+            pl.col("asset_type").cast(pl.Utf8),
+            pl.col("fiat_type").cast(pl.Utf8),
+            pl.col(time_col).alias(BUCKET_COLUMN),
+            (side == "BUY").alias("_is_buy"),
+            pl.col("Quantity_num").cast(pl.Float64).alias("_qty"),
+            (pl.col("Price_num") * pl.col("Quantity_num")).cast(pl.Float64).alias("_notional"),
+        )
+        .sort(BUCKET_COLUMN)
+    )
+    if trades.is_empty():
+        logger.info("Sin operaciones completadas para VWAP/spread.")
+        return {}
+
+    aggregations = []
+    for name, is_side in (("buy", pl.col("_is_buy")), ("sell", ~pl.col("_is_buy"))):
+        aggregations += [
+            pl.col("_qty").filter(is_side).sum().alias(f"{name}_quantity"),
+            pl.col("_notional").filter(is_side).sum().alias(f"{name}_notional"),
+            is_side.sum().cast(pl.UInt32).alias(f"{name}_trades"),
+        ]
+
+    tables: Dict[str, pl.DataFrame] = {}
+    for every in buckets:
+        try:
+            table = (
+                trades.group_by_dynamic(
+                    BUCKET_COLUMN, every=every, group_by=PAIR_COLUMNS, label="left"
+                )
+                .agg(aggregations)
+                .with_columns(
+                    _vwap("buy").alias("buy_vwap"),
+                    _vwap("sell").alias("sell_vwap"),
+                )
+                .with_columns((pl.col("sell_vwap") - pl.col("buy_vwap")).alias("spread"))
+                .with_columns(
+                    (
+                        pl.col("spread") / ((pl.col("sell_vwap") + pl.col("buy_vwap")) / 2) * 100
+                    ).alias("spread_pct")
+                )
+                .select(
+                    PAIR_COLUMNS
+                    + [BUCKET_COLUMN, "buy_vwap", "sell_vwap", "spread", "spread_pct"]
+                    + [f"{s}_{m}" for s in ("buy", "sell") for m in ("quantity", "notional", "trades")]
+                )
+                .sort(PAIR_COLUMNS + [BUCKET_COLUMN])
+            )
+        except Exception as e:
+            logger.error(f"Error calculando VWAP/spread con ventana '{every}': {e}")
+            continue
+        tables[every] = table
+        logger.info(f"VWAP/spread '{every}': {table.height} ventanas en {trades.height} operaciones.")
+    return tables
+
+
+def _vwap(side: str) -> pl.Expr:
+    """VWAP de un lado; nulo si no hubo operaciones de ese lado en la ventana."""
+    quantity = pl.col(f"{side}_quantity")
+    return pl.when(quantity > 0).then(pl.col(f"{side}_notional") / quantity).otherwise(None)
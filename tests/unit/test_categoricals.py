@@ -0,0 +1,38 @@
+import polars as pl
+from src.filters import apply_generic_filter
+from src.transformations.categoricals import (
+    decode_categorical_columns,
+    normalize_categorical_columns,
+)
+
+
+def test_normalize_categorical_columns_canonicalizes_and_casts():
+    df = pl.DataFrame(
+        {
+            "fiat_type": [" usd", "UYU "],
+            "order_type": ["Buy", "sell"],
+            "status": ["completed", "System cancelled"],
+            "Counterparty": [" alice ", "bob"],
+            "Quantity_num": [1.0, 2.0],
+        }
+    )
+    result = normalize_categorical_columns(df)
+    assert result.schema["fiat_type"] == pl.Categorical("lexical")
+    assert result["fiat_type"].to_list() == ["USD", "UYU"]
+    assert result["order_type"].to_list() == ["BUY", "SELL"]
+    assert result["status"].to_list() == ["Completed", "System Cancelled"]
+    assert result["Counterparty"].to_list() == ["alice", "bob"]
+    assert result.schema["Quantity_num"] == pl.Float64
+
+
+def test_generic_filter_on_categorical_column():
+    df = normalize_categorical_columns(
+        pl.DataFrame({"fiat_type": ["USD", "UYU", "usd"]})
+    )
+    result = apply_generic_filter(df, "fiat_type", [" usd"])
+    assert result.height == 2
+
+
+def test_decode_categorical_columns():
+    df = normalize_categorical_columns(pl.DataFrame({"status": ["Completed"]}))
+    assert decode_categorical_columns(df).schema["status"] == pl.String
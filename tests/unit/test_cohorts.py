@@ -0,0 +1,71 @@
+import polars as pl
+import pytest
+
+from src import cohorts
+from src.cohorts import analyze_cohorts
+
+
+def _trades():
+    rows = [
+        ("ana", "2024-01-05", 100.0),
+        ("ana", "2024-02-10", 50.0),
+        ("ana", "2024-03-01", 25.0),
+        ("bob", "2024-01-20", 10.0),
+        ("bob", "2024-03-15", 10.0),
+        ("eva", "2024-02-02", 5.0),
+        ("eva", "2024-02-20", 5.0),
+        ("eva", "2024-03-30", 7.0),
+    ]
+    return pl.DataFrame(
+        {
+            "Counterparty": [r[0] for r in rows],
+            "Match_time_local": pl.Series([r[1] for r in rows]).str.to_datetime().dt.replace_time_zone("UTC"),
+            "TotalPrice_num": [r[2] for r in rows],
+            "status": "Completed",
+        }
+    ).with_columns(pl.col("Counterparty").cast(pl.Categorical))
+
+
+def test_retention_triangle():
+    result = analyze_cohorts(_trades())
+    matrix = result["retention_matrix"]
+    assert matrix["cohort"].to_list() == ["2024-01", "2024-02"]
+    assert matrix["cohort_size"].to_list() == [2, 1]
+    jan = matrix.row(0, named=True)
+    assert (jan["m0"], jan["m1"], jan["m2"]) == (1.0, 0.5, 1.0)
+    # La cohorte de febrero aún no tiene mes 2
+    assert matrix.row(1, named=True)["m2"] is None
+
+    retention = result["retention"].filter(pl.col("cohort") == "2024-02")
+    assert retention["volume"].to_list() == [10.0, 7.0]
+    assert retention["cumulative_volume_per_member"].to_list() == [10.0, 17.0]
+    assert result["volume_matrix"].row(0, named=True)["m2"] == pytest.approx(35.0)
+
+
+def test_incremental_update_matches_full_rebuild(tmp_path, monkeypatch):
+    trades = _trades()
+    through_feb = trades.filter(pl.col("Match_time_local") < pl.datetime(2024, 2, 15, time_zone="UTC"))
+    analyze_cohorts(through_feb, state_dir=str(tmp_path))
+
+    # Con el estado guardado no hace falta el cálculo completo
+    def fail(_):
+        raise AssertionError("se recalculó el triángulo completo")
+
+    monkeypatch.setattr(cohorts, "_full_cells", fail)
+    incremental = analyze_cohorts(trades, state_dir=str(tmp_path))
+    monkeypatch.undo()
+    assert incremental["retention"].equals(analyze_cohorts(trades)["retention"])
+
+
+def test_changed_history_forces_full_rebuild(tmp_path):
+    analyze_cohorts(_trades(), state_dir=str(tmp_path))
+    edited = _trades().with_columns(
+        pl.when(pl.col("Counterparty").cast(pl.Utf8) == "bob")
+        .then(pl.lit("zoe"))
+        .otherwise(pl.col("Counterparty").cast(pl.Utf8))
+        .alias("Counterparty"),
+        pl.col("TotalPrice_num") * 2,
+    )
+    assert analyze_cohorts(edited, state_dir=str(tmp_path))["retention"].equals(
+        analyze_cohorts(edited)["retention"]
+    )
@@ -0,0 +1,71 @@
+import polars as pl
+import pytest
+
+from src.cost_basis import analyze_cost_basis
+
+
+def _fills(rows):
+    """rows: (lado, cantidad, precio unitario)."""
+    return pl.DataFrame(
+        {
+            "asset_type": ["USDT"] * len(rows),
+            "fiat_type": ["UYU"] * len(rows),
+            "order_type": [side for side, _, _ in rows],
+            "Quantity_num": [float(qty) for _, qty, _ in rows],
+            "TotalPrice_num": [float(qty * price) for _, qty, price in rows],
+            "Match_time_local": pl.datetime_range(
+                pl.datetime(2024, 1, 1),
+                pl.datetime(2024, 1, 1, 0, len(rows) - 1),
+                "1m",
+                eager=True,
+            ),
+            "status": ["Completed"] * len(rows),
+            "order_number": [str(i) for i in range(len(rows))],
+        }
+    )
+
+
+ROWS = [("BUY", 10, 40), ("BUY", 10, 42), ("SELL", 15, 45), ("BUY", 5, 41), ("SELL", 8, 44)]
+
+
+@pytest.mark.parametrize(
+    "method, costs, open_qty",
+    [
+        # FIFO: 10@40 + 5@42, luego 5@42 + 3@41
+        ("fifo", [610.0, 333.0], 2.0),
+        # LIFO: 10@42 + 5@40, luego 5@41 + 3@40
+        ("lifo", [620.0, 325.0], 2.0),
+        # Promedio: 41 tras las dos compras; (5*41 + 5*41)/10 = 41
+        ("average", [615.0, 328.0], 2.0),
+    ],
+)
+def test_realized_pnl_per_method(method, costs, open_qty):
+    result = analyze_cost_basis(_fills(ROWS), method=method)
+    realized = result["realized"]
+    assert realized["cost_basis"].to_list() == pytest.approx(costs)
+    assert realized["realized_pnl"].to_list() == pytest.approx([15 * 45 - costs[0], 8 * 44 - costs[1]])
+    assert result["inventory"]["open_quantity"].sum() == pytest.approx(open_qty)
+    summary = result["summary"].row(0, named=True)
+    assert summary["realized_pnl"] == pytest.approx(15 * 45 + 8 * 44 - sum(costs))
+
+
+def test_sales_beyond_bought_inventory_are_uncovered():
+    rows = [("SELL", 4, 45), ("BUY", 10, 40), ("SELL", 12, 44)]
+    realized = analyze_cost_basis(_fills(rows), method="fifo")["realized"]
+    # La primera venta no tiene compras previas; la segunda cubre solo 10
+    assert realized["uncovered_quantity"].to_list() == pytest.approx([4.0, 2.0])
+    assert realized["cost_basis"].to_list()[0] is None
+    assert realized["realized_pnl"].to_list()[1] == pytest.approx(12 * 44 * 10 / 12 - 400.0)
+
+
+def test_non_completed_and_other_pairs_are_separated():
+    df = pl.concat(
+        [
+            _fills(ROWS),
+            _fills([("BUY", 1, 1.0), ("SELL", 1, 2.0)]).with_columns(pl.lit("USD").alias("fiat_type")),
+            _fills([("SELL", 100, 50)]).with_columns(pl.lit("Cancelled").alias("status")),
+        ]
+    )
+    summary = analyze_cost_basis(df, method="fifo")["summary"]
+    assert summary["fiat_type"].to_list() == ["USD", "UYU"]
+    assert summary["sales"].to_list() == [1, 2]
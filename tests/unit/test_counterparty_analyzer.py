@@ -0,0 +1,23 @@
+import polars as pl
+import pytest
+
+from src.counterparty_analyzer import _calculate_efficiency_stats
+from src.transformations.categoricals import normalize_categorical_columns
+
+
+def test_cancellation_rate_counts_system_cancelled():
+    df = normalize_categorical_columns(
+        pl.DataFrame(
+            {
+                "Counterparty": ["ana"] * 4,
+                "status": ["Completed", "Completed", "Cancelled", "System cancelled"],
+                "TotalPrice_num": [10.0, 20.0, 30.0, 40.0],
+                "Match_time_local": pl.datetime_range(
+                    pl.datetime(2024, 1, 1), pl.datetime(2024, 1, 4), "1d", eager=True
+                ),
+            }
+        )
+    )
+    stats = _calculate_efficiency_stats(df).row(0, named=True)
+    assert stats["completion_rate"] == pytest.approx(50.0)
+    assert stats["cancellation_rate"] == pytest.approx(50.0)
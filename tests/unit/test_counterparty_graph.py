@@ -0,0 +1,58 @@
+import polars as pl
+import pytest
+
+from src.counterparty_graph import analyze_counterparty_graph
+
+
+def _trades():
+    times = [
+        "2024-01-01",
+        "2024-01-03",
+        "2024-03-01",
+        "2024-01-15",
+        "2024-01-16",
+        "2024-02-10",
+        "2024-02-12",
+    ]
+    return pl.DataFrame(
+        {
+            "Counterparty": ["ana", "ana", "ana", "bob", "bob", "eva", "eva"],
+            "order_type": ["BUY", "SELL", "BUY", "BUY", "BUY", "SELL", "SELL"],
+            "TotalPrice_num": [100.0, 50.0, 100.0, 10.0, 10.0, 5.0, 7.0],
+            "Match_time_local": pl.Series(times).str.to_datetime().dt.replace_time_zone("UTC"),
+            "status": ["Completed"] * 6 + ["Cancelled"],
+        }
+    ).with_columns(pl.col("Counterparty").cast(pl.Categorical))
+
+
+def _by_cp(table):
+    return {row["Counterparty"]: row for row in table.iter_rows(named=True)}
+
+
+def test_reciprocity_repeat_and_churn():
+    relationships = _by_cp(analyze_counterparty_graph(_trades())["relationships"])
+    ana, bob, eva = relationships["ana"], relationships["bob"], relationships["eva"]
+    assert (ana["buy_volume"], ana["sell_volume"], ana["lifetime_value"]) == (200.0, 50.0, 250.0)
+    assert ana["reciprocity"] == pytest.approx(0.25) and ana["is_reciprocal"]
+    assert bob["reciprocity"] == 0.0 and not bob["is_reciprocal"]
+    # ana vuelve a los 2 y a los 58 días
+    assert ana["mean_repeat_days"] == pytest.approx(30.0)
+    # bob: 45 días sin operar superan el mínimo de 30; eva (una sola completada) no
+    assert bob["days_since_last"] == pytest.approx(45.0) and bob["churned"]
+    assert eva["trades"] == 1 and not eva["churned"]
+
+
+def test_cohorts_and_histogram():
+    result = analyze_counterparty_graph(_trades(), churn_min_days=10, bin_edges_days=[0, 7])
+    cohorts = _by_cp(result["cohorts"].rename({"cohort": "Counterparty"}))
+    assert cohorts["2024-01"]["counterparties"] == 2
+    assert cohorts["2024-01"]["retention_rate"] == pytest.approx(0.5)
+    assert cohorts["2024-02"]["churn_rate"] == pytest.approx(1.0)
+
+    histogram = result["repeat_intervals"].filter(pl.col("side") == "all")
+    assert histogram["bin_label"].to_list() == ["[0d, 7d)", ">= 7d"]
+    assert histogram["count"].to_list() == [2, 1]
+
+
+def test_missing_columns_returns_empty():
+    assert analyze_counterparty_graph(_trades().drop("order_type")) == {}
@@ -0,0 +1,92 @@
+import numpy as np
+import polars as pl
+
+from src import counterparty_analyzer
+from src import counterparty_segments as segments
+
+
+def _trades(seed=0):
+    """Dos perfiles: 10 contrapartes grandes y frecuentes, 30 chicas y ocasionales."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for i in range(40):
+        big = i < 10
+        for _ in range(40 if big else 2):
+            rows.append(
+                {
+                    "Counterparty": f"cp{i}",
+                    "TotalPrice_num": float(rng.uniform(5000, 6000) if big else rng.uniform(50, 60)),
+                    "Price_num": 40.0,
+                    "Quantity_num": 10.0,
+                    "Match_time_local": int(rng.integers(1_700_000_000, 1_710_000_000)),
+                    "payment_method": "Bank" if big else str(rng.choice(["Bank", "Prex"])),
+                    "status": "Completed",
+                    "order_type": "BUY",
+                }
+            )
+    return pl.DataFrame(rows).with_columns(
+        pl.from_epoch("Match_time_local", time_unit="s").dt.replace_time_zone("UTC")
+    )
+
+
+def test_feature_matrix_is_one_row_per_counterparty():
+    cp_metrics = counterparty_analyzer.analyze_counterparties(_trades())
+    features, matrix = segments.build_feature_matrix(cp_metrics)
+    assert matrix.shape == (40, len(segments.SEGMENT_FEATURES))
+    assert np.isfinite(matrix).all()
+    assert features["Counterparty"].n_unique() == 40
+
+
+def test_segments_follow_volume_and_model_is_reused(tmp_path):
+    model_path = str(tmp_path / "models" / segments.MODEL_FILENAME)
+    cp_metrics = counterparty_analyzer.analyze_counterparties(_trades())
+    result = segments.assign_segments(cp_metrics, {"n_clusters": 2}, model_path)
+
+    by_cp = dict(result["segments"].select("Counterparty", "segment").iter_rows())
+    # Segmento 0 = menor volumen; los perfiles quedan separados
+    assert {by_cp[f"cp{i}"] for i in range(10)} == {1}
+    assert {by_cp[f"cp{i}"] for i in range(10, 40)} == {0}
+    assert result["segment_profiles"]["counterparties"].to_list() == [30, 10]
+
+    # Con los mismos parámetros se asigna con el modelo guardado
+    mtime = (tmp_path / "models" / segments.MODEL_FILENAME).stat().st_mtime_ns
+    segments._model_cache.clear()
+    other = counterparty_analyzer.analyze_counterparties(_trades(seed=1))
+    again = segments.assign_segments(other, {"n_clusters": 2}, model_path)
+    assert again["segments"]["segment"].n_unique() == 2
+    assert (tmp_path / "models" / segments.MODEL_FILENAME).stat().st_mtime_ns == mtime
+
+    # Otro k invalida el modelo guardado
+    refit = segments.assign_segments(other, {"n_clusters": 5}, model_path)
+    assert refit["segments"]["segment"].n_unique() > 2
+    assert segments.load_segment_model(model_path)["params"]["n_clusters"] == 5
+
+
+def test_ensure_segment_model_refits_only_on_new_params_or_refit(tmp_path):
+    model_path = str(tmp_path / segments.MODEL_FILENAME)
+
+    def mtime():
+        return (tmp_path / segments.MODEL_FILENAME).stat().st_mtime_ns
+
+    assert segments.ensure_segment_model(_trades(), {"n_clusters": 2}, model_path) == model_path
+    first = mtime()
+    # Operaciones nuevas: se reutiliza el modelo y solo se asigna
+    segments.ensure_segment_model(_trades(seed=2), {"n_clusters": 2}, model_path)
+    assert mtime() == first
+
+    segments.ensure_segment_model(_trades(), {"n_clusters": 2, "random_state": 7}, model_path)
+    second = mtime()
+    assert second != first
+    assert segments.load_segment_model(model_path)["params"]["random_state"] == 7
+
+    segments.ensure_segment_model(_trades(), {"n_clusters": 2, "random_state": 7, "refit": True}, model_path)
+    assert mtime() != second
+    assert [path.name for path in tmp_path.iterdir()] == [segments.MODEL_FILENAME]
+
+
+def test_default_model_path_is_per_category(tmp_path):
+    paths = {
+        segments.segments_model_path({}, str(tmp_path / category)) for category in ("USDT_UYU", "USDT_ARS")
+    }
+    assert len(paths) == 2
+    assert segments.segments_model_path({"model_path": "shared.joblib"}, str(tmp_path)) == "shared.joblib"
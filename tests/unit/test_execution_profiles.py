@@ -0,0 +1,43 @@
+import argparse
+import os
+
+import polars as pl
+from src.execution_profiles import get_stage_flags
+from src.reporter import save_outputs
+
+
+def test_get_stage_flags_profiles():
+    assert all(get_stage_flags(argparse.Namespace(profile="full")).values())
+    report = get_stage_flags(argparse.Namespace(profile="report"))
+    assert report == {
+        "figures": False,
+        "html": True,
+        "excel": True,
+        "unified_report": False,
+    }
+    flags = get_stage_flags(argparse.Namespace(profile="full", no_unified_report=True))
+    assert flags["figures"] and not flags["unified_report"]
+    # Sin atributo profile se asume 'full'
+    assert get_stage_flags(argparse.Namespace()) == get_stage_flags(
+        argparse.Namespace(profile="full")
+    )
+
+
+def test_save_outputs_tables_profile_writes_only_csv(tmp_path):
+    df = pl.DataFrame({"fiat_type": ["USD"], "TotalPrice_num": [10.0]})
+    metrics = {"summary": pl.DataFrame({"fiat_type": ["USD"], "total": [10.0]})}
+    save_outputs(
+        df,
+        metrics,
+        output_label="total",
+        status_subdir="completadas",
+        base_output_dir=str(tmp_path),
+        file_name_suffix_from_cli="",
+        title_suffix_from_cli="",
+        col_map={},
+        cli_args=argparse.Namespace(profile="tables"),
+        config={},
+    )
+    base = tmp_path / "total" / "completadas"
+    assert (base / "tables" / "summary.csv").exists()
+    assert sorted(os.listdir(base)) == ["tables"]
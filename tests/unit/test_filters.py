@@ -31,3 +31,36 @@ def test_apply_filters_multiple():
     assert result.shape[0] == 2
     assert all(x == "usd" for x in result["fiat_type"].to_list())
     assert all(x == "btc" for x in result["asset_type"].to_list())
+
+
+def test_filter_plan_single_predicate_and_selectivity():
+    import datetime
+    from src.filters import FilterPlan
+
+    df = pl.DataFrame(
+        {
+            "fiat_type": ["USD", "UYU", "USD", "USD"],
+            "Match_time_local": [
+                datetime.datetime(2023, 5, 1, 10),
+                datetime.datetime(2023, 5, 2, 10),
+                datetime.datetime(2023, 6, 1, 10),
+                datetime.datetime(2023, 5, 20, 10),
+            ],
+            "TotalPrice_num": [100.0, 200.0, 300.0, 50.0],
+        }
+    )
+    plan = (
+        FilterPlan()
+        .add_values("fiat_type", ["usd"])
+        .add_month(5)
+        .add_date_range(datetime.date(2023, 5, 1), datetime.date(2023, 5, 31))
+        .add_amount_range(60.0, None)
+        .add_values("missing_column", ["x"])
+    )
+    result = plan.apply(df)
+    assert result["TotalPrice_num"].to_list() == [100.0]
+    diagnostics = dict(
+        zip(plan.last_diagnostics["filter"], plan.last_diagnostics["rows_passed"])
+    )
+    assert diagnostics["mes == 5"] == 3
+    assert diagnostics["TOTAL (combinado)"] == 1
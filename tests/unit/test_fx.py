@@ -0,0 +1,74 @@
+import os
+
+import polars as pl
+import pytest
+
+from src.transformations import fx
+from src.transformations.fx import apply_fx_normalization, attach_usd_rates, load_rate_index
+
+
+@pytest.fixture(autouse=True)
+def _clear_index_cache():
+    fx._index_cache.clear()
+    yield
+    fx._index_cache.clear()
+
+
+def _write_rates(path):
+    pl.DataFrame(
+        {
+            "date": ["2024-01-01", "2024-01-02", "2024-01-01", "2024-01-01"],
+            "currency": ["uyu", "UYU", "BTC", "ARS"],
+            "usd_rate": [0.025, 0.02, 40000.0, 0.001],
+        }
+    ).write_csv(path)
+    return str(path)
+
+
+def _trades():
+    times = ["2024-01-02 08:00", "2024-01-01 12:00", "2023-12-31 12:00", "2024-01-01 12:00", "2024-01-01 12:00"]
+    return pl.DataFrame(
+        {
+            # 2024-01-02 08:00 en Montevideo ya es 11:00 UTC: rige la tasa del día 2
+            "Match_time_local": pl.Series(times)
+            .str.to_datetime()
+            .dt.replace_time_zone("America/Montevideo"),
+            "fiat_type": ["UYU", "UYU", "UYU", "USD", "EUR"],
+            "asset_type": ["USDT", "BTC", "USDT", "USDT", "USDT"],
+            "TotalPrice_num": [1000.0, 4000.0, 400.0, 50.0, 10.0],
+            "Quantity_num": [20.0, 0.0025, 10.0, 50.0, 10.0],
+            "TotalPrice_USD_equivalent": [25.0, None, 10.0, 50.0, None],
+        }
+    )
+
+
+def test_attach_usd_rates_uses_rate_in_force(tmp_path):
+    rate_index = load_rate_index(_write_rates(tmp_path / "rates.csv"), cache_dir=None)
+    result = attach_usd_rates(_trades(), rate_index)
+
+    assert result["fiat_usd_rate"].to_list() == [0.02, 0.025, None, 1.0, None]
+    # Sin tasa anterior a la operación se conserva el equivalente previo
+    assert result["TotalPrice_USD_equivalent"].to_list() == pytest.approx(
+        [20.0, 100.0, 10.0, 50.0, None], nan_ok=True
+    )
+    assert result["Quantity_USD_equivalent"][1] == pytest.approx(100.0)
+    assert result["asset_usd_rate"][0] == 1.0
+    assert result.columns[:7] == _trades().columns + ["fiat_usd_rate"]
+
+
+def test_rate_index_is_cached_on_disk(tmp_path):
+    rates_path = _write_rates(tmp_path / "rates.csv")
+    cache_dir = tmp_path / "cache"
+    first = load_rate_index(rates_path, cache_dir=str(cache_dir))
+    assert len(os.listdir(cache_dir)) == 1
+
+    fx._index_cache.clear()
+    second = load_rate_index(rates_path, cache_dir=str(cache_dir))
+    assert second.equals(first)
+    assert second["currency"].to_list() == ["ARS", "BTC", "UYU", "UYU"]
+
+
+def test_without_rates_path_is_noop():
+    df = _trades()
+    assert apply_fx_normalization(df, {"rates_path": None}) is df
+    assert apply_fx_normalization(df, {"rates_path": "/no/existe.csv"}) is df
@@ -0,0 +1,81 @@
+import gzip
+import zipfile
+
+import polars as pl
+import pytest
+from src.ingest import load_input_data, resolve_input_paths
+
+COLUMN_MAP = {
+    "order_number": ["Order Number", "Order No."],
+    "adv_order_number": "Advertisement Order Number",
+    "status": "Status",
+}
+
+
+def _write(path, header, rows):
+    path.write_text("\n".join([header] + rows) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_resolve_input_paths_glob_and_missing(tmp_path):
+    _write(tmp_path / "2023-02.csv", "Order Number", ["1"])
+    _write(tmp_path / "2023-01.csv", "Order Number", ["2"])
+    paths = resolve_input_paths([str(tmp_path / "2023-*.csv")])
+    assert [p.split("/")[-1] for p in paths] == ["2023-01.csv", "2023-02.csv"]
+    with pytest.raises(FileNotFoundError):
+        resolve_input_paths([str(tmp_path / "missing.csv")])
+
+
+def test_load_input_data_reconciles_headers_and_deduplicates(tmp_path):
+    old_export = _write(
+        tmp_path / "a.csv",
+        "Order No.,Advertisement Order Number,Status",
+        [
+            "20345102803789844480,11,Pending",
+            "20345102803789844481,12,Completed",
+        ],
+    )
+    new_export = _write(
+        tmp_path / "b.csv",
+        "Order Number,Advertisement Order Number,Status",
+        [
+            "20345102803789844480,11,Completed",
+            "20345102803789844482,13,Cancelled",
+        ],
+    )
+    result = load_input_data([old_export, new_export], COLUMN_MAP)
+
+    assert "Order Number" in result.columns
+    assert "Order No." not in result.columns
+    assert result.schema["Order Number"] == pl.String
+    assert result.height == 3
+    statuses = dict(zip(result["Order Number"].to_list(), result["Status"].to_list()))
+    # La exportación más reciente gana
+    assert statuses["20345102803789844480"] == "Completed"
+
+
+def test_load_input_data_reads_compressed_exports(tmp_path):
+    header = "Order Number,Advertisement Order Number,Status"
+    content = f"{header}\n20345102803789844480,11,Completed\n"
+    gz_path = tmp_path / "2023.csv.gz"
+    with gzip.open(gz_path, "wt", encoding="utf-8") as f:
+        f.write(content)
+    zip_path = tmp_path / "2024.zip"
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("2024.csv", content.replace("44480", "44481"))
+
+    result = load_input_data([str(gz_path), str(zip_path)], COLUMN_MAP)
+
+    assert result.schema["Order Number"] == pl.String
+    assert sorted(result["Order Number"].to_list()) == [
+        "20345102803789844480",
+        "20345102803789844481",
+    ]
+
+
+def test_load_input_data_zip_without_csv(tmp_path):
+    zip_path = tmp_path / "empty.zip"
+    with zipfile.ZipFile(zip_path, "w") as archive:
+        archive.writestr("readme.txt", "sin datos")
+    with pytest.raises(ValueError):
+        load_input_data(str(zip_path), COLUMN_MAP)
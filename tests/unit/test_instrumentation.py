@@ -0,0 +1,52 @@
+import json
+
+from src.instrumentation import RunProfiler
+
+
+def test_run_profiler_groups_stages_by_cell(tmp_path):
+    profiler = RunProfiler()
+    with profiler.stage("ingest") as rec:
+        rec["rows"] = 10
+    with profiler.cell("2024", "completadas"):
+        with profiler.stage("analyze", rows=5):
+            clock = profiler.clock()
+            clock.lap("analyze.sessions", rows=5)
+
+    profile = profiler.to_dict()
+    assert [s["name"] for s in profile["stages"]] == ["ingest"]
+    assert profile["stages"][0]["rows"] == 10
+    cell = profile["cells"][0]
+    assert (cell["year"], cell["status"]) == ("2024", "completadas")
+    assert cell["wall_s"] is not None
+    names = {s["name"]: s for s in cell["stages"]}
+    assert names["analyze.sessions"]["parent"] == "analyze"
+    assert names["analyze"]["parent"] == "cell"
+
+    profiler.write(str(tmp_path), chrome_trace=True)
+    assert json.loads((tmp_path / "run_profile.json").read_text())["cells"]
+    trace = json.loads((tmp_path / "run_trace.json").read_text())
+    assert {e["ph"] for e in trace["traceEvents"]} == {"X"}
+
+
+def test_scoped_profile_keeps_categories_apart(tmp_path):
+    profiler = RunProfiler()
+    with profiler.stage("ingest"):
+        pass
+    for category in ("usdt_uyu", "usdt_ars"):
+        with profiler.scope(category), profiler.cell("total", "todas"):
+            with profiler.stage(f"analyze.{category}"):
+                pass
+
+    profile = profiler.to_dict("usdt_ars")
+    assert profile["stages"] == []
+    assert [(c["scope"], c["year"], c["status"]) for c in profile["cells"]] == [("usdt_ars", "total", "todas")]
+    assert [s["name"] for s in profile["cells"][0]["stages"]] == ["analyze.usdt_ars"]
+
+    # El perfil completo conserva todo, sin mezclar celdas de categorías distintas
+    full = profiler.to_dict()
+    assert [s["name"] for s in full["stages"]] == ["ingest"]
+    assert len(full["cells"]) == 2
+
+    profiler.write(str(tmp_path), scope="usdt_uyu")
+    written = json.loads((tmp_path / "run_profile.json").read_text())
+    assert [c["scope"] for c in written["cells"]] == ["usdt_uyu"]
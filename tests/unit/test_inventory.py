@@ -0,0 +1,77 @@
+import datetime
+
+import polars as pl
+import pytest
+
+from src.inventory import analyze_inventory, inventory_asof
+
+
+def _trades():
+    times = [
+        "2024-01-01 10:01",
+        "2024-01-01 10:20",
+        "2024-01-01 10:59",
+        "2024-01-03 11:05",
+        "2024-01-01 10:30",
+        "2024-01-01 10:40",
+    ]
+    return pl.DataFrame(
+        {
+            "asset_type": ["USDT"] * 4 + ["BTC", "USDT"],
+            "fiat_type": ["UYU"] * 4 + ["USD", "UYU"],
+            "order_type": ["BUY", "SELL", "BUY", "SELL", "BUY", "SELL"],
+            "Quantity_num": [10.0, 5.0, 30.0, 5.0, 0.1, 1.0],
+            "TotalPrice_num": [400.0, 210.0, 1230.0, 215.0, 6000.0, 99.0],
+            "Match_time_local": pl.Series(times)
+            .str.to_datetime()
+            .dt.replace_time_zone("America/Montevideo"),
+            "status": ["Completed"] * 5 + ["Cancelled"],
+            "order_number": [str(i) for i in range(6)],
+        }
+    )
+
+
+def test_event_series_accumulates_position_and_fiat_per_pair():
+    events = analyze_inventory(_trades(), ["1d"])["events"]
+    usdt = events.filter(pl.col("asset_type") == "USDT")
+    # La venta cancelada no cuenta
+    assert usdt["position"].to_list() == [10.0, 5.0, 35.0, 30.0]
+    assert usdt["net_fiat"].to_list() == [-400.0, -190.0, -1420.0, -1205.0]
+    assert usdt["exposure"].to_list() == pytest.approx([400.0, 210.0, 1435.0, 1290.0])
+    btc = events.filter(pl.col("asset_type") == "BTC").row(0, named=True)
+    assert btc["position"] == pytest.approx(0.1)
+    assert btc["net_fiat"] == pytest.approx(-6000.0)
+
+
+def test_snapshots_forward_fill_empty_intervals():
+    snapshots = analyze_inventory(_trades(), ["1d"])["snapshots_1d"]
+    usdt = snapshots.filter(pl.col("asset_type") == "USDT")
+    assert usdt.height == 3
+    assert usdt["position"].to_list() == [35.0, 35.0, 30.0]
+    assert usdt["trades"].to_list() == [3, 0, 1]
+    assert snapshots.filter(pl.col("asset_type") == "BTC").height == 1
+    assert snapshots["asset_type"].null_count() == 0
+
+
+def test_asof_returns_state_after_last_trade():
+    events = analyze_inventory(_trades(), [])["events"]
+    states = inventory_asof(
+        events, [datetime.datetime(2024, 1, 1, 10, 0), datetime.datetime(2024, 1, 2)]
+    )
+    assert states.height == 4
+    before = states.filter(pl.col("at").dt.hour() == 10)
+    assert before["position"].null_count() == 2
+    usdt = states.filter(
+        (pl.col("asset_type") == "USDT") & (pl.col("at").dt.day() == 2)
+    ).row(0, named=True)
+    assert usdt["position"] == 35.0
+    assert usdt["last_trade_time"].minute == 59
+
+
+def test_missing_columns_returns_empty():
+    assert analyze_inventory(pl.DataFrame({"asset_type": ["USDT"]})) == {}
+
+
+def test_default_snapshots_are_daily_only():
+    result = analyze_inventory(_trades())
+    assert [key for key in result if key.startswith("snapshots_")] == ["snapshots_1d"]
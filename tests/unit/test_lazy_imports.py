@@ -0,0 +1,15 @@
+import subprocess
+import sys
+
+from scripts.benchmark_import import HEAVY_MODULES
+
+
+def test_app_import_does_not_load_heavy_dependencies():
+    code = (
+        "import sys, src.app; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == ""
@@ -0,0 +1,79 @@
+import argparse
+
+import numpy as np
+import polars as pl
+
+import src.analyzer
+from src.main_logic import execute_analysis
+
+N_TABLES = 40
+
+
+def _cli_args(tmp_path, **overrides):
+    args = dict(
+        csv=str(tmp_path / "missing.csv"),
+        config=None,
+        out=str(tmp_path),
+        no_annual_breakdown=True,
+        year=None,
+        profile="report",
+        report_mode="light",
+        workers=4,
+        draft=True,
+    )
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+
+def _run(tmp_path, df, cli_args, config):
+    execute_analysis(
+        df=df,
+        col_map={},
+        config=config,
+        cli_args=cli_args,
+        output_dir=str(tmp_path),
+        clean_filename_suffix_cli="",
+        analysis_title_suffix_cli="",
+    )
+
+
+def test_parallel_cell_tasks_write_every_table(tmp_path, monkeypatch):
+    # Tablas y Pandas de cada celda leen a la vez los mismos frames (en varios
+    # chunks, así `to_pandas` toma el frame en préstamo mutable)
+    chunk = pl.DataFrame({"key": np.arange(20_000).astype(str), "value": np.random.rand(20_000)})
+    shared = {f"metric_{i}": pl.concat([chunk] * 4, rechunk=False) for i in range(N_TABLES)}
+    monkeypatch.setattr(src.analyzer, "analyze", lambda df, **kwargs: (df, shared))
+    monkeypatch.setattr("src.reporter.export_excel", lambda *args, **kwargs: None)
+    monkeypatch.setattr("src.reporter.render_html_report", lambda *args, **kwargs: None)
+
+    df = pl.DataFrame({"status": ["Completed", "Cancelled"], "TotalPrice_num": [1.0, 2.0]})
+    config = {"counterparty_segments": {"enabled": False}, "cohorts": {"enabled": False}}
+    _run(tmp_path, df, _cli_args(tmp_path), config)
+
+    for status in ("todas", "completadas", "canceladas"):
+        tables = list((tmp_path / "total" / "total" / status / "tables").glob("*.csv"))
+        assert len(tables) == N_TABLES, status
+
+
+def test_cohort_heatmap_runs_when_figures_are_enabled_later(tmp_path, monkeypatch):
+    monkeypatch.setattr(src.analyzer, "analyze", lambda df, **kwargs: (df, {}))
+    df = pl.DataFrame(
+        {
+            "Counterparty": ["ana", "ana", "bob"],
+            "Match_time_local": pl.Series(["2024-01-05", "2024-02-10", "2024-01-20"])
+            .str.to_datetime()
+            .dt.replace_time_zone("UTC"),
+            "TotalPrice_num": [100.0, 50.0, 10.0],
+            "status": "Completed",
+        }
+    )
+    config = {"counterparty_segments": {"enabled": False}}
+    figures_dir = tmp_path / "cohorts" / "figures"
+
+    _run(tmp_path, df, _cli_args(tmp_path, profile="tables"), config)
+    assert (tmp_path / "cohorts" / "tables" / "cohort_retention_matrix.csv").is_file()
+    assert not figures_dir.exists()
+
+    # El perfil no entra en la huella: las tablas están al día, el heatmap no
+    _run(tmp_path, df, _cli_args(tmp_path, profile="full", no_unified_report=True), config)
+    assert [path.name for path in figures_dir.iterdir()] == ["cohort_retention_heatmap.png"]
@@ -0,0 +1,92 @@
+import polars as pl
+import pytest
+
+from src.payment_analytics import analyze_payment_methods, method_totals
+from src.transformations.categoricals import normalize_categorical_columns
+
+
+ROWS = [
+    # método, lado, estado, precio, cantidad, hora
+    ("Bank", "SELL", "Completed", 41.0, 10.0, "2024-01-01 10:00"),
+    ("Bank", "SELL", "Completed", 41.0, 30.0, "2024-01-01 11:00"),
+    ("Bank", "SELL", "Cancelled", 40.0, 5.0, "2024-01-02 10:30"),
+    ("Prex", "SELL", "Completed", 39.0, 20.0, "2024-01-01 10:15"),
+    ("Prex", "SELL", "System cancelled", 39.0, 20.0, "2024-01-02 10:45"),
+    ("Prex", "BUY", "Completed", 38.0, 10.0, "2024-01-02 12:00"),
+]
+
+
+def _trades(rows=ROWS):
+    trades = pl.DataFrame(
+        {
+            "payment_method": [r[0] for r in rows],
+            "asset_type": "USDT",
+            "fiat_type": "UYU",
+            "order_type": [r[1] for r in rows],
+            "status": [r[2] for r in rows],
+            "Price_num": [r[3] for r in rows],
+            "Quantity_num": [r[4] for r in rows],
+            "TotalPrice_num": [r[3] * r[4] for r in rows],
+            "Match_time_local": pl.Series([r[5] for r in rows])
+            .str.to_datetime()
+            .dt.replace_time_zone("America/Montevideo"),
+        }
+    )
+    # Estados tal como vienen del CSV; la normalización los deja canónicos
+    return normalize_categorical_columns(trades)
+
+
+def _row(table, **keys):
+    return table.filter(pl.all_horizontal(pl.col(k) == v for k, v in keys.items())).row(0, named=True)
+
+
+def test_summary_rates_and_ticket():
+    summary = analyze_payment_methods(_trades())["summary"]
+    bank = _row(summary, payment_method="Bank")
+    assert (bank["operations"], bank["completed"], bank["cancelled"]) == (3, 2, 1)
+    assert bank["avg_ticket"] == pytest.approx(820.0)
+    prex = _row(summary, payment_method="Prex")
+    assert prex["system_cancelled"] == 1
+    assert prex["cancellation_rate"] == pytest.approx(1 / 3)
+    assert summary["volume_share"].sum() == pytest.approx(1.0)
+
+
+def test_premium_against_pair_side_vwap():
+    premium = analyze_payment_methods(_trades())["price_premium"]
+    # VWAP de ventas del par: (41*40 + 39*20) / 60
+    pair_vwap = (41 * 40 + 39 * 20) / 60
+    bank = _row(premium, payment_method="Bank", order_type="SELL")
+    assert bank["pair_vwap"] == pytest.approx(pair_vwap)
+    assert bank["premium_pct"] == pytest.approx((41 / pair_vwap - 1) * 100)
+    # Las compras se comparan solo con compras
+    assert _row(premium, payment_method="Prex", order_type="BUY")["premium_pct"] == pytest.approx(0.0)
+
+
+def test_premium_is_measured_within_each_day():
+    # El precio se duplica de un día al otro y Bank opera sobre todo el
+    # segundo día; ambos métodos pagan lo mismo que el par cada día
+    rows = [
+        ("Bank", "SELL", "Completed", 40.0, 10.0, "2024-03-01 10:00"),
+        ("Prex", "SELL", "Completed", 40.0, 10.0, "2024-03-01 11:00"),
+        ("Bank", "SELL", "Completed", 80.0, 30.0, "2024-03-02 10:00"),
+        ("Prex", "SELL", "Completed", 80.0, 2.0, "2024-03-02 11:00"),
+    ]
+    premium = analyze_payment_methods(_trades(rows))["price_premium"]
+    bank = _row(premium, payment_method="Bank")
+    assert bank["method_vwap"] == pytest.approx(70.0)
+    assert bank["pair_vwap"] == pytest.approx(70.0)
+    assert premium["premium_pct"].to_list() == pytest.approx([0.0, 0.0])
+
+
+def test_cancellation_by_hour_and_weekday():
+    result = analyze_payment_methods(_trades())
+    by_hour = result["by_hour"]
+    assert _row(by_hour, payment_method="Bank", hour=10)["cancellation_rate"] == pytest.approx(0.5)
+    # 2024-01-02 es martes (Lunes=1)
+    tuesday = _row(result["by_weekday"], payment_method="Prex", weekday=2)
+    assert (tuesday["operations"], tuesday["cancelled"]) == (2, 1)
+
+
+def test_method_totals():
+    totals = method_totals(_trades())
+    assert dict(totals.select("payment_method", "operations").iter_rows()) == {"Bank": 3, "Prex": 3}
@@ -0,0 +1,145 @@
+import json
+import os
+import threading
+
+import pytest
+
+from src.pipeline_dag import RUN_MANIFEST_FILENAME, TaskGraph, file_sha256
+
+
+def _build(tmp_path, calls, fingerprint="v1"):
+    source = tmp_path / "data.csv"
+    if not source.exists():
+        source.write_text("a\n1\n")
+    out = tmp_path / "out"
+    graph = TaskGraph(state_dir=str(tmp_path), fingerprint=fingerprint)
+
+    def record(name, value=None, path=None):
+        def run(deps):
+            calls.append(name)
+            if path is not None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_text(str(deps))
+            return value
+
+        return run
+
+    graph.add("ingest", record("ingest", 1), inputs=[str(source)])
+    graph.add("metrics", record("metrics", 2), deps=["ingest"])
+    graph.add("tables", record("tables", path=out / "tables.csv"), deps=["metrics"], outputs=[str(out / "tables.csv")])
+    graph.add(
+        "figures",
+        record("figures", ["fig.png"], path=out / "figures" / "fig.png"),
+        deps=["metrics"],
+        outputs=[str(out / "figures")],
+        load=lambda: ["fig.png"],
+    )
+    graph.add("html", record("html", path=out / "report.html"), deps=["figures"], outputs=[str(out / "report.html")])
+    return graph, source
+
+
+def test_order_and_cycle_detection(tmp_path):
+    graph, _ = _build(tmp_path, [])
+    order = graph.order()
+    assert order.index("ingest") < order.index("metrics") < order.index("figures") < order.index("html")
+
+    cyclic = TaskGraph()
+    cyclic.add("a", lambda deps: None, deps=["b"])
+    cyclic.add("b", lambda deps: None, deps=["a"])
+    with pytest.raises(ValueError, match="Ciclo"):
+        cyclic.order()
+
+
+def test_second_run_skips_up_to_date_outputs(tmp_path):
+    calls = []
+    graph, source = _build(tmp_path, calls)
+    graph.run()
+    assert calls == ["ingest", "metrics", "tables", "figures", "html"]
+
+    calls.clear()
+    graph, _ = _build(tmp_path, calls)
+    assert graph.plan() == ([], [])
+    graph.run()
+    assert calls == []
+
+    # Con otra configuración se repite todo
+    calls.clear()
+    graph, _ = _build(tmp_path, calls, fingerprint="v2")
+    graph.run()
+    assert "tables" in calls and "html" in calls
+
+
+def test_skip_is_based_on_input_content_not_mtime(tmp_path):
+    calls = []
+    graph, source = _build(tmp_path, calls)
+    graph.run()
+
+    # Tocar el CSV sin cambiar su contenido no invalida nada
+    os.utime(source, ns=(source.stat().st_atime_ns, source.stat().st_mtime_ns + 10**9))
+    calls.clear()
+    graph, _ = _build(tmp_path, calls)
+    graph.run()
+    assert calls == []
+
+    source.write_text("a\n2\n")
+    graph, _ = _build(tmp_path, calls)
+    graph.run()
+    assert calls == ["ingest", "metrics", "tables", "figures", "html"]
+
+    manifest = json.loads((tmp_path / RUN_MANIFEST_FILENAME).read_text())
+    entry = manifest["files"][os.path.join("out", "tables.csv")]
+    assert entry["task"] == "tables"
+    assert entry["sha256"] == file_sha256(str(tmp_path / "out" / "tables.csv"))
+
+
+def test_regenerated_identical_file_keeps_its_mtime(tmp_path):
+    calls = []
+    graph, _ = _build(tmp_path, calls)
+    graph.run()
+    table = tmp_path / "out" / "tables.csv"
+    published_mtime = table.stat().st_mtime_ns
+
+    graph, _ = _build(tmp_path, calls)
+    graph.run(force=True)
+    # Reescrito con el mismo contenido: rsync lo verá sin cambios
+    assert table.stat().st_mtime_ns == published_mtime
+    assert graph.plan() == ([], [])
+
+
+def test_single_task_rerun_loads_skipped_dependencies(tmp_path):
+    calls = []
+    graph, _ = _build(tmp_path, calls)
+    graph.run()
+
+    calls.clear()
+    graph, _ = _build(tmp_path, calls)
+    results = graph.run(targets=["html"])
+    # figures está al día: su resultado se recupera con load sin regenerarlo
+    assert calls == ["html"]
+    assert (tmp_path / "out" / "report.html").read_text() == "{'figures': ['fig.png']}"
+    assert "tables" not in results
+
+
+def test_deleted_output_reruns_task_and_descendants(tmp_path):
+    calls = []
+    graph, _ = _build(tmp_path, calls)
+    graph.run()
+    (tmp_path / "out" / "figures" / "fig.png").unlink()
+
+    calls.clear()
+    graph, _ = _build(tmp_path, calls)
+    graph.run()
+    assert calls == ["ingest", "metrics", "figures", "html"]
+
+
+def test_independent_tasks_run_concurrently_and_failures_block_dependents(tmp_path):
+    barrier = threading.Barrier(2, timeout=5)
+    graph = TaskGraph()
+    graph.add("left", lambda deps: barrier.wait(), outputs=[str(tmp_path / "l")])
+    graph.add("right", lambda deps: barrier.wait(), outputs=[str(tmp_path / "r")])
+    graph.add("boom", lambda deps: 1 / 0, outputs=[str(tmp_path / "b")])
+    graph.add("after_boom", lambda deps: "never", deps=["boom"], outputs=[str(tmp_path / "a")])
+
+    results = graph.run(max_workers=2)
+    # Ambas tareas pasaron la barrera, luego corrieron a la vez
+    assert set(results) == {"left", "right"}
@@ -0,0 +1,56 @@
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+import pytest
+from PIL import Image
+
+from src.plot_utils import configure_figure_output, get_figure_output, save_figure, savefig
+
+
+@pytest.fixture(autouse=True)
+def _restore_policy():
+    yield
+    configure_figure_output()
+
+
+def _fig():
+    fig, ax = plt.subplots(figsize=(4, 2))
+    ax.plot([1, 2, 3])
+    return fig
+
+
+def test_default_policy_matches_previous_output(tmp_path):
+    configure_figure_output()
+    path = save_figure(_fig(), str(tmp_path), "a.png")
+    # 300 DPI y copias SVG/PDF, como antes de la política
+    assert Image.open(path).info["dpi"][0] == pytest.approx(300, abs=1)
+    assert (tmp_path / "a.svg").exists() and (tmp_path / "a.pdf").exists()
+
+
+def test_config_section_sets_dpi_and_vector_formats(tmp_path):
+    configure_figure_output({"figure_output": {"dpi": 150, "vector_formats": ["svg"]}})
+    path = save_figure(_fig(), str(tmp_path), "b.png")
+    assert Image.open(path).info["dpi"][0] == pytest.approx(150, abs=1)
+    assert (tmp_path / "b.svg").exists() and not (tmp_path / "b.pdf").exists()
+
+    configure_figure_output({"figure_output": {"export_vector": False}})
+    save_figure(_fig(), str(tmp_path), "c.png")
+    assert not (tmp_path / "c.svg").exists()
+
+
+def test_draft_caps_every_dpi_and_writes_png_only(tmp_path):
+    policy = configure_figure_output({}, draft=True)
+    assert policy["dpi"] == 72 and policy["vector_formats"] == []
+    save_figure(_fig(), str(tmp_path), "d.png")
+    assert [p.name for p in tmp_path.iterdir()] == ["d.png"]
+
+    # Las DPI explícitas o la propia de la figura también se limitan
+    fig = _fig()
+    explicit = savefig(fig, str(tmp_path / "e.png"), dpi=150)
+    own = savefig(fig, str(tmp_path / "f.png"), dpi="figure")
+    plt.close(fig)
+    assert Image.open(explicit).info["dpi"][0] == pytest.approx(72, abs=1)
+    assert Image.open(own).info["dpi"][0] == pytest.approx(72, abs=1)
+    assert get_figure_output()["draft"] is True
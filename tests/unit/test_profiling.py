@@ -0,0 +1,27 @@
+import time
+
+from src.profiling import CellProfiler
+
+
+def _busy_work():
+    end = time.perf_counter() + 0.05
+    total = 0
+    while time.perf_counter() < end:
+        total += sum(range(100))
+    return total
+
+
+def test_cell_profiler_writes_prof_collapsed_and_hotspots(tmp_path):
+    profiler = CellProfiler(top_n=3)
+    cell_dir = tmp_path / "2024" / "2024" / "completadas"
+    with profiler.profile(str(cell_dir), "2024", "completadas", "analyze"):
+        _busy_work()
+
+    assert (cell_dir / "profile" / "analyze.prof").exists()
+    collapsed = (cell_dir / "profile" / "analyze.collapsed").read_text()
+    assert "_busy_work" in collapsed
+
+    hotspots = profiler.hotspots()
+    assert hotspots.height == 3
+    assert set(hotspots["step"]) == {"analyze"}
+    assert profiler.write_summary(str(tmp_path)).endswith("profile_hotspots.csv")
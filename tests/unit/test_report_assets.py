@@ -0,0 +1,87 @@
+import json
+import os
+
+import pytest
+
+from src import report_assets
+from src.report_assets import (
+    configure_report_assets,
+    figure_thumbnails,
+    inline_chart_json,
+    light_figure_items,
+    make_thumbnail,
+    write_plotly_html,
+)
+
+
+@pytest.fixture(autouse=True)
+def _restore_mode():
+    yield
+    configure_report_assets(report_assets.DEFAULT_REPORT_MODE, None)
+
+
+def _png(path, width=2400, height=1200):
+    from PIL import Image
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", (width, height), "white").save(path)
+    return path
+
+
+def test_thumbnail_is_downsampled_and_reused(tmp_path):
+    from PIL import Image
+
+    image = _png(tmp_path / "figures" / "general" / "hist.png")
+    thumb = make_thumbnail(str(image), str(tmp_path / "thumbs"))
+    assert os.path.basename(thumb) == "general_hist.webp"
+    with Image.open(thumb) as img:
+        assert img.width == report_assets.THUMBNAIL_MAX_WIDTH
+    mtime = os.path.getmtime(thumb)
+    assert make_thumbnail(str(image), str(tmp_path / "thumbs")) == thumb
+    assert os.path.getmtime(thumb) == mtime
+
+
+def test_inline_chart_json_escapes_and_respects_size_limit(tmp_path):
+    html_path = tmp_path / "chart.html"
+    (tmp_path / "chart.json").write_text(json.dumps({"layout": {"title": "</script>"}}))
+    assert "</script>" not in inline_chart_json(str(html_path))
+    assert inline_chart_json(str(html_path), max_bytes=5) is None
+    assert inline_chart_json(str(tmp_path / "missing.html")) is None
+
+
+def test_light_figure_items_uses_thumbnails_and_inline_charts(tmp_path):
+    reports_dir = tmp_path / "reports"
+    reports_dir.mkdir()
+    _png(tmp_path / "figures" / "general" / "hist.png")
+    (tmp_path / "figures" / "chart.json").write_text('{"data": []}')
+    items = light_figure_items(
+        [
+            {"type": "png", "path": "../figures/general/hist.png", "title": "h"},
+            {"type": "html", "path": "../figures/chart.html", "title": "c"},
+        ],
+        str(reports_dir),
+    )
+    assert items[0]["thumb"] == "thumbs/general_hist.webp"
+    assert items[1]["type"] == "plotly_json" and items[1]["json"] == '{"data": []}'
+
+    thumbs = figure_thumbnails([str(tmp_path / "figures" / "general" / "hist.png")], str(reports_dir))
+    entry = thumbs[str(tmp_path / "figures" / "general" / "hist.png")]
+    assert entry == {"thumb": "thumbs/general_hist.webp", "full": "../figures/general/hist.png"}
+
+
+def test_light_mode_plotly_html_references_shared_bundle(tmp_path):
+    go = pytest.importorskip("plotly.graph_objects")
+    fig = go.Figure(go.Bar(x=[1, 2], y=[3, 4]))
+    figures_dir = tmp_path / "out" / "2024" / "figures"
+    figures_dir.mkdir(parents=True)
+
+    configure_report_assets("light", str(tmp_path / "out" / "assets"))
+    light_html = write_plotly_html(fig, str(figures_dir / "bars.html"))
+    configure_report_assets("standard", None)
+    standard_html = write_plotly_html(fig, str(figures_dir / "bars_full.html"))
+
+    content = open(light_html, encoding="utf-8").read()
+    assert 'src="../../assets/plotly.min.js"' in content
+    assert (tmp_path / "out" / "assets" / "plotly.min.js").is_file()
+    assert json.loads((figures_dir / "bars.json").read_text())["data"][0]["type"] == "bar"
+    assert os.path.getsize(light_html) * 20 < os.path.getsize(standard_html)
@@ -0,0 +1,21 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from src.report_renderer import ReportRenderer
+
+
+def test_templates_compile_once_and_persist_bytecode(tmp_path):
+    templates = tmp_path / "templates"
+    templates.mkdir()
+    (templates / "cell.html").write_text("<h1>{{ title }}</h1>")
+    cache = tmp_path / "cache"
+
+    renderer = ReportRenderer(str(templates), str(cache))
+    assert renderer.get_template("cell.html") is renderer.get_template("cell.html")
+    assert list(cache.iterdir()), "el bytecode compilado debe quedar en disco"
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        rendered = list(pool.map(lambda i: renderer.render("cell.html", {"title": f"<{i}>"}), range(8)))
+    assert rendered[3] == "<h1>&lt;3&gt;</h1>"
+
+    out = renderer.render_to_file("cell.html", {"title": "x"}, str(tmp_path / "r" / "a.html"))
+    assert open(out, encoding="utf-8").read() == "<h1>x</h1>"
@@ -0,0 +1,63 @@
+import numpy as np
+import polars as pl
+import pytest
+
+from src.seasonality import analyze_seasonality
+
+
+def _trades(days=60):
+    """UYU opera con ciclo diario; USD con ciclo semanal."""
+    hours = np.arange(24 * days)
+    times, fiats = [], []
+    for fiat, period in (("UYU", 24), ("USD", 168)):
+        counts = np.round(4 * (1 + np.sin(2 * np.pi * hours / period))).astype(int)
+        times.append(np.repeat(hours, counts) * 3600)
+        fiats += [fiat] * int(counts.sum())
+    seconds = np.concatenate(times) + 1_704_067_200  # 2024-01-01 UTC
+    return pl.DataFrame(
+        {
+            "Match_time_local": pl.from_epoch(pl.Series(seconds), time_unit="s").dt.replace_time_zone("UTC"),
+            "fiat_type": fiats,
+            "TotalPrice_num": np.full(len(fiats), 100.0),
+            "status": "Completed",
+        }
+    )
+
+
+def test_known_periods_strength_per_fiat():
+    periods = analyze_seasonality(_trades(days=56), frequencies=["1h"])["periods"]
+
+    def strength(fiat, period):
+        return periods.filter(
+            (pl.col("fiat_type") == fiat) & (pl.col("series") == "volume") & (pl.col("period") == period)
+        )["strength"].item()
+
+    assert strength("UYU", "24h") > 0.5
+    assert strength("UYU", "7d") < 0.05
+    assert strength("USD", "7d") > 0.5
+    # 56 días no alcanzan para dos ciclos de 30 días
+    assert periods.filter(pl.col("period") == "30d").is_empty()
+
+
+def test_dominant_peak_and_daily_resampling():
+    result = analyze_seasonality(_trades(), frequencies=["1h", "1d"], top_peaks=3)
+    peaks = result["peaks"].filter((pl.col("rank") == 1) & (pl.col("series") == "operations"))
+    hourly = {row["fiat_type"]: row for row in peaks.filter(pl.col("frequency") == "1h").iter_rows(named=True)}
+    assert hourly["UYU"]["period"] == "24h"
+    assert hourly["USD"]["period_hours"] == pytest.approx(168, rel=0.05)
+    # En la serie diaria el ciclo de 24h no es representable
+    assert result["periods"].filter((pl.col("frequency") == "1d") & (pl.col("period") == "24h")).is_empty()
+    assert result["peaks"].group_by(["frequency", "fiat_type", "series"]).len()["len"].to_list() == [3] * 8
+
+
+def test_missing_columns_returns_empty():
+    assert analyze_seasonality(pl.DataFrame({"fiat_type": ["UYU"]})) == {}
+
+
+def test_null_fiat_rows_are_skipped():
+    trades = _trades(days=56)
+    with_null = pl.concat(
+        [trades, trades.head(3).with_columns(pl.lit(None, dtype=pl.Utf8).alias("fiat_type"))]
+    )
+    periods = analyze_seasonality(with_null, frequencies=["1h"])["periods"]
+    assert sorted(periods["fiat_type"].unique().to_list()) == ["USD", "UYU"]
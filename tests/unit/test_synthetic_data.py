@@ -0,0 +1,24 @@
+import polars as pl
+from scripts.synthetic_data import EXPORT_COLUMNS, generate_p2p_export, write_p2p_export
+from src.config_loader import DEFAULT_CONFIG
+from src.ingest import load_input_data
+
+
+def test_synthetic_export_matches_real_header():
+    with open("data/data.csv", encoding="utf-8-sig") as f:
+        header = f.readline().strip().split(",")
+    assert EXPORT_COLUMNS == header
+
+
+def test_synthetic_export_is_loadable(tmp_path):
+    df = generate_p2p_export(3000, seed=1)
+    assert df.height == 3000
+    assert df.get_column("Order Number").n_unique() == 3000
+    # Formatos raros de la exportación: puntos de miles y campos vacíos
+    assert (df.get_column("Quantity").str.count_matches(r"\.") > 1).any()
+    assert df.get_column("Counterparty").null_count() > 0
+
+    path = write_p2p_export(str(tmp_path / "synthetic.csv"), 2500, chunk_rows=1000)
+    loaded = load_input_data(path, DEFAULT_CONFIG["column_mapping"])
+    assert loaded.height == 2500
+    assert loaded.schema["Quantity"] == pl.String
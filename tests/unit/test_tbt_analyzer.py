@@ -0,0 +1,57 @@
+import polars as pl
+import pytest
+
+from src.tbt_analyzer import analyze_time_between_trades
+
+
+def _trades():
+    times = [
+        "2024-01-01 10:00",
+        "2024-01-01 10:02",
+        "2024-01-01 10:12",
+        "2024-01-01 11:12",
+        "2024-01-01 11:30",
+        "2024-01-01 10:05",
+    ]
+    return pl.DataFrame(
+        {
+            "Match_time_local": pl.Series(times)
+            .str.to_datetime()
+            .dt.replace_time_zone("America/Montevideo"),
+            "Counterparty": ["ana", "bob", "ana", "bob", "ana", "ana"],
+            "payment_method": ["Bank", "Bank", "Prex", "Bank", "Prex", "Bank"],
+            "status": ["Completed"] * 5 + ["Cancelled"],
+        }
+    ).with_columns(pl.col("Counterparty").cast(pl.Categorical))
+
+
+def _row(summary, scope, group):
+    return summary.filter((pl.col("scope") == scope) & (pl.col("group") == group)).row(0, named=True)
+
+
+def test_gaps_per_scope():
+    summary = analyze_time_between_trades(_trades())["summary"]
+    # Globales: 2, 10, 60 y 18 minutos (la cancelada no cuenta)
+    glob = _row(summary, "global", "all")
+    assert glob["gaps"] == 4
+    assert glob["mean_minutes"] == pytest.approx(22.5)
+    assert glob["p50_minutes"] == pytest.approx(14.0)
+    # ana: 10:00 -> 10:12 -> 11:30
+    ana = _row(summary, "counterparty", "ana")
+    assert (ana["gaps"], ana["min_minutes"], ana["max_minutes"]) == (2, 12.0, 78.0)
+    assert _row(summary, "payment_method", "Prex")["mean_minutes"] == pytest.approx(78.0)
+    # Por hora de llegada: a las 10 llegan los intervalos de 2 y 10 minutos
+    assert _row(summary, "hour", "10")["mean_minutes"] == pytest.approx(6.0)
+
+
+def test_histogram_bins_and_shares():
+    histogram = analyze_time_between_trades(_trades(), bin_edges_minutes=[0, 5, 30])["histogram"]
+    glob = histogram.filter(pl.col("scope") == "global")
+    assert glob["bin_label"].to_list() == ["[0m, 5m)", "[5m, 30m)", ">= 30m"]
+    assert glob["count"].to_list() == [1, 2, 1]
+    assert glob["share"].sum() == pytest.approx(1.0)
+    assert glob["bin_upper_minutes"].to_list() == [5.0, 30.0, None]
+
+
+def test_single_trade_returns_empty():
+    assert analyze_time_between_trades(_trades().head(1)) == {}
@@ -0,0 +1,52 @@
+import polars as pl
+import pytest
+
+from src.vwap_analyzer import analyze_vwap_spread
+
+
+def _trades():
+    times = [
+        "2024-01-01 10:01",
+        "2024-01-01 10:20",
+        "2024-01-01 10:59",
+        "2024-01-01 11:05",
+        "2024-01-01 10:30",
+        "2024-01-01 10:40",
+    ]
+    return pl.DataFrame(
+        {
+            "asset_type": ["USDT"] * 4 + ["BTC", "USDT"],
+            "fiat_type": ["UYU"] * 4 + ["USD", "UYU"],
+            "order_type": ["BUY", "SELL", "BUY", "SELL", "BUY", "SELL"],
+            "Price_num": [40.0, 42.0, 41.0, 43.0, 60000.0, 99.0],
+            "Quantity_num": [10.0, 5.0, 30.0, 5.0, 0.1, 1.0],
+            "Match_time_local": pl.Series(times)
+            .str.to_datetime()
+            .dt.replace_time_zone("America/Montevideo"),
+            "status": ["Completed"] * 5 + ["Cancelled"],
+        }
+    )
+
+
+def test_vwap_and_spread_per_pair_and_bucket():
+    tables = analyze_vwap_spread(_trades(), buckets=["1h", "1d"])
+    hourly = tables["1h"].filter(pl.col("asset_type") == "USDT")
+    assert hourly.height == 2
+    first = hourly.row(0, named=True)
+    # (10*40 + 30*41) / 40; la venta cancelada no cuenta
+    assert first["buy_vwap"] == pytest.approx(40.75)
+    assert first["sell_vwap"] == pytest.approx(42.0)
+    assert first["spread"] == pytest.approx(1.25)
+    assert first["spread_pct"] == pytest.approx(1.25 / 41.375 * 100)
+    assert (first["buy_trades"], first["sell_trades"]) == (2, 1)
+    # Sin compras en la segunda hora: VWAP y spread nulos, no cero
+    assert hourly.row(1, named=True)["buy_vwap"] is None
+    assert hourly.row(1, named=True)["spread"] is None
+
+    daily = tables["1d"]
+    assert daily["asset_type"].to_list() == ["BTC", "USDT"]
+    assert daily.filter(pl.col("asset_type") == "USDT")["sell_vwap"].item() == pytest.approx(42.5)
+
+
+def test_missing_columns_return_empty():
+    assert analyze_vwap_spread(_trades().drop("Price_num")) == {}